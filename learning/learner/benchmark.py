@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+
+import sys
+
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from learner.src.util.benchmark import DEFAULT_BENCHMARK_DIR, DEFAULT_SETTINGS, compare_to_baseline, find_domains, print_results, read_results, run_benchmarks, write_results
+from learner.src.util.bootstrap import get_parser
+
+
+def setup_argparser():
+    parser = get_parser(description="Runs the learner on benchmark domains and reports per stage time, peak memory and ground program size.")
+    parser.add_argument('--benchmark_dir', default=str(DEFAULT_BENCHMARK_DIR), help="The directory containing one directory with a domain.pddl and instances per domain.")
+    parser.add_argument('--domains', nargs='*', default=None, help="The names of the domains to run. If none specified, runs all domains.")
+    parser.add_argument('--workspace', metavar='dir', default="workspace_benchmark/", help="The directory where the experiment outputs will be left.")
+    parser.add_argument('--output', default="benchmark.json", help="The file where the results are written.")
+    parser.add_argument('--baseline', default=None, help="Results of a previous run to compare against.")
+    parser.add_argument('--time_tolerance', default=0.2, type=float, help="Relative increase of the time of a stage that is reported as a regression.")
+    parser.add_argument('--memory_tolerance', default=0.1, type=float, help="Relative increase of the peak memory of a stage that is reported as a regression.")
+    parser.add_argument('--min_seconds', default=0.5, type=float, help="Time differences below this many seconds are not reported.")
+    parser.add_argument('--write_facts', action='store_true', help="Write the facts of each iteration to facts.lp as input to tune_asp.py.")
+    for name, value in DEFAULT_SETTINGS.items():
+        parser.add_argument(f'--{name}', default=value, type=int, help=f'Learner parameter "{name}".')
+    return parser
+
+
+if __name__ == "__main__":
+    args = setup_argparser().parse_args(sys.argv[1:])
+    settings = {name: getattr(args, name) for name in DEFAULT_SETTINGS.keys()}
+    # The learner changes the working directory, hence we resolve paths first.
+    domain_dirs = find_domains(Path(args.benchmark_dir).resolve(), args.domains)
+    output = Path(args.output).resolve()
+    baseline = read_results(Path(args.baseline).resolve()) if args.baseline is not None else None
+    results = run_benchmarks(domain_dirs, Path(args.workspace).resolve(), settings, args.write_facts)
+    write_results(results, output)
+    print_results(results)
+    if baseline is not None:
+        regressions = compare_to_baseline(results, baseline, args.time_tolerance, args.memory_tolerance, args.min_seconds)
+        if regressions:
+            print("Regressions:")
+            for regression in regressions:
+                print("    " + regression)
+            sys.exit(1)
+        print("No regressions.")
@@ -1,3 +1,4 @@
+import logging
 import re
 
 from clingo import Control, Number, String, Model
@@ -6,15 +7,21 @@ from typing import List
 from learner.src.asp.returncodes import ClingoExitCode
 from learner.src.domain_data.domain_data import DomainData
 from learner.src.instance_data.instance_data import InstanceData
+from learner.src.util.file_system import create_directory_for_filename
 
 
-def on_model(model: Model):
-    print(model.optimality_proven)
-
 class ASPFactory:
-    def __init__(self, max_num_rules=2):
-        # self.ctl = Control(arguments=["--const", f"max_num_rules={max_num_rules}", "--parallel-mode=32", "--models=0", "--opt-mode=opt"])
-        self.ctl = Control(arguments=["--const", f"max_num_rules={max_num_rules}", "--models=0", "--opt-mode=opt"])
+    def __init__(self, max_num_rules=2, num_threads=1, configuration=None, opt_strategy=None):
+        """ num_threads > 1 solves with a portfolio of competing threads,
+            configuration and opt_strategy are passed to clingo's --configuration and --opt-strategy, e.g., "trendy" and "usc". """
+        arguments = ["--const", f"max_num_rules={max_num_rules}", "--models=0", "--opt-mode=opt"]
+        if num_threads > 1:
+            arguments.append(f"--parallel-mode={num_threads},compete")
+        if configuration is not None:
+            arguments.append(f"--configuration={configuration}")
+        if opt_strategy is not None:
+            arguments.append(f"--opt-strategy={opt_strategy}")
+        self.ctl = Control(arguments=arguments)
         # features
         self.ctl.add("select", ["f"], "select(f).")  # temp
         self.ctl.add("boolean", ["b"], "boolean(b).")
@@ -55,6 +62,8 @@ class ASPFactory:
         self.ctl.add("r_distance", ["i", "s", "r", "d"], "r_distance(i,s,r,d).")
         self.ctl.add("s_distance", ["i", "s1", "s2", "d"], "s_distance(i,s1,s2,d).")
         self.facts = None
+        self.cost = None
+        self.optimality_proven = False
 
     def load_problem_file(self, filename):
         self.ctl.load(str(filename))
@@ -63,7 +72,7 @@ class ASPFactory:
         facts = []
         # State space facts
         for instance_data in instance_datas:
-            for s_idx in instance_data.initial_s_idxs:
+            for s_idx in instance_data.get_selected_initial_s_idxs():
                 facts.append(("initial", [Number(instance_data.id), Number(s_idx)]))
             for s_idx in instance_data.state_space.get_states().keys():
                 facts.append(("state", [Number(instance_data.id), Number(s_idx)]))
@@ -190,7 +199,7 @@ class ASPFactory:
     def make_tuple_graph_facts(self, instance_datas: List[InstanceData]):
         facts = []
         for instance_data in instance_datas:
-            for s_idx, tuple_graph in instance_data.tuple_graphs.items():
+            for s_idx, tuple_graph in instance_data.get_tuple_graphs().items():
                 for d, s_prime_idxs in enumerate(tuple_graph.get_state_indices_by_distance()):
                     for s_prime_idx in s_prime_idxs:
                         facts.append(("s_distance", [Number(instance_data.id), Number(s_idx), Number(s_prime_idx), Number(d)]))
@@ -206,34 +215,86 @@ class ASPFactory:
         facts.extend(self.make_tuple_graph_facts(instance_datas))
         return facts
 
+    def write_facts(self, facts, filename):
+        """ Writes the facts as a logic program that can be loaded instead of grounding the facts. """
+        create_directory_for_filename(str(filename))
+        with open(filename, "w") as f:
+            for name, arguments in facts:
+                f.write(f"{name}({','.join(str(argument) for argument in arguments)}).\n")
+
     def ground(self, facts):
         self.facts = facts
         facts.append(("base", []))
         self.ctl.ground(facts)  # ground a set of facts
 
-    def solve(self):
-        """ https://potassco.org/clingo/python-api/current/clingo/solving.html """
-        with self.ctl.solve(yield_=True) as handle:
-            last_model = None
-            for model in handle:
-                last_model = model
-            if last_model is not None:
-                assert last_model.optimality_proven
-                return last_model.symbols(shown=True), ClingoExitCode.SATISFIABLE
+    def solve(self, time_budget: float = None):
+        """ https://potassco.org/clingo/python-api/current/clingo/solving.html
+
+        If time_budget is given then solving is interrupted after time_budget seconds
+        and the best model found so far is returned.
+        The cost of the returned model and whether it is optimal are stored in self.cost and self.optimality_proven.
+        """
+        self.cost = None
+        self.optimality_proven = False
+        best_model = []
+
+        def on_model(model: Model):
+            # The model is only valid inside of the callback, hence we copy what we need.
+            best_model[:] = [model.symbols(shown=True), list(model.cost), model.optimality_proven]
+
+        with self.ctl.solve(on_model=on_model, async_=True) as handle:
+            if not handle.wait(time_budget):
+                handle.cancel()
             result = handle.get()
-            if result.exhausted:
-                return None, ClingoExitCode.EXHAUSTED
-            elif result.unsatisfiable:
-                return None, ClingoExitCode.UNSATISFIABLE
-            elif result.unknown:
-                return None, ClingoExitCode.UNKNOWN
-            elif result.interrupted:
-                return None, ClingoExitCode.INTERRUPTED
+        if best_model:
+            symbols, self.cost, self.optimality_proven = best_model
+            # Exhausting the search space after the last model proves its optimality.
+            self.optimality_proven = self.optimality_proven or result.exhausted
+            return symbols, ClingoExitCode.SATISFIABLE
+        if result.unsatisfiable:
+            return None, ClingoExitCode.UNSATISFIABLE
+        elif result.interrupted:
+            return None, ClingoExitCode.INTERRUPTED
+        elif result.exhausted:
+            return None, ClingoExitCode.EXHAUSTED
+        return None, ClingoExitCode.UNKNOWN
+
+    def solve_within_budget(self, time_budget: float = None, num_retries: int = 0, retry_budget_factor: float = 2, accept_suboptimal: bool = True):
+        """ Solves with the given time budget and retries with a budget that is larger by retry_budget_factor
+            if no model was found, or if the model is not proven optimal and accept_suboptimal is False.
+            The model with the lowest cost over all attempts is returned, also if the last attempt found none,
+            such that no call runs longer than the final budget.
+        """
+        best = None  # (symbols, cost, optimality_proven)
+        for attempt in range(num_retries + 1):
+            symbols, returncode = self.solve(time_budget)
+            if returncode == ClingoExitCode.SATISFIABLE and (best is None or self.cost < best[1]):
+                best = (symbols, self.cost, self.optimality_proven)
+            if time_budget is None or attempt == num_retries:
+                break
+            if returncode == ClingoExitCode.SATISFIABLE and (self.optimality_proven or accept_suboptimal):
+                break
+            if returncode == ClingoExitCode.UNSATISFIABLE:
+                break
+            logging.info(f"No {'model' if symbols is None else 'optimal model'} within {time_budget} seconds, retrying.")
+            time_budget *= retry_budget_factor
+        if best is not None:
+            symbols, self.cost, self.optimality_proven = best
+            returncode = ClingoExitCode.SATISFIABLE
+            if not self.optimality_proven:
+                logging.warning(f"Using a model that is not proven optimal with cost {self.cost}.")
+        return symbols, returncode
+
+    def get_ground_program_size(self):
+        """ Returns the number of atoms and rules of the ground program, available after solving. """
+        lp_statistics = self.ctl.statistics["problem"]["lp"]
+        return {"num_atoms": int(lp_statistics["atoms"]), "num_rules": int(lp_statistics["rules"])}
 
     def print_statistics(self):
         print("Clingo statistics:")
         print(self.ctl.statistics["summary"])
         print("Solution cost:", self.ctl.statistics["summary"]["costs"])  # Note: we add +1 cost to each feature
         print("Total time:", self.ctl.statistics["summary"]["times"]["total"])
+        print("Optimality proven:", self.optimality_proven)
         print("CPU time:", self.ctl.statistics["summary"]["times"]["cpu"])
         print("Solve time:", self.ctl.statistics["summary"]["times"]["solve"])
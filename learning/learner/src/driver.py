@@ -98,7 +98,9 @@ class StepRunner:
 
     def teardown(self, quiet):
         if quiet:
-            logging.getLogger().setLevel(self.loglevel)
+            # The level is only stored in the process that ran setup, which is the subprocess of a SubprocessStepRunner.
+            if self.loglevel is not None:
+                logging.getLogger().setLevel(self.loglevel)
         else:
             current = self.elapsed_time()
             print(console.header("END OF STEP #{}: {}. {:.2f} CPU sec - {:.2f} MB".format(
@@ -133,15 +135,38 @@ class StepRunner:
         return exitcode
 
 
+def _run_and_send(runner, config, connection):
+    """ Entry point of the subprocess spawned by SubprocessStepRunner """
+    try:
+        connection.send((True, StepRunner._run(runner, config)))
+    except Exception as exception:
+        connection.send((False, exception))
+    finally:
+        connection.close()
+
+
 class SubprocessStepRunner(StepRunner):
-    """ Run the given step by spawning a subprocess and waiting for its finalization """
+    """ Run the given step by spawning a subprocess and waiting for its finalization.
+        We do not use a multiprocessing.Pool because its workers are daemonic
+        and hence the step could not spawn worker processes itself.
+    """
     def _run(self, config):
-        pool = multiprocessing.Pool(processes=1)
-        result = pool.apply_async(StepRunner._run, (), {"self": self, "config": config})
-        exitcode = result.get()
-        pool.close()
-        pool.join()
-        return exitcode
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.Process(target=_run_and_send, args=(self, config, sender))
+        process.start()
+        sender.close()
+        try:
+            success, result = receiver.recv()
+        except EOFError:
+            # The subprocess sent nothing, e.g., because it called exit() or was killed when running out of memory.
+            process.join()
+            raise CriticalPipelineError("Error: the subprocess of the step exited with code {} without a result".format(process.exitcode))
+        finally:
+            receiver.close()
+        process.join()
+        if not success:
+            raise result
+        return result
 
     def used_memory(self):
         info_children = resource.getrusage(resource.RUSAGE_CHILDREN)
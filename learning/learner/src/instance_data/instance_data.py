@@ -20,7 +20,10 @@ class InstanceData:
     state_space: dlplan.StateSpace = None
     goal_distances: Dict[int, int] = None
     tuple_graphs: Dict[int, dlplan.TupleGraph] = None
+    tuple_graph_cache: "TupleGraphCache" = None  # if set then tuple graphs are built on first access
     initial_s_idxs: List[int] = None  # in cases we need multiple initial states
+    selected_initial_s_idxs: List[int] = None  # subset of initial states used for learning, None means all initial states
+    is_isomorphic_duplicate: bool = False  # True if another instance with equal fingerprint is used for learning instead
     feature_valuations: List[StateFeatureValuation] = None
     boolean_feature_valuations: Dict[int, List[bool]] = None
     numerical_feature_valuations: Dict[int, List[int]] = None
@@ -33,12 +36,10 @@ class InstanceData:
             create_experiment_workspace(self.instance_information.workspace, False)
             write_file(self.instance_information.workspace / f"{self.instance_information.name}.dot", state_space.to_dot(1))
 
-    def set_tuple_graphs(self, tuple_graphs: Dict[int, dlplan.TupleGraph], create_dump: bool = False):
-        self.tuple_graphs = tuple_graphs
-        if create_dump:
-            for tuple_graph in tuple_graphs.values():
-                create_experiment_workspace(self.instance_information.workspace / "tuple_graphs", False)
-                write_file(self.instance_information.workspace / "tuple_graphs" / f"{tuple_graph.get_root_state_index()}.dot", tuple_graph.to_dot(1))
+    def get_tuple_graphs(self) -> Dict[int, dlplan.TupleGraph]:
+        if self.tuple_graph_cache is not None:
+            return self.tuple_graph_cache.get_tuple_graphs(self)
+        return self.tuple_graphs
 
     def set_feature_valuations(self, feature_valuations: List[StateFeatureValuation], create_dump=False):
         self.feature_valuations = feature_valuations
@@ -55,6 +56,11 @@ class InstanceData:
     def set_goal_distances(self, goal_distances: Dict[int, int]):
         self.goal_distances =  goal_distances
 
+    def get_selected_initial_s_idxs(self):
+        if self.selected_initial_s_idxs is None:
+            return self.initial_s_idxs
+        return self.selected_initial_s_idxs
+
     def is_deadend(self, s_idx: int):
         return self.goal_distances.get(s_idx, None) is None
 
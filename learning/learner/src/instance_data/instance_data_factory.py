@@ -9,7 +9,7 @@ from learner.src.util.file_system import remove_directory
 
 
 class InstanceDataFactory:
-    def make_instance_datas(self, config):
+    def make_instance_datas(self, config, rng):
         cwd = os.getcwd()
         vocabulary_info = None
         instance_datas = []
@@ -47,6 +47,8 @@ class InstanceDataFactory:
                 instance_data.set_goal_distances(goal_distances)
                 if config.closed_Q:
                     instance_data.initial_s_idxs = [s_idx for s_idx in state_space.get_states().keys() if instance_data.is_alive(s_idx)]
+                    if config.num_sampled_initial_states is not None:
+                        instance_data.selected_initial_s_idxs = self._sample_initial_s_idxs(config, rng, instance_data)
                 else:
                     instance_data.initial_s_idxs = [state_space.get_initial_state_index(),]
                 instance_datas.append(instance_data)
@@ -57,3 +59,13 @@ class InstanceDataFactory:
         # change back working directory
         os.chdir(cwd)
         return instance_datas, domain_data
+
+    def _sample_initial_s_idxs(self, config, rng, instance_data: InstanceData):
+        """ Samples a subset of the initial states that always contains the initial state of the instance if it is alive. """
+        initial_s_idx = instance_data.state_space.get_initial_state_index()
+        sampled_s_idxs = [initial_s_idx] if instance_data.is_alive(initial_s_idx) else []
+        candidate_s_idxs = sorted(s_idx for s_idx in instance_data.initial_s_idxs if s_idx != initial_s_idx)
+        num_samples = min(max(0, config.num_sampled_initial_states - len(sampled_s_idxs)), len(candidate_s_idxs))
+        if num_samples > 0:
+            sampled_s_idxs.extend(int(s_idx) for s_idx in rng.choice(candidate_s_idxs, num_samples, replace=False))
+        return sorted(sampled_s_idxs)
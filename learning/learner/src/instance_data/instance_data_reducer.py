@@ -0,0 +1,83 @@
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Dict, List
+
+from learner.src.instance_data.instance_data import InstanceData
+
+
+@dataclass
+class InstanceDataReducerStatistics:
+    num_instances: int = 0
+    num_representatives: int = 0
+
+    def print(self):
+        print("InstanceDataReducerStatistics:")
+        print("    num_instances:", self.num_instances)
+        print("    num_representatives:", self.num_representatives)
+
+
+class InstanceDataReducer:
+    """
+    Partitions instances into classes of likely isomorphic instances.
+
+    Two instances are likely isomorphic if color refinement (1-dimensional Weisfeiler-Lehman)
+    of their state spaces yields the same multiset of colors. Initial colors distinguish
+    initial states, goal states and the number of atoms in a state.
+    Color refinement never separates isomorphic instances but it might fail
+    to separate non isomorphic ones. Hence, the duplicates must still be verified.
+    """
+    def __init__(self):
+        self.signature_to_color = dict()  # shared by all instances such that colors are comparable
+        self.statistics = InstanceDataReducerStatistics()
+
+    def reduce(self, instance_datas: List[InstanceData]):
+        """ Returns the representatives, i.e., the first instance of each class, and the remaining duplicates. """
+        fingerprints = set()
+        representatives = []
+        duplicates = []
+        for instance_data in instance_datas:
+            fingerprint = self.compute_fingerprint(instance_data)
+            if fingerprint in fingerprints:
+                duplicates.append(instance_data)
+            else:
+                fingerprints.add(fingerprint)
+                representatives.append(instance_data)
+        self.statistics.num_instances += len(instance_datas)
+        self.statistics.num_representatives += len(representatives)
+        return representatives, duplicates
+
+    def compute_fingerprint(self, instance_data: InstanceData):
+        state_space = instance_data.state_space
+        states = state_space.get_states()
+        goal_s_idxs = set(state_space.get_goal_state_indices())
+        initial_s_idxs = set(instance_data.initial_s_idxs)
+        forward_successors = state_space.get_forward_successor_state_indices()
+        successors = {s_idx: [s_prime_idx for s_prime_idx in forward_successors.get(s_idx, []) if s_prime_idx in states] for s_idx in states.keys()}
+        predecessors = defaultdict(list)
+        for s_idx, s_prime_idxs in successors.items():
+            for s_prime_idx in s_prime_idxs:
+                predecessors[s_prime_idx].append(s_idx)
+        colors = {s_idx: self._get_color((s_idx in initial_s_idxs, s_idx in goal_s_idxs, len(state.get_atom_indices()))) for s_idx, state in states.items()}
+        num_colors = len(set(colors.values()))
+        while True:
+            colors = self._refine(colors, successors, predecessors)
+            new_num_colors = len(set(colors.values()))
+            if new_num_colors == num_colors:
+                break
+            num_colors = new_num_colors
+        num_transitions = sum(len(s_prime_idxs) for s_prime_idxs in successors.values())
+        return (len(states), num_transitions, tuple(sorted(Counter(colors.values()).items())))
+
+    def _refine(self, colors: Dict[int, int], successors: Dict[int, List[int]], predecessors: Dict[int, List[int]]):
+        return {s_idx: self._get_color((
+            color,
+            tuple(sorted(colors[s_prime_idx] for s_prime_idx in successors[s_idx])),
+            tuple(sorted(colors[s_prime_idx] for s_prime_idx in predecessors[s_idx]))))
+            for s_idx, color in colors.items()}
+
+    def _get_color(self, signature: tuple):
+        color = self.signature_to_color.get(signature, None)
+        if color is None:
+            color = len(self.signature_to_color)
+            self.signature_to_color[signature] = color
+        return color
@@ -6,12 +6,13 @@ from typing import  List, Dict
 
 from learner.src.instance_data.instance_information import InstanceInformation
 from learner.src.instance_data.instance_data import InstanceData
-from learner.src.instance_data.tuple_graph_factory import TupleGraphFactory
 from learner.src.iteration_data.sketch import Sketch
 
 
 class SubproblemInstanceDataFactory:
-    def make_subproblems(self, config, instance_datas: List[InstanceData], sketch: Sketch, rule: dlplan.Rule, r_idx: int, width: int):
+    """ Isomorphic subproblems are kept because the sketch of the child node must also be verified on them,
+        learn_sketch only learns from their representatives if eliminate_isomorphic_instances is set. """
+    def make_subproblems(self, config, instance_datas: List[InstanceData], sketch: Sketch, rule: dlplan.Rule, r_idx: int):
         features = list(sketch.dlplan_policy.get_booleans()) + list(sketch.dlplan_policy.get_numericals())
         subproblem_instance_datas = []
         for instance_data in instance_datas:
@@ -97,8 +98,6 @@ class SubproblemInstanceDataFactory:
                     if not subproblem_instance_data.is_alive(initial_s_idx):
                         continue
                     assert all([subproblem_instance_data.is_alive(initial_s_idx) for initial_s_idx in subproblem_instance_data.initial_s_idxs])
-                    # 2.2.1. Recompute tuple graph for restricted state space
-                    subproblem_instance_data.set_tuple_graphs(TupleGraphFactory(width).make_tuple_graphs(subproblem_instance_data))
                     subproblem_instance_datas.append(subproblem_instance_data)
                 instance_data.state_space.set_goal_state_indices(old_goal_state_indices)
                 instance_data.goal_distances = old_goal_distances
@@ -0,0 +1,206 @@
+import os
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List
+
+from learner.src.instance_data.tuple_graph_factory import TupleGraphFactory
+from learner.src.util.file_system import create_directory_for_filename
+from learner.src.util.parallel import parallel_map
+from learner.src.util.serialization import serialize, deserialize
+from learner.src.util.tracing import span
+
+
+# Bytes per tuple node and per state index of a tuple node in a TupleGraphSnapshot
+# that was unpickled from a worker, including the state indices by distance.
+# Fitted with tracemalloc on random snapshots with 1 to 20 state indices per tuple node,
+# the estimates were within 5% of the measured sizes. dlplan.TupleGraphs are not measured.
+BYTES_PER_TUPLE_NODE = 300
+BYTES_PER_STATE_INDEX = 80
+
+
+class TupleNodeSnapshot:
+    """ Pure Python copy of a dlplan.TupleNode. """
+    def __init__(self, tuple_index: int, state_indices: List[int]):
+        self.tuple_index = tuple_index
+        self.state_indices = state_indices
+
+    def get_tuple_index(self):
+        return self.tuple_index
+
+    def get_state_indices(self):
+        return self.state_indices
+
+
+class TupleGraphSnapshot:
+    """ Pure Python copy of a dlplan.TupleGraph that can be pickled. """
+    def __init__(self, tuple_graph):
+        self.root_state_index = tuple_graph.get_root_state_index()
+        self.state_indices_by_distance = [list(s_idxs) for s_idxs in tuple_graph.get_state_indices_by_distance()]
+        self.tuple_nodes_by_distance = [
+            [TupleNodeSnapshot(tuple_node.get_tuple_index(), list(tuple_node.get_state_indices())) for tuple_node in tuple_nodes]
+            for tuple_nodes in tuple_graph.get_tuple_nodes_by_distance()]
+
+    def get_root_state_index(self):
+        return self.root_state_index
+
+    def get_state_indices_by_distance(self):
+        return self.state_indices_by_distance
+
+    def get_tuple_nodes_by_distance(self):
+        return self.tuple_nodes_by_distance
+
+
+def estimate_tuple_graphs_size(tuple_graphs: Dict[int, object]):
+    """ Returns the estimated size of the tuple graphs in MB. """
+    num_tuple_nodes = 0
+    num_state_indices = 0
+    for tuple_graph in tuple_graphs.values():
+        for tuple_nodes in tuple_graph.get_tuple_nodes_by_distance():
+            num_tuple_nodes += len(tuple_nodes)
+            for tuple_node in tuple_nodes:
+                num_state_indices += len(tuple_node.get_state_indices())
+    return (num_tuple_nodes * BYTES_PER_TUPLE_NODE + num_state_indices * BYTES_PER_STATE_INDEX) / float(1024*1024)
+
+
+def _make_tuple_graph_snapshots(context, instance_pos: int):
+    """ Builds the tuple graphs of an instance as snapshots that can be sent from a worker to the parent process. """
+    tuple_graph_factory, instance_datas = context
+    tuple_graphs = tuple_graph_factory.make_tuple_graphs(instance_datas[instance_pos])
+    return {s_idx: TupleGraphSnapshot(tuple_graph) for s_idx, tuple_graph in tuple_graphs.items()}
+
+
+@dataclass
+class TupleGraphCacheStatistics:
+    num_hits: int = 0
+    num_builds: int = 0
+    num_reloads: int = 0
+    num_evictions: int = 0
+    num_spills: int = 0
+    peak_size_mb: float = 0
+
+    def print(self):
+        print("TupleGraphCacheStatistics:")
+        print("    num_hits:", self.num_hits)
+        print("    num_builds:", self.num_builds)
+        print("    num_reloads:", self.num_reloads)
+        print("    num_evictions:", self.num_evictions)
+        print("    num_spills:", self.num_spills)
+        print("    peak_size_mb: {:.2f}".format(self.peak_size_mb))
+
+
+class TupleGraphCache:
+    """
+    Builds the tuple graphs of an instance on first access and keeps them in an LRU cache.
+
+    If the estimated size of the cached tuple graphs exceeds `memory_limit_mb` then the least recently
+    used tuple graphs are evicted. If `spill_directory` is given then evicted tuple graphs are
+    written to disk and reloaded from there, otherwise they are rebuilt on the next access.
+    The tuple graphs of the most recently accessed instance are never evicted.
+
+    Tuple graphs that forked worker processes build on access are lost when the workers exit,
+    hence make_tuple_graphs should be called before instances are processed in parallel.
+    """
+    def __init__(self, width: int, memory_limit_mb: float = None, spill_directory: Path = None):
+        self.tuple_graph_factory = TupleGraphFactory(width)
+        self.memory_limit_mb = memory_limit_mb
+        self.spill_directory = spill_directory
+        self.instance_idx_to_entry = OrderedDict()  # instance idx -> (tuple graphs, size in MB)
+        self.size_mb = 0
+        self.statistics = TupleGraphCacheStatistics()
+
+    def get_tuple_graphs(self, instance_data):
+        entry = self.instance_idx_to_entry.get(instance_data.id, None)
+        if entry is not None:
+            self.statistics.num_hits += 1
+            self.instance_idx_to_entry.move_to_end(instance_data.id)
+            return entry[0]
+        spill_filename = self._get_spill_filename(instance_data.id)
+        if spill_filename is not None and spill_filename.is_file():
+            self.statistics.num_reloads += 1
+            with span("TupleGraphs.reload", instance=instance_data.id):
+                tuple_graphs = deserialize(spill_filename)
+        else:
+            self.statistics.num_builds += 1
+            with span("TupleGraphs", instance=instance_data.id):
+                tuple_graphs = self.tuple_graph_factory.make_tuple_graphs(instance_data)
+        self._insert(instance_data.id, tuple_graphs)
+        return tuple_graphs
+
+    def make_tuple_graphs(self, instance_datas, num_workers: int = 1):
+        """ Builds the tuple graphs of the instances that are neither cached nor spilled.
+
+        If num_workers > 1 then the tuple graphs are built by forked worker processes
+        and inserted into this cache as snapshots, in the order of the instances and only
+        as long as they fit into `memory_limit_mb` together with the cached tuple graphs of
+        the instances. The tuple graphs of the remaining instances are built on access,
+        i.e., by the workers that process the instances in parallel, and are not cached.
+        Otherwise, they are built on first access.
+        """
+        if num_workers <= 1:
+            return
+        budget_mb = self.memory_limit_mb
+        for instance_data in instance_datas:
+            entry = self.instance_idx_to_entry.get(instance_data.id, None)
+            if entry is not None:
+                # Evict tuple graphs of other instances first.
+                self.instance_idx_to_entry.move_to_end(instance_data.id)
+                if budget_mb is not None:
+                    budget_mb -= entry[1]
+        missing_instance_datas = [instance_data for instance_data in instance_datas if self._is_missing(instance_data.id)]
+        if not missing_instance_datas:
+            return
+        with span("TupleGraphs", num_instances=len(missing_instance_datas)):
+            context = (self.tuple_graph_factory, missing_instance_datas)
+            snapshots = parallel_map(_make_tuple_graph_snapshots, context, range(len(missing_instance_datas)), num_workers)
+            for instance_data, tuple_graphs in zip(missing_instance_datas, snapshots):
+                if budget_mb is not None:
+                    budget_mb -= estimate_tuple_graphs_size(tuple_graphs)
+                    if budget_mb < 0:
+                        # Inserting would evict tuple graphs that were just built.
+                        snapshots.close()
+                        break
+                self.statistics.num_builds += 1
+                self._insert(instance_data.id, tuple_graphs)
+
+    def _is_missing(self, instance_idx: int):
+        if instance_idx in self.instance_idx_to_entry:
+            return False
+        spill_filename = self._get_spill_filename(instance_idx)
+        return spill_filename is None or not spill_filename.is_file()
+
+    def _insert(self, instance_idx: int, tuple_graphs):
+        size_mb = estimate_tuple_graphs_size(tuple_graphs)
+        self.instance_idx_to_entry[instance_idx] = (tuple_graphs, size_mb)
+        self.size_mb += size_mb
+        self.statistics.peak_size_mb = max(self.statistics.peak_size_mb, self.size_mb)
+        self._evict()
+
+    def clear(self):
+        self.instance_idx_to_entry.clear()
+        self.size_mb = 0
+
+    def _evict(self):
+        if self.memory_limit_mb is None:
+            return
+        while self.size_mb > self.memory_limit_mb and len(self.instance_idx_to_entry) > 1:
+            instance_idx, (tuple_graphs, size_mb) = self.instance_idx_to_entry.popitem(last=False)
+            self.size_mb -= size_mb
+            self.statistics.num_evictions += 1
+            spill_filename = self._get_spill_filename(instance_idx)
+            if spill_filename is not None and not spill_filename.is_file():
+                self.statistics.num_spills += 1
+                self._spill(tuple_graphs, spill_filename)
+
+    def _spill(self, tuple_graphs, spill_filename: Path):
+        create_directory_for_filename(str(spill_filename))
+        # Worker processes may spill the same instance, hence we write to a temporary file first.
+        tmp_filename = spill_filename.with_suffix(f".{os.getpid()}.tmp")
+        serialize({s_idx: TupleGraphSnapshot(tuple_graph) for s_idx, tuple_graph in tuple_graphs.items()}, tmp_filename)
+        os.replace(tmp_filename, spill_filename)
+
+    def _get_spill_filename(self, instance_idx: int):
+        if self.spill_directory is None:
+            return None
+        return Path(self.spill_directory) / f"{instance_idx}.pickle"
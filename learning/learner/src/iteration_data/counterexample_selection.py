@@ -0,0 +1,51 @@
+from collections import OrderedDict
+from typing import Hashable, List, Tuple
+
+from learner.src.instance_data.instance_data import InstanceData
+
+
+def is_greedy_counterexample_strategy(config):
+    """ Returns True iff the first failing instances already determine the selection,
+        such that verification can stop after `config.num_counterexamples` failures. """
+    return config.counterexample_strategy == "size"
+
+
+def select_counterexamples(config, unsolved_instances: List[Tuple[InstanceData, Hashable]]):
+    """ Selects up to `config.num_counterexamples` instances from the unsolved instances.
+
+    Args:
+        unsolved_instances: pairs of unsolved instance and reason of failure, sorted by instance size.
+
+    Strategies:
+        size: the smallest unsolved instances.
+        diversity: the smallest unsolved instance for each reason of failure in round-robin fashion.
+    """
+    if config.counterexample_strategy == "size":
+        return [instance_data for instance_data, _ in unsolved_instances[:config.num_counterexamples]]
+    elif config.counterexample_strategy == "diversity":
+        failure_to_instance_datas = OrderedDict()
+        for instance_data, failure in unsolved_instances:
+            failure_to_instance_datas.setdefault(failure, []).append(instance_data)
+        counterexamples = []
+        rank = 0
+        while len(counterexamples) < min(config.num_counterexamples, len(unsolved_instances)):
+            for instance_datas in failure_to_instance_datas.values():
+                if rank < len(instance_datas) and len(counterexamples) < config.num_counterexamples:
+                    counterexamples.append(instance_datas[rank])
+            rank += 1
+        return sorted(counterexamples, key=lambda x: x.id)
+    else:
+        raise RuntimeError(f'Unknown counterexample strategy "{config.counterexample_strategy}"')
+
+
+def update_selected_instance_idxs(selected_instance_idxs: List[int], counterexamples: List[InstanceData]):
+    """ Adds the counterexamples to the selected instances.
+        If all counterexamples are larger than the selected instances
+        then we continue learning from the counterexamples only.
+        Duplicates of isomorphic instances are always added because
+        they only fail if their fingerprint equals that of a different, solved instance. """
+    counterexample_idxs = [instance_data.id for instance_data in counterexamples]
+    if min(counterexample_idxs) > max(selected_instance_idxs) \
+        and not any(instance_data.is_isomorphic_duplicate for instance_data in counterexamples):
+        return counterexample_idxs
+    return selected_instance_idxs + [idx for idx in counterexample_idxs if idx not in selected_instance_idxs]
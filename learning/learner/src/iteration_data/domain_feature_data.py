@@ -23,6 +23,10 @@ class Features:
         else:
             self.f_repr_to_feature[f_repr].complexity = feature.complexity
 
+    def remove_feature(self, f_idx: int):
+        feature = self.f_idx_to_feature.pop(f_idx)
+        del self.f_repr_to_feature[feature.dlplan_feature.compute_repr()]
+
 
 class DomainFeatureData:
     """ DomainFeatureData stores all novel Boolean and Numerical features for a set of dlplan states. """
@@ -0,0 +1,72 @@
+from dataclasses import dataclass
+from typing import List
+
+from learner.src.domain_data.domain_data import DomainData
+from learner.src.instance_data.instance_data import InstanceData
+from learner.src.iteration_data.domain_feature_data import Features
+
+
+@dataclass
+class DomainFeatureDataReducerStatistics:
+    num_boolean_features_before: int = 0
+    num_numerical_features_before: int = 0
+    num_boolean_features_after: int = 0
+    num_numerical_features_after: int = 0
+
+    def print(self):
+        print("DomainFeatureDataReducerStatistics:")
+        print("    num_boolean_features:", self.num_boolean_features_before, "->", self.num_boolean_features_after)
+        print("    num_numerical_features:", self.num_numerical_features_before, "->", self.num_numerical_features_after)
+
+
+class DomainFeatureDataReducer:
+    """
+    Removes features that are indistinguishable on the given instances.
+
+    Two features of the same type are equivalent iff they have the same valuation
+    on every state of every given instance. From each equivalence class only
+    the feature with lowest complexity is kept because the ASP can never
+    distinguish the remaining ones on the training data.
+    Boolean and numerical features are reduced separately.
+    """
+    def __init__(self):
+        self.statistics = DomainFeatureDataReducerStatistics()
+
+    def reduce(self, domain_data: DomainData, instance_datas: List[InstanceData]):
+        """ Requires that feature valuations were computed for all given instances. """
+        boolean_features = domain_data.domain_feature_data.boolean_features
+        numerical_features = domain_data.domain_feature_data.numerical_features
+        self.statistics.num_boolean_features_before += len(boolean_features.f_idx_to_feature)
+        self.statistics.num_numerical_features_before += len(numerical_features.f_idx_to_feature)
+        removed_b_idxs = self._reduce_features(boolean_features, [instance_data.boolean_feature_valuations for instance_data in instance_datas])
+        removed_n_idxs = self._reduce_features(numerical_features, [instance_data.numerical_feature_valuations for instance_data in instance_datas])
+        for instance_data in instance_datas:
+            for b_idx in removed_b_idxs:
+                del instance_data.boolean_feature_valuations[b_idx]
+            for n_idx in removed_n_idxs:
+                del instance_data.numerical_feature_valuations[n_idx]
+            for feature_valuation in instance_data.feature_valuations.values():
+                for b_idx in removed_b_idxs:
+                    del feature_valuation.b_idx_to_val[b_idx]
+                for n_idx in removed_n_idxs:
+                    del feature_valuation.n_idx_to_val[n_idx]
+        self.statistics.num_boolean_features_after += len(boolean_features.f_idx_to_feature)
+        self.statistics.num_numerical_features_after += len(numerical_features.f_idx_to_feature)
+
+    def _reduce_features(self, features: Features, f_idx_to_valuations_per_instance):
+        """ Returns the indices of the removed features. """
+        valuations_to_f_idx = dict()
+        removed_f_idxs = []
+        for f_idx, feature in features.f_idx_to_feature.items():
+            valuations = tuple(tuple(f_idx_to_valuations[f_idx]) for f_idx_to_valuations in f_idx_to_valuations_per_instance)
+            representative_f_idx = valuations_to_f_idx.get(valuations, None)
+            if representative_f_idx is None:
+                valuations_to_f_idx[valuations] = f_idx
+            elif feature.complexity < features.f_idx_to_feature[representative_f_idx].complexity:
+                valuations_to_f_idx[valuations] = f_idx
+                removed_f_idxs.append(representative_f_idx)
+            else:
+                removed_f_idxs.append(f_idx)
+        for f_idx in removed_f_idxs:
+            features.remove_feature(f_idx)
+        return removed_f_idxs
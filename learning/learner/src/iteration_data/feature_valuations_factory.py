@@ -1,27 +1,86 @@
-from typing import Dict
-from collections import defaultdict
+import math
+import numpy as np
+
+from multiprocessing import shared_memory
+from typing import Dict, List
 
 from learner.src.instance_data.instance_data import InstanceData
+from learner.src.iteration_data.domain_feature_data import Feature
 from learner.src.iteration_data.feature_valuations import StateFeatureValuation
+from learner.src.util.parallel import parallel_map
+
+
+def _evaluate_features_chunk(context, chunk):
+    """ Writes the valuations of a chunk of features of an instance into the shared array of the instance. """
+    instance_datas, valuation_arrays = context
+    instance_pos, rows_and_features = chunk
+    instance_data = instance_datas[instance_pos]
+    dlplan_states = list(instance_data.state_space.get_states().values())
+    for row, feature in rows_and_features:
+        valuation_arrays[instance_pos][row, :] = [feature.dlplan_feature.evaluate(dlplan_state, instance_data.denotations_caches) for dlplan_state in dlplan_states]
 
 
 class FeatureValuationsFactory:
-    def make_feature_valuations(self, instance_data: InstanceData) -> Dict[int, StateFeatureValuation]:
-        """ Evaluates the features on all states.
+    def make_feature_valuations(self, instance_datas: List[InstanceData], num_workers: int = 1):
+        """ Evaluates the features on all states of each instance.
+        """
+        boolean_feature_valuations = self.evaluate_features_of_instances(instance_datas, [instance_data.domain_data.domain_feature_data.boolean_features.f_idx_to_feature for instance_data in instance_datas], bool, num_workers)
+        numerical_feature_valuations = self.evaluate_features_of_instances(instance_datas, [instance_data.domain_data.domain_feature_data.numerical_features.f_idx_to_feature for instance_data in instance_datas], int, num_workers)
+        return [(self.make_state_feature_valuations(instance_data, boolean_feature_valuations[i], numerical_feature_valuations[i]), boolean_feature_valuations[i], numerical_feature_valuations[i])
+                for i, instance_data in enumerate(instance_datas)]
+
+    def evaluate_features(self, instance_data: InstanceData, f_idx_to_feature: Dict[int, Feature]) -> Dict[int, List[int]]:
+        """ Returns the valuations of each feature on all states in the order of the state space.
+        """
+        dlplan_states = list(instance_data.state_space.get_states().values())
+        feature_valuations = dict()
+        for f_idx, feature in f_idx_to_feature.items():
+            feature_valuations[f_idx] = [feature.dlplan_feature.evaluate(dlplan_state, instance_data.denotations_caches) for dlplan_state in dlplan_states]
+        return feature_valuations
+
+    def evaluate_features_of_instances(self, instance_datas: List[InstanceData], f_idx_to_features: List[Dict[int, Feature]], dtype, num_workers: int) -> List[Dict[int, List[int]]]:
+        """ Returns evaluate_features for each instance and its features.
+
+        If num_workers > 1 then chunks of features of an instance are evaluated in forked worker processes
+        that write into shared memory arrays that were allocated before forking.
+        Each worker fills its own copy of the DenotationsCaches of the instance,
+        which is discarded when the pool exits because dlplan objects cannot be sent to the parent.
+        Hence, the caches of the parent remain cold and evaluating the rules of the learned sketch
+        on the selected instances computes the denotations of the few features of the rules again.
+        This cost is recorded in the "SelectedVerification" and "Subproblems" spans of the trace.
+        """
+        if num_workers <= 1:
+            return [self.evaluate_features(instance_data, f_idx_to_feature) for instance_data, f_idx_to_feature in zip(instance_datas, f_idx_to_features)]
+        shms = []
+        valuation_arrays = []
+        chunks = []
+        chunk_size = max(1, math.ceil(sum(len(f_idx_to_feature) for f_idx_to_feature in f_idx_to_features) / (4 * num_workers)))
+        try:
+            for instance_pos, (instance_data, f_idx_to_feature) in enumerate(zip(instance_datas, f_idx_to_features)):
+                shape = (len(f_idx_to_feature), len(instance_data.state_space.get_states()))
+                shm = shared_memory.SharedMemory(create=True, size=max(1, shape[0] * shape[1] * np.dtype(dtype).itemsize))
+                shms.append(shm)
+                valuation_arrays.append(np.ndarray(shape, dtype=dtype, buffer=shm.buf))
+                rows_and_features = list(enumerate(f_idx_to_feature.values()))
+                for i in range(0, len(rows_and_features), chunk_size):
+                    chunks.append((instance_pos, rows_and_features[i:i+chunk_size]))
+            for _ in parallel_map(_evaluate_features_chunk, (instance_datas, valuation_arrays), chunks, num_workers):
+                pass
+            return [{f_idx: valuations for f_idx, valuations in zip(f_idx_to_feature.keys(), valuation_array.tolist())}
+                    for f_idx_to_feature, valuation_array in zip(f_idx_to_features, valuation_arrays)]
+        finally:
+            del valuation_arrays
+            for shm in shms:
+                shm.close()
+                shm.unlink()
+
+    def make_state_feature_valuations(self, instance_data: InstanceData, boolean_feature_valuations: Dict[int, List[bool]], numerical_feature_valuations: Dict[int, List[int]]) -> Dict[int, StateFeatureValuation]:
+        """ Transposes the valuations of each feature into the valuations of each state.
         """
         state_feature_valuations = dict()
-        boolean_feature_valuations = defaultdict(list)
-        numerical_feature_valuations = defaultdict(list)
-        for s_idx, dlplan_state in instance_data.state_space.get_states().items():
-            boolean_state_feature_valuations = dict()
-            for b_idx, boolean_feature in instance_data.domain_data.domain_feature_data.boolean_features.f_idx_to_feature.items():
-                valuation = boolean_feature.dlplan_feature.evaluate(dlplan_state, instance_data.denotations_caches)
-                boolean_state_feature_valuations[b_idx] = valuation
-                boolean_feature_valuations[b_idx].append(valuation)
-            numerical_state_feature_valuations = dict()
-            for n_idx, numerical_feature in instance_data.domain_data.domain_feature_data.numerical_features.f_idx_to_feature.items():
-                valuation = numerical_feature.dlplan_feature.evaluate(dlplan_state, instance_data.denotations_caches)
-                numerical_state_feature_valuations[n_idx] = valuation
-                numerical_feature_valuations[n_idx].append(valuation)
-            state_feature_valuations[s_idx] = StateFeatureValuation(s_idx, boolean_state_feature_valuations, numerical_state_feature_valuations)
-        return state_feature_valuations, boolean_feature_valuations, numerical_feature_valuations
+        for i, s_idx in enumerate(instance_data.state_space.get_states().keys()):
+            state_feature_valuations[s_idx] = StateFeatureValuation(
+                s_idx,
+                {b_idx: valuations[i] for b_idx, valuations in boolean_feature_valuations.items()},
+                {n_idx: valuations[i] for n_idx, valuations in numerical_feature_valuations.items()})
+        return state_feature_valuations
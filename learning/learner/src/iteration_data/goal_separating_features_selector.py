@@ -0,0 +1,172 @@
+import numpy as np
+import time
+
+from dataclasses import dataclass
+from typing import Dict, List
+
+from learner.src.domain_data.domain_data import DomainData
+from learner.src.instance_data.instance_data import InstanceData
+
+
+def count_bits(mask: int):
+    return bin(mask).count("1")
+
+
+class SelectorTimeout(Exception):
+    pass
+
+
+def check_deadline(deadline: float):
+    if time.perf_counter() > deadline:
+        raise SelectorTimeout()
+
+
+def make_mask(covered: np.ndarray):
+    """ Returns the integer whose bit i is covered[i]. """
+    return int.from_bytes(np.packbits(covered, bitorder="little").tobytes(), "little")
+
+
+@dataclass
+class GoalSeparatingFeaturesSelectorStatistics:
+    num_goal_valuations: int = 0
+    num_nongoal_valuations: int = 0
+    num_features: int = 0
+    num_undominated_features: int = 0
+    greedy_cost: int = 0
+    cost: int = 0
+    num_nodes: int = 0
+    optimality_proven: bool = False
+
+    def print(self):
+        print("GoalSeparatingFeaturesSelectorStatistics:")
+        print("    num_goal_valuations:", self.num_goal_valuations)
+        print("    num_nongoal_valuations:", self.num_nongoal_valuations)
+        print("    num_features:", self.num_features)
+        print("    num_undominated_features:", self.num_undominated_features)
+        print("    greedy_cost:", self.greedy_cost)
+        print("    cost:", self.cost)
+        print("    num_nodes:", self.num_nodes)
+        print("    optimality_proven:", self.optimality_proven)
+
+
+class GoalSeparatingFeaturesSelector:
+    """
+    Selects a set of Boolean features with minimum sum of complexities
+    that separates all goal states from all nongoal states, i.e., the same problem as goal-separating.lp.
+
+    States with the same valuation are collapsed into a single row.
+    Each pair of nongoal and goal valuation must be covered by a feature that differs on them.
+    A greedy set cover yields an upper bound that is then improved by a depth first branch-and-bound
+    that branches on the features covering an uncovered pair.
+    """
+    def __init__(self):
+        self.best_b_idxs = None
+        self.best_cost = None
+        self.statistics = GoalSeparatingFeaturesSelectorStatistics()
+
+    def select(self, domain_data: DomainData, instance_datas: List[InstanceData], time_limit: float):
+        """ Returns the indices of the selected Boolean features, or None if no optimal solution
+            was found within the time limit or if no solution exists.
+            After a timeout, self.best_b_idxs is the greedy solution if it was computed in time. """
+        deadline = time.perf_counter() + time_limit
+        try:
+            return self._select(domain_data, instance_datas, deadline)
+        except SelectorTimeout:
+            self.statistics.cost = self.best_cost
+            return None
+
+    def _select(self, domain_data: DomainData, instance_datas: List[InstanceData], deadline: float):
+        b_idx_to_feature = domain_data.domain_feature_data.boolean_features.f_idx_to_feature
+        b_idxs = list(b_idx_to_feature.keys())
+        goal_valuations = set()
+        nongoal_valuations = set()
+        for instance_data in instance_datas:
+            check_deadline(deadline)
+            for s_idx in instance_data.state_space.get_states().keys():
+                b_idx_to_val = instance_data.feature_valuations[s_idx].b_idx_to_val
+                valuation = tuple(bool(b_idx_to_val[b_idx]) for b_idx in b_idxs)
+                if instance_data.is_goal(s_idx):
+                    goal_valuations.add(valuation)
+                else:
+                    nongoal_valuations.add(valuation)
+        self.statistics.num_goal_valuations = len(goal_valuations)
+        self.statistics.num_nongoal_valuations = len(nongoal_valuations)
+        self.statistics.num_features = len(b_idxs)
+        if goal_valuations.intersection(nongoal_valuations):
+            # Some goal and nongoal state cannot be separated.
+            return None
+        goal_valuations = np.array(list(goal_valuations), dtype=bool).reshape(len(goal_valuations), len(b_idxs))
+        nongoal_valuations = np.array(list(nongoal_valuations), dtype=bool).reshape(len(nongoal_valuations), len(b_idxs))
+        # Each pair (nongoal i, goal j) is bit i * |goals| + j
+        full_mask = (1 << (len(nongoal_valuations) * len(goal_valuations))) - 1
+        b_idx_to_mask = dict()
+        b_idx_to_cost = dict()
+        for i, b_idx in enumerate(b_idxs):
+            check_deadline(deadline)
+            # The feature covers the pairs on which it differs.
+            b_idx_to_mask[b_idx] = make_mask((nongoal_valuations[:, i, np.newaxis] != goal_valuations[np.newaxis, :, i]).ravel())
+            b_idx_to_cost[b_idx] = b_idx_to_feature[b_idx].complexity
+        b_idxs = self._remove_dominated_features(b_idxs, b_idx_to_mask, b_idx_to_cost, deadline)
+        self.statistics.num_undominated_features = len(b_idxs)
+
+        selected_b_idxs = self._greedy_set_cover(b_idxs, b_idx_to_mask, b_idx_to_cost, full_mask, deadline)
+        self.best_b_idxs = selected_b_idxs
+        self.best_cost = sum(b_idx_to_cost[b_idx] for b_idx in selected_b_idxs)
+        self.statistics.greedy_cost = self.best_cost
+        # Cheap features first such that branches can be cut off early
+        b_idxs = sorted(b_idxs, key=lambda b_idx: (b_idx_to_cost[b_idx], -count_bits(b_idx_to_mask[b_idx])))
+        self._branch_and_bound(b_idxs, b_idx_to_mask, b_idx_to_cost, full_mask, 0, 0, [], frozenset(), deadline)
+        self.statistics.cost = self.best_cost
+        self.statistics.optimality_proven = True
+        return self.best_b_idxs
+
+    def _remove_dominated_features(self, b_idxs: List[int], b_idx_to_mask: Dict[int, int], b_idx_to_cost: Dict[int, int], deadline: float):
+        """ Removes features that cover nothing or a subset of a feature that costs at most as much. """
+        b_idxs = sorted([b_idx for b_idx in b_idxs if b_idx_to_mask[b_idx]], key=lambda b_idx: (b_idx_to_cost[b_idx], -count_bits(b_idx_to_mask[b_idx])))
+        undominated_b_idxs = []
+        for b_idx in b_idxs:
+            check_deadline(deadline)
+            mask = b_idx_to_mask[b_idx]
+            if any(mask & ~b_idx_to_mask[other_b_idx] == 0 for other_b_idx in undominated_b_idxs):
+                continue
+            undominated_b_idxs.append(b_idx)
+        return undominated_b_idxs
+
+    def _greedy_set_cover(self, b_idxs: List[int], b_idx_to_mask: Dict[int, int], b_idx_to_cost: Dict[int, int], full_mask: int, deadline: float):
+        selected_b_idxs = []
+        covered = 0
+        while covered != full_mask:
+            check_deadline(deadline)
+            best_b_idx = max(b_idxs, key=lambda b_idx: count_bits(b_idx_to_mask[b_idx] & ~covered) / b_idx_to_cost[b_idx])
+            selected_b_idxs.append(best_b_idx)
+            covered |= b_idx_to_mask[best_b_idx]
+        # Remove redundant features, most expensive first
+        for b_idx in sorted(selected_b_idxs, key=lambda b_idx: -b_idx_to_cost[b_idx]):
+            remaining_covered = 0
+            for other_b_idx in selected_b_idxs:
+                if other_b_idx != b_idx:
+                    remaining_covered |= b_idx_to_mask[other_b_idx]
+            if remaining_covered == full_mask:
+                selected_b_idxs.remove(b_idx)
+        return selected_b_idxs
+
+    def _branch_and_bound(self, b_idxs: List[int], b_idx_to_mask: Dict[int, int], b_idx_to_cost: Dict[int, int], full_mask: int, covered: int, cost: int, selected_b_idxs: List[int], excluded_b_idxs: frozenset, deadline: float):
+        self.statistics.num_nodes += 1
+        check_deadline(deadline)
+        if covered == full_mask:
+            if cost < self.best_cost:
+                self.best_cost = cost
+                self.best_b_idxs = list(selected_b_idxs)
+            return
+        uncovered = full_mask & ~covered
+        pair = uncovered & -uncovered
+        # Some feature must cover the pair, excluding features that were tried in previous branches
+        for b_idx in b_idxs:
+            if cost + b_idx_to_cost[b_idx] >= self.best_cost:
+                break
+            if b_idx in excluded_b_idxs or not b_idx_to_mask[b_idx] & pair:
+                continue
+            selected_b_idxs.append(b_idx)
+            self._branch_and_bound(b_idxs, b_idx_to_mask, b_idx_to_cost, full_mask, covered | b_idx_to_mask[b_idx], cost + b_idx_to_cost[b_idx], selected_b_idxs, excluded_b_idxs, deadline)
+            selected_b_idxs.pop()
+            excluded_b_idxs = excluded_b_idxs | {b_idx}
@@ -5,7 +5,7 @@ import logging
 from copy import deepcopy
 from termcolor import colored
 from pathlib import Path
-from typing import List
+from typing import Dict, List
 
 from learner.src.instance_data.instance_data import InstanceData
 from learner.src.domain_data.domain_data import DomainData
@@ -14,10 +14,22 @@ from learner.src.iteration_data.learning_statistics import LearningStatistics
 from learner.src.instance_data.subproblem_instance_data_factory import SubproblemInstanceDataFactory
 from learner.src.iteration_data.domain_feature_data import DomainFeatureData, Feature
 from learner.src.util.command import create_experiment_workspace, write_file
+from learner.src.util.file_system import write_object_to_file
+from learner.src.util.tracing import span
 from learner.src.iteration_data.learn_sketch_explicit import learn_sketch
 from learner.src.iteration_data.learn_goal_separating_features import learn_goal_separating_features
 
 
+def compute_subproblems_signature(instance_datas: List[InstanceData], width: int):
+    """ Returns a canonical signature of a set of subproblems that does not depend on their order or names. """
+    return (width, tuple(sorted((
+        str(instance_data.instance_information.filename),
+        tuple(sorted(instance_data.state_space.get_states().keys())),
+        tuple(sorted(instance_data.initial_s_idxs)),
+        tuple(sorted(instance_data.state_space.get_goal_state_indices())))
+        for instance_data in instance_datas)))
+
+
 def add_zero_cost_features(domain_feature_data: DomainFeatureData, booleans: List[dlplan.Boolean], numericals: List[dlplan.Numerical]):
     for boolean in booleans:
         domain_feature_data.boolean_features.add_feature(Feature(boolean, 1))
@@ -34,16 +46,20 @@ class HierarchicalSketch:
         instance_datas: List[InstanceData],
         zero_cost_domain_feature_data: DomainFeatureData,
         width: int,
-        rule: Sketch=None):
+        rule: Sketch=None,
+        sketch_cache: Dict[tuple, "HierarchicalSketch"]=None,
+        signature: tuple=None):
         assert width >= 0
         self.workspace_learning = workspace_learning
         self.workspace_output = workspace_output
         self.config = config
         self.domain_data = domain_data
-        self.instance_datas = instance_datas  # Q_n0
+        self.instance_datas = instance_datas  # Q_n0, None after the node was released
         self.zero_cost_domain_feature_data = zero_cost_domain_feature_data  # features that are used in sketches of the parents
         self.width = width  # width k of the subproblems in the current node. In the root we use config.width+1 such that first decompositions yields problems with width config.width
         self.rule = rule
+        self.sketch_cache = sketch_cache if sketch_cache is not None else dict()  # shared by all nodes, maps subproblems signatures to refined nodes
+        self.signature = signature  # the signature of Q_n0 if memoization is enabled
         if rule is None:
             self._initialize_goal_separating_features()
         else:
@@ -60,7 +76,8 @@ class HierarchicalSketch:
     def _initialize_goal_separating_features(self):
         """ Instead of computing rule {-G}->{G} consisting of goal separating features,
             we only compute the goal separating features to be reused in subsequent refinements. """
-        booleans, numericals = learn_goal_separating_features(self.config, self.domain_data, self.instance_datas, self.zero_cost_domain_feature_data, self.workspace_learning)
+        with span("GoalSeparatingFeatures"):
+            booleans, numericals = learn_goal_separating_features(self.config, self.domain_data, self.instance_datas, self.zero_cost_domain_feature_data, self.workspace_learning)
         add_zero_cost_features(self.zero_cost_domain_feature_data, booleans, numericals)
 
     def refine(self):
@@ -74,52 +91,96 @@ class HierarchicalSketch:
         if self.rule is not None:
             print(self.rule.dlplan_policy.compute_repr())
 
-        # Learn sketch for width k-1
-        self.sketch, self.sketch_minimized, self.statistics = learn_sketch(self.config, self.domain_data, self.instance_datas, self.zero_cost_domain_feature_data, self.workspace_learning, self.width - 1)
+        if self.config.memoize_sketches and self.signature is None:
+            self.signature = compute_subproblems_signature(self.instance_datas, self.width)
+        cached_hierarchical_sketch = self.sketch_cache.get(self.signature, None)
+        if cached_hierarchical_sketch is not None:
+            # Reuse sketch and children of a node with the same subproblems
+            print("Reusing sketch of", cached_hierarchical_sketch.workspace_output)
+            self.sketch = cached_hierarchical_sketch.sketch
+            self.sketch_minimized = cached_hierarchical_sketch.sketch_minimized
+            self.statistics = copy.deepcopy(cached_hierarchical_sketch.statistics)
+            self.statistics.num_cpu_seconds = 0
+        else:
+            # Learn sketch for width k-1
+            self.sketch, self.sketch_minimized, self.statistics = learn_sketch(self.config, self.domain_data, self.instance_datas, self.zero_cost_domain_feature_data, self.workspace_learning, self.width - 1)
+        if self.sketch is None:
+            # Unsolved node: no sketch was found, e.g., within the time budget, hence it has no children
+            logging.warning(colored(f"No sketch found for {self.workspace_output}, skipping its children", "red", "on_grey"))
+            return []
         create_experiment_workspace(str(self.workspace_learning), rm_if_existed=False)
         create_experiment_workspace(str(self.workspace_output), rm_if_existed=False)
         write_file(self.workspace_output / "sketch_str.txt", self.sketch.dlplan_policy.str())
         write_file(self.workspace_output / "sketch_repr.txt", self.sketch.dlplan_policy.compute_repr())
+        if cached_hierarchical_sketch is not None:
+            # Children have the same subproblems as the cached children and hence are reused when refined
+            for r_idx, cached_child in enumerate(cached_hierarchical_sketch.children):
+                self.children.append(self._make_child(r_idx, cached_child.instance_datas, cached_child.zero_cost_domain_feature_data, cached_child.rule, cached_child.signature))
+            return self.children
+        if self.signature is not None:
+            self.sketch_cache[self.signature] = self
+
         child_zero_cost_domain_feature_data = copy.copy(self.zero_cost_domain_feature_data)
         add_zero_cost_features(child_zero_cost_domain_feature_data, self.sketch.dlplan_policy.get_booleans(), self.sketch.dlplan_policy.get_numericals())
         # Inductive case: compute children n' of n
         for r_idx, rule in enumerate(self.sketch.dlplan_policy.get_rules()):
             # compute Q_n' of width k-1
-            subproblem_instance_datas = SubproblemInstanceDataFactory().make_subproblems(self.config, self.instance_datas, self.sketch, rule, r_idx, self.width - 1)
+            with span("Subproblems", rule=r_idx):
+                subproblem_instance_datas = SubproblemInstanceDataFactory().make_subproblems(self.config, self.instance_datas, self.sketch, rule, r_idx)
 
             rule_sketch = Sketch(self.domain_data.policy_builder.add_policy({rule}), self.width - 1)
 
-            child = HierarchicalSketch(
-                self.workspace_learning / f"rule_{r_idx}",
-                self.workspace_output / f"rule_{r_idx}",
-                self.config,
-                self.domain_data,
-                subproblem_instance_datas,
-                child_zero_cost_domain_feature_data,
-                self.width - 1,
-                rule_sketch)
-            self.children.append(child)
+            self.children.append(self._make_child(r_idx, subproblem_instance_datas, child_zero_cost_domain_feature_data, rule_sketch))
 
         return self.children
 
+    def _make_child(self, r_idx: int, subproblem_instance_datas: List[InstanceData], zero_cost_domain_feature_data: DomainFeatureData, rule_sketch: Sketch, signature: tuple=None):
+        return HierarchicalSketch(
+            self.workspace_learning / f"rule_{r_idx}",
+            self.workspace_output / f"rule_{r_idx}",
+            self.config,
+            self.domain_data,
+            subproblem_instance_datas,
+            zero_cost_domain_feature_data,
+            self.width - 1,
+            rule_sketch,
+            self.sketch_cache,
+            signature)
+
+    def release(self):
+        """ Drops the training data of a refined node.
+            Only the sketch, statistics, signature and children are kept.
+            Children of released nodes with the same signature are reused from the sketch cache. """
+        if self.instance_datas is None:
+            return
+        if self.config.spill_released_instance_datas:
+            write_object_to_file(str(self.workspace_learning / "instance_datas.json"), [{
+                "id": instance_data.id,
+                "name": instance_data.instance_information.name,
+                "filename": str(instance_data.instance_information.filename),
+                "states": sorted(instance_data.state_space.get_states().keys()),
+                "initial_states": sorted(instance_data.initial_s_idxs),
+                "goal_states": sorted(instance_data.state_space.get_goal_state_indices()),
+            } for instance_data in self.instance_datas])
+        self.instance_datas = None
+
     def print(self):
         """ Prints the hierarchical policy with indentation depending on the level of a node in the tree. """
         self.print_rec(level=0)
         print("Num features:", len(set([feature.compute_repr() for feature in self.collect_features()])))
-        print("Max feature complexity", max([feature.compute_complexity() for feature in self.collect_features()]))
+        print("Max feature complexity", max([feature.compute_complexity() for feature in self.collect_features()], default=0))
         print("Num rules:", len(set([rule.compute_repr() for rule in self.collect_rules()])))
         self.compute_overall_statistics().print()
 
     def print_rec(self, level):
         """ Print helper function. """
+        print(colored("    " * level + f"Level {level} sketch:", "green", "on_grey"))
         if self.sketch is not None:
-            print(colored("    " * level + f"Level {level} sketch:", "green", "on_grey"))
-            if self.sketch is not None:
-                print(self.sketch.dlplan_policy.str())
-                for child in self.children:
-                    child.print_rec(level+1)
-            else:
-                print("No sketch found.")
+            print(self.sketch.dlplan_policy.str())
+            for child in self.children:
+                child.print_rec(level+1)
+        else:
+            print("No sketch found.")
 
     def collect_features(self):
         """ Returns all features in the hierarchical policy. """
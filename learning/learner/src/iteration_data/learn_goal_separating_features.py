@@ -1,5 +1,6 @@
 import logging
 import dlplan
+import numpy as np
 import re
 
 from clingo import Symbol
@@ -11,42 +12,89 @@ from learner.src.asp.asp_factory import ASPFactory
 from learner.src.asp.returncodes import ClingoExitCode
 from learner.src.instance_data.instance_data import InstanceData
 from learner.src.instance_data.instance_information import InstanceInformation
+from learner.src.iteration_data.counterexample_selection import is_greedy_counterexample_strategy, select_counterexamples, update_selected_instance_idxs
 from learner.src.iteration_data.domain_feature_data_factory import DomainFeatureDataFactory
+from learner.src.iteration_data.domain_feature_data_reducer import DomainFeatureDataReducer
 from learner.src.iteration_data.feature_valuations_factory import FeatureValuationsFactory
+from learner.src.iteration_data.goal_separating_features_selector import GoalSeparatingFeaturesSelector
 from learner.src.util.timer import CountDownTimer
 from learner.src.util.command import create_experiment_workspace
 from learner.src.util.clock import Clock
+from learner.src.util.tracing import span
 from learner.src.domain_data.domain_data import DomainData
 
 
-def compute_state_b_values(booleans: List[dlplan.Boolean], numericals: List[dlplan.Numerical], instance_data: InstanceData, state: dlplan.State):
-    """ """
-    return tuple([boolean.evaluate(state) for boolean in booleans] + [numerical.evaluate(state) > 0 for numerical in numericals])
-
-
-def compute_smallest_unsolved_instance(booleans: List[dlplan.Boolean], numericals: List[dlplan.Numerical], instance_datas: List[InstanceData]):
-    """ """
+def compute_state_b_values(booleans: List[dlplan.Boolean], numericals: List[dlplan.Numerical], instance_data: InstanceData):
+    """ Returns the matrix of Boolean values of the features (columns) in all states (rows) in the order of the state space.
+        The valuations of the selected instances are reused, only features of other instances are evaluated. """
+    dlplan_states = list(instance_data.state_space.get_states().values())
+    boolean_feature_valuations = instance_data.boolean_feature_valuations or dict()
+    numerical_feature_valuations = instance_data.numerical_feature_valuations or dict()
+    b_values = np.zeros((len(dlplan_states), len(booleans) + len(numericals)), dtype=bool)
+    for f_idx, boolean in enumerate(booleans):
+        valuations = boolean_feature_valuations.get(boolean.get_index(), None)
+        if valuations is None:
+            valuations = [boolean.evaluate(dlplan_state, instance_data.denotations_caches) for dlplan_state in dlplan_states]
+        b_values[:, f_idx] = valuations
+    for f_idx, numerical in enumerate(numericals, len(booleans)):
+        valuations = numerical_feature_valuations.get(numerical.get_index(), None)
+        if valuations is None:
+            valuations = [numerical.evaluate(dlplan_state, instance_data.denotations_caches) for dlplan_state in dlplan_states]
+        b_values[:, f_idx] = np.asarray(valuations) > 0
+    return b_values
+
+
+def compute_unsolved_instances(booleans: List[dlplan.Boolean], numericals: List[dlplan.Numerical], instance_datas: List[InstanceData], max_num_unsolved_instances=None):
+    """ Returns pairs of unsolved instance and the b_values of its first goal/nongoal conflict, sorted by instance size.
+
+    States are processed in order and a state is conflicting if a state with the same b_values
+    but different goal status was processed before, possibly in a previous instance.
+    Within an instance, rows are grouped by their packed b_values such that each group
+    only requires a constant number of lookups in the b_values of previous instances.
+    """
+    unsolved_instances = []
     goal_b_values = set()
     nongoal_b_values = set()
     for instance_data in instance_datas:
-        for s_idx, state in instance_data.state_space.get_states().items():
-            b_values = compute_state_b_values(booleans, numericals, instance_data, state)
-            separating = True
-            if instance_data.is_goal(s_idx):
-                goal_b_values.add(b_values)
-                if b_values in nongoal_b_values:
-                    separating = False
-            else:
-                nongoal_b_values.add(b_values)
-                if b_values in goal_b_values:
-                    separating = False
-            if not separating:
+        if len(unsolved_instances) == max_num_unsolved_instances:
+            break
+        b_values = compute_state_b_values(booleans, numericals, instance_data)
+        num_states = b_values.shape[0]
+        is_goal = np.array([instance_data.is_goal(s_idx) for s_idx in instance_data.state_space.get_states().keys()], dtype=bool)
+        packed_b_values, representatives, groups = np.unique(np.packbits(b_values, axis=1), axis=0, return_index=True, return_inverse=True)
+        groups = groups.reshape(-1)
+        positions = np.arange(num_states)
+        # first position of a goal and nongoal state in each group, num_states if there is none
+        first_goal = np.full(len(representatives), num_states)
+        np.minimum.at(first_goal, groups[is_goal], positions[is_goal])
+        first_nongoal = np.full(len(representatives), num_states)
+        np.minimum.at(first_nongoal, groups[~is_goal], positions[~is_goal])
+        conflicting_position = num_states
+        conflicting_group = None
+        for group, key in enumerate(map(bytes, packed_b_values)):
+            position = num_states
+            if first_goal[group] < num_states and first_nongoal[group] < num_states:
+                position = max(first_goal[group], first_nongoal[group])
+            if key in nongoal_b_values:
+                position = min(position, first_goal[group])
+            if key in goal_b_values:
+                position = min(position, first_nongoal[group])
+            if position < conflicting_position:
+                conflicting_position = position
+                conflicting_group = group
+            if first_goal[group] < num_states:
+                goal_b_values.add(key)
+            if first_nongoal[group] < num_states:
+                nongoal_b_values.add(key)
+        if conflicting_group is not None:
+            conflicting_b_values = tuple(bool(b_value) for b_value in b_values[representatives[conflicting_group]])
+            if not unsolved_instances:
                 print("Features do not separate goals from non goals")
                 print("Booleans:")
-                print("State:", str(state))
-                print("b_values:", b_values)
-                return instance_data
-    return None
+                print("State:", str(list(instance_data.state_space.get_states().values())[conflicting_position]))
+                print("b_values:", conflicting_b_values)
+            unsolved_instances.append((instance_data, conflicting_b_values))
+    return unsolved_instances
 
 
 def parse_features_from_answer_set(symbols: List[Symbol], domain_data: DomainData):
@@ -65,6 +113,32 @@ def parse_features_from_answer_set(symbols: List[Symbol], domain_data: DomainDat
     return booleans, numericals
 
 
+def learn_features_from_answer_set(config, domain_data: DomainData, instance_datas: List[InstanceData]):
+    """ Learns goal separating features using goal-separating.lp, returns None if no model was found. """
+    asp_factory = ASPFactory(num_threads=config.asp_num_threads, configuration=config.asp_configuration, opt_strategy=config.asp_opt_strategy)
+    asp_factory.load_problem_file(config.asp_location / "goal-separating.lp")
+    facts = []
+    facts.extend(asp_factory.make_state_space_facts(instance_datas))
+    facts.extend(asp_factory.make_domain_feature_data_facts(domain_data))
+    facts.extend(asp_factory.make_instance_feature_data_facts(instance_datas))
+
+    logging.info(colored("Grounding Logic Program...", "blue", "on_grey"))
+    asp_factory.ground(facts)
+    logging.info(colored("..done", "blue", "on_grey"))
+
+    logging.info(colored("Solving Logic Program...", "blue", "on_grey"))
+    symbols, returncode = asp_factory.solve_within_budget(config.asp_time_budget, config.asp_num_retries, config.asp_retry_budget_factor, config.asp_accept_suboptimal)
+    if returncode == ClingoExitCode.UNSATISFIABLE:
+        print("UNSAT")
+        return None
+    elif returncode != ClingoExitCode.SATISFIABLE:
+        print("No model found within the time budget:", returncode)
+        return None
+    asp_factory.print_statistics()
+    logging.info(colored("..done", "blue", "on_grey"))
+    return parse_features_from_answer_set(symbols, domain_data)
+
+
 def learn_goal_separating_features(config, domain_data, instance_datas, zero_cost_domain_feature_data, workspace):
     """ Learns goal separating features
     """
@@ -81,6 +155,10 @@ def learn_goal_separating_features(config, domain_data, instance_datas, zero_cos
         logging.info(colored(f"Iteration: {i}", "red", "on_grey"))
 
         selected_instance_datas = [instance_datas[subproblem_idx] for subproblem_idx in selected_instance_idxs]
+        for instance_data in instance_datas:
+            # Valuations of instances that are no longer selected belong to the feature pool of a previous iteration.
+            instance_data.boolean_feature_valuations = None
+            instance_data.numerical_feature_valuations = None
         for instance_data in selected_instance_datas:
             instance_data.instance_information = InstanceInformation(
                 instance_data.instance_information.name,
@@ -100,51 +178,60 @@ def learn_goal_separating_features(config, domain_data, instance_datas, zero_cos
         logging.info(colored("..done", "blue", "on_grey"))
 
         logging.info(colored("Initializing InstanceFeatureDatas...", "blue", "on_grey"))
-        for instance_data in selected_instance_datas:
-            state_feature_valuations, boolean_feature_valuations, numerical_feature_valuations = FeatureValuationsFactory().make_feature_valuations(instance_data)
+        with span("FeatureValuations"):
+            feature_valuations = FeatureValuationsFactory().make_feature_valuations(selected_instance_datas, config.num_workers)
+        for instance_data, (state_feature_valuations, boolean_feature_valuations, numerical_feature_valuations) in zip(selected_instance_datas, feature_valuations):
             instance_data.set_feature_valuations(state_feature_valuations)
             instance_data.boolean_feature_valuations = boolean_feature_valuations
             instance_data.numerical_feature_valuations = numerical_feature_valuations
         logging.info(colored("..done", "blue", "on_grey"))
 
-        asp_factory = ASPFactory()
-        asp_factory.load_problem_file(config.asp_location / "goal-separating.lp")
-        facts = []
-        facts.extend(asp_factory.make_state_space_facts(selected_instance_datas))
-        facts.extend(asp_factory.make_domain_feature_data_facts(domain_data))
-        facts.extend(asp_factory.make_instance_feature_data_facts(selected_instance_datas))
-
-        logging.info(colored("Grounding Logic Program...", "blue", "on_grey"))
-        asp_factory.ground(facts)
-        logging.info(colored("..done", "blue", "on_grey"))
-
-        logging.info(colored("Solving Logic Program...", "blue", "on_grey"))
-        symbols, returncode = asp_factory.solve()
-        if returncode == ClingoExitCode.UNSATISFIABLE:
-            print("UNSAT")
-            exit(1)
-        asp_factory.print_statistics()
-        logging.info(colored("..done", "blue", "on_grey"))
+        domain_feature_data_reducer = DomainFeatureDataReducer()
+        if config.deduplicate_features:
+            logging.info(colored("Reducing DomainFeatureData...", "blue", "on_grey"))
+            domain_feature_data_reducer.reduce(domain_data, selected_instance_datas)
+            domain_feature_data_reducer.statistics.print()
+            logging.info(colored("..done", "blue", "on_grey"))
+
+        b_idxs = None
+        if config.goal_separating_selector_time_limit is not None:
+            logging.info(colored("Selecting goal separating features...", "blue", "on_grey"))
+            selector = GoalSeparatingFeaturesSelector()
+            with span("GoalSeparatingFeaturesSelector"):
+                b_idxs = selector.select(domain_data, selected_instance_datas, config.goal_separating_selector_time_limit)
+            selector.statistics.print()
+            logging.info(colored("..done", "blue", "on_grey"))
+        if b_idxs is not None:
+            booleans = [domain_data.domain_feature_data.boolean_features.f_idx_to_feature[b_idx].dlplan_feature for b_idx in b_idxs]
+            numericals = []
+        else:
+            with span("ASP"):
+                features = learn_features_from_answer_set(config, domain_data, selected_instance_datas)
+            if features is None:
+                # The features of the previous iteration are kept, they are only used at zero cost.
+                logging.warning("No goal separating features found, using the features of the previous iteration.")
+                break
+            booleans, numericals = features
 
         logging.info("Learned the following goal separating features:")
-        booleans, numericals = parse_features_from_answer_set(symbols, domain_data)
         print("\n".join([boolean.compute_repr() for boolean in booleans]))
         print("\n".join([numerical.compute_repr() for numerical in numericals]))
-        assert compute_smallest_unsolved_instance(booleans, numericals, selected_instance_datas) is None
+        assert not compute_unsolved_instances(booleans, numericals, selected_instance_datas)
 
         logging.info(colored("Verifying goal separating features...", "blue", "on_grey"))
-        smallest_unsolved_instance = compute_smallest_unsolved_instance(booleans, numericals, instance_datas)
+        max_num_unsolved_instances = config.num_counterexamples if is_greedy_counterexample_strategy(config) else None
+        with span("Verification"):
+            unsolved_instances = compute_unsolved_instances(booleans, numericals, instance_datas, max_num_unsolved_instances)
         logging.info(colored("..done", "blue", "on_grey"))
 
-        if smallest_unsolved_instance is None:
+        if not unsolved_instances:
             print(colored("Features separate all goal from non-goal states!", "red", "on_grey"))
             break
         else:
-            if smallest_unsolved_instance.id > max(selected_instance_idxs):
-                selected_instance_idxs = [smallest_unsolved_instance.id]
-            else:
-                selected_instance_idxs.append(smallest_unsolved_instance.id)
-            print("Smallest unsolved instance:", smallest_unsolved_instance.id)
+            counterexamples = select_counterexamples(config, unsolved_instances)
+            selected_instance_idxs = update_selected_instance_idxs(selected_instance_idxs, counterexamples)
+            print("Smallest unsolved instance:", unsolved_instances[0][0].id)
+            print("Selected counterexamples:", [instance_data.id for instance_data in counterexamples])
             print("Selected instances:", selected_instance_idxs)
         i += 1
     clock.set_accumulate()
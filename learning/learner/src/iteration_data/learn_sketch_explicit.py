@@ -7,12 +7,15 @@ from typing import List
 from learner.src.asp.asp_factory import ASPFactory
 from learner.src.asp.returncodes import ClingoExitCode
 from learner.src.instance_data.instance_data import InstanceData
+from learner.src.instance_data.instance_data_reducer import InstanceDataReducer
 from learner.src.instance_data.instance_information import InstanceInformation
-from learner.src.instance_data.tuple_graph_factory import TupleGraphFactory
+from learner.src.instance_data.tuple_graph_cache import TupleGraphCache
+from learner.src.iteration_data.counterexample_selection import is_greedy_counterexample_strategy, select_counterexamples, update_selected_instance_idxs
 from learner.src.iteration_data.domain_feature_data import DomainFeatureData
 from learner.src.iteration_data.domain_feature_data_factory import DomainFeatureDataFactory
-from learner.src.iteration_data.feature_valuations_factory import FeatureValuationsFactory
+from learner.src.iteration_data.domain_feature_data_reducer import DomainFeatureDataReducer
 from learner.src.iteration_data.dlplan_policy_factory import ExplicitDlplanPolicyFactory
+from learner.src.iteration_data.preprocessing_cache import PreprocessingCache
 from learner.src.iteration_data.sketch import Sketch
 from learner.src.iteration_data.state_pair_equivalence_factory import StatePairEquivalenceFactory
 from learner.src.iteration_data.tuple_graph_equivalence_factory import TupleGraphEquivalenceFactory
@@ -20,14 +23,45 @@ from learner.src.iteration_data.tuple_graph_equivalence_minimizer import TupleGr
 from learner.src.util.timer import CountDownTimer
 from learner.src.util.command import create_experiment_workspace
 from learner.src.util.clock import Clock
+from learner.src.util.parallel import parallel_map
+from learner.src.util.tracing import span
 from learner.src.iteration_data.learning_statistics import LearningStatistics
 
 
-def compute_smallest_unsolved_instance(config, sketch: Sketch, instance_datas: List[InstanceData]):
+def _verify_instance(context, instance_idx: int):
+    config, sketch, instance_datas, only_selected_initial_states = context
+    instance_data = instance_datas[instance_idx]
+    initial_s_idxs = instance_data.get_selected_initial_s_idxs() if only_selected_initial_states else instance_data.initial_s_idxs
+    return sketch.verify(config, instance_data, initial_s_idxs)
+
+
+def compute_unsolved_instances(config, sketch: Sketch, instance_datas: List[InstanceData], tuple_graph_cache: TupleGraphCache, only_selected_initial_states=False):
+    """ Returns pairs of unsolved instance and SketchFailure, sorted by instance size.
+        Stops early if the counterexample strategy only needs the smallest unsolved instances. """
+    # Tuple graphs that the verification workers build would be lost,
+    # hence they are prebuilt in the order of verification as far as the cache budget allows.
+    tuple_graph_cache.make_tuple_graphs(instance_datas, config.num_workers)
+    unsolved_instances = []
+    context = (config, sketch, instance_datas, only_selected_initial_states)
+    failures = parallel_map(_verify_instance, context, range(len(instance_datas)), config.num_workers)
+    for instance_data, failure in zip(instance_datas, failures):
+        if failure is None:
+            continue
+        unsolved_instances.append((instance_data, failure))
+        if is_greedy_counterexample_strategy(config) and len(unsolved_instances) == config.num_counterexamples:
+            failures.close()
+            break
+    return unsolved_instances
+
+
+def add_unsolved_initial_states(config, sketch: Sketch, instance_datas: List[InstanceData]):
+    """ Adds the initial states from which the sketch fails to the selected initial states. """
     for instance_data in instance_datas:
-        if not sketch.solves(config, instance_data):
-            return instance_data
-    return None
+        if instance_data.selected_initial_s_idxs is None:
+            continue
+        unsolved_initial_s_idxs = sketch.compute_unsolved_initial_states(config, instance_data)
+        instance_data.selected_initial_s_idxs = sorted(set(instance_data.selected_initial_s_idxs).union(unsolved_initial_s_idxs))
+        print("Instance:", instance_data.id, "unsolved initial states:", unsolved_initial_s_idxs)
 
 
 def learn_sketch(config, domain_data, instance_datas, zero_cost_domain_feature_data: DomainFeatureData, workspace, width: int):
@@ -36,104 +70,166 @@ def learn_sketch(config, domain_data, instance_datas, zero_cost_domain_feature_d
     clock = Clock("LEARNING")
     clock.set_start()
 
-    logging.info(colored("Initializing TupleGraphs...", "blue", "on_grey"))
-    tuple_graph_factory = TupleGraphFactory(width)
+    # Only one representative of likely isomorphic instances is used for learning,
+    # the duplicates are verified after all representatives are solved.
+    # The ids remain sorted by instance size.
+    instance_data_reducer = InstanceDataReducer()
+    representative_instance_datas, duplicate_instance_datas = instance_datas, []
+    if config.eliminate_isomorphic_instances:
+        logging.info(colored("Reducing InstanceDatas...", "blue", "on_grey"))
+        with span("InstanceDataReducer"):
+            representative_instance_datas, duplicate_instance_datas = instance_data_reducer.reduce(instance_datas)
+        instance_data_reducer.statistics.print()
+        logging.info(colored("..done", "blue", "on_grey"))
+
+    # Tuple graphs are built on first access, i.e., when an instance is selected or verified.
+    spill_directory = None
+    if config.spill_tuple_graphs:
+        spill_directory = workspace / "tuple_graph_cache"
+        create_experiment_workspace(spill_directory, rm_if_existed=True)
+    tuple_graph_cache = TupleGraphCache(width, config.tuple_graph_cache_memory_limit, spill_directory)
+    for instance_data in representative_instance_datas:
+        instance_data.is_isomorphic_duplicate = False
+    for instance_data in duplicate_instance_datas:
+        instance_data.is_isomorphic_duplicate = True
+
     for instance_data in instance_datas:
-        instance_data.set_tuple_graphs(tuple_graph_factory.make_tuple_graphs(instance_data))
-    logging.info(colored("..done", "blue", "on_grey"))
+        instance_data.tuple_graphs = None
+        instance_data.tuple_graph_cache = tuple_graph_cache
 
     i = 0
     selected_instance_idxs = [0]
+    preprocessing_cache = PreprocessingCache(config.preprocessing_cache_max_features)
     timer = CountDownTimer(config.timeout)
     create_experiment_workspace(workspace, rm_if_existed=False)
     while not timer.is_expired():
-        logging.info(colored(f"Iteration: {i}", "red", "on_grey"))
-
-        selected_instance_datas = [instance_datas[subproblem_idx] for subproblem_idx in selected_instance_idxs]
-        for instance_data in selected_instance_datas:
-            instance_data.instance_information = InstanceInformation(
-                instance_data.instance_information.name,
-                instance_data.instance_information.filename,
-                workspace / f"iteration_{i}")
-            instance_data.set_state_space(instance_data.state_space, True)
-            print("     id:", instance_data.id, "name:", instance_data.instance_information.name, "initial_states:", instance_data.initial_s_idxs)
-
-        logging.info(colored("Initializing DomainFeatureData...", "blue", "on_grey"))
-        domain_feature_data_factory = DomainFeatureDataFactory()
-        domain_feature_data_factory.make_domain_feature_data_from_instance_datas(config, domain_data, selected_instance_datas)
-        domain_feature_data_factory.statistics.print()
-        for zero_cost_boolean_feature in zero_cost_domain_feature_data.boolean_features.f_idx_to_feature.values():
-            domain_data.domain_feature_data.boolean_features.add_feature(zero_cost_boolean_feature)
-        for zero_cost_numerical_feature in zero_cost_domain_feature_data.numerical_features.f_idx_to_feature.values():
-            domain_data.domain_feature_data.numerical_features.add_feature(zero_cost_numerical_feature)
-        logging.info(colored("..done", "blue", "on_grey"))
-
-        logging.info(colored("Initializing InstanceFeatureDatas...", "blue", "on_grey"))
-        for instance_data in selected_instance_datas:
-            state_feature_valuations, boolean_feature_valuations, numerical_feature_valuations = FeatureValuationsFactory().make_feature_valuations(instance_data)
-            instance_data.set_feature_valuations(state_feature_valuations)
-            instance_data.boolean_feature_valuations = boolean_feature_valuations
-            instance_data.numerical_feature_valuations = numerical_feature_valuations
-        logging.info(colored("..done", "blue", "on_grey"))
-
-        logging.info(colored("Initializing StatePairEquivalenceDatas...", "blue", "on_grey"))
-        state_pair_equivalence_factory = StatePairEquivalenceFactory()
-        state_pair_equivalence_factory.make_state_pair_equivalences(domain_data, selected_instance_datas)
-        logging.info(colored("..done", "blue", "on_grey"))
-
-        logging.info(colored("Initializing TupleGraphEquivalences...", "blue", "on_grey"))
-        tuple_graph_equivalence_factory = TupleGraphEquivalenceFactory()
-        tuple_graph_equivalence_factory.make_tuple_graph_equivalences(domain_data, selected_instance_datas)
-        tuple_graph_equivalence_factory.statistics.print()
-        logging.info(colored("..done", "blue", "on_grey"))
-
-        logging.info(colored("Initializing TupleGraphEquivalenceMinimizer...", "blue", "on_grey"))
-        tuple_graph_equivalence_minimizer = TupleGraphEquivalenceMinimizer()
-        for instance_data in selected_instance_datas:
-            tuple_graph_equivalence_minimizer.minimize(instance_data)
-        logging.info(colored("..done", "blue", "on_grey"))
-
-        logging.info(colored("Iteration data preprocessing summary:", "yellow", "on_grey"))
-        domain_feature_data_factory.statistics.print()
-        state_pair_equivalence_factory.statistics.print()
-        tuple_graph_equivalence_factory.statistics.print()
-        tuple_graph_equivalence_minimizer.statistics.print()
-
-        asp_factory = ASPFactory(max_num_rules=config.max_num_rules)
-        asp_factory.load_problem_file(config.asp_location / config.asp_name)
-        facts = asp_factory.make_facts(domain_data, selected_instance_datas)
-        logging.info(colored("Grounding Logic Program...", "blue", "on_grey"))
-        asp_factory.ground(facts)
-        logging.info(colored("..done", "blue", "on_grey"))
-
-        logging.info(colored("Solving Logic Program...", "blue", "on_grey"))
-        symbols, returncode = asp_factory.solve()
-        if returncode == ClingoExitCode.UNSATISFIABLE:
-            print("UNSAT")
-            return None, None, None
-        asp_factory.print_statistics()
-        logging.info(colored("..done", "blue", "on_grey"))
-
-        dlplan_policy = ExplicitDlplanPolicyFactory().make_dlplan_policy_from_answer_set(symbols, domain_data)
-        sketch = Sketch(dlplan_policy, width)
-        logging.info("Learned the following sketch:")
-        sketch.print()
-        assert compute_smallest_unsolved_instance(config, sketch, selected_instance_datas) is None
-
-        logging.info(colored("Verifying learned sketch...", "blue", "on_grey"))
-        smallest_unsolved_instance = compute_smallest_unsolved_instance(config, sketch, instance_datas)
-        logging.info(colored("..done", "blue", "on_grey"))
-
-        if smallest_unsolved_instance is None:
-            print(colored("Sketch solves all instances!", "red", "on_grey"))
-            break
-        else:
-            if smallest_unsolved_instance.id > max(selected_instance_idxs):
-                selected_instance_idxs = [smallest_unsolved_instance.id]
+        with span("Iteration", iteration=i, workspace=workspace):
+            logging.info(colored(f"Iteration: {i}", "red", "on_grey"))
+
+            selected_instance_datas = [instance_datas[subproblem_idx] for subproblem_idx in selected_instance_idxs]
+            for instance_data in selected_instance_datas:
+                instance_data.instance_information = InstanceInformation(
+                    instance_data.instance_information.name,
+                    instance_data.instance_information.filename,
+                    workspace / f"iteration_{i}")
+                instance_data.set_state_space(instance_data.state_space, True)
+                print("     id:", instance_data.id, "name:", instance_data.instance_information.name, "initial_states:", instance_data.get_selected_initial_s_idxs())
+
+            logging.info(colored("Initializing DomainFeatureData...", "blue", "on_grey"))
+            with span("DomainFeatureData"):
+                domain_feature_data_factory = DomainFeatureDataFactory()
+                domain_feature_data_factory.make_domain_feature_data_from_instance_datas(config, domain_data, selected_instance_datas)
+                domain_feature_data_factory.statistics.print()
+                for zero_cost_boolean_feature in zero_cost_domain_feature_data.boolean_features.f_idx_to_feature.values():
+                    domain_data.domain_feature_data.boolean_features.add_feature(zero_cost_boolean_feature)
+                for zero_cost_numerical_feature in zero_cost_domain_feature_data.numerical_features.f_idx_to_feature.values():
+                    domain_data.domain_feature_data.numerical_features.add_feature(zero_cost_numerical_feature)
+            logging.info(colored("..done", "blue", "on_grey"))
+
+            logging.info(colored("Initializing InstanceFeatureDatas...", "blue", "on_grey"))
+            with span("FeatureValuations"):
+                preprocessing_cache.make_feature_valuations(domain_data, selected_instance_datas, config.num_workers)
+            logging.info(colored("..done", "blue", "on_grey"))
+
+            domain_feature_data_reducer = DomainFeatureDataReducer()
+            if config.deduplicate_features:
+                logging.info(colored("Reducing DomainFeatureData...", "blue", "on_grey"))
+                with span("DomainFeatureDataReducer"):
+                    domain_feature_data_reducer.reduce(domain_data, selected_instance_datas)
+                domain_feature_data_reducer.statistics.print()
+                logging.info(colored("..done", "blue", "on_grey"))
+
+            # Equivalences of previously selected instances are reused if the feature pool did not change.
+            outdated_instance_datas = preprocessing_cache.compute_outdated_instance_datas(domain_data, selected_instance_datas)
+
+            logging.info(colored("Initializing StatePairEquivalenceDatas...", "blue", "on_grey"))
+            with span("StatePairEquivalences"):
+                state_pair_equivalence_factory = StatePairEquivalenceFactory()
+                instance_idx_to_rules = dict()
+                repartitioned_instance_datas = []
+                for instance_data in outdated_instance_datas:
+                    rules, partition = state_pair_equivalence_factory.make_state_pair_equivalences(domain_data, instance_data, preprocessing_cache.get_partition(instance_data))
+                    # Tuple graph equivalences are reused if the changes of the feature pool did not change the partition.
+                    if preprocessing_cache.update_equivalences(instance_data, rules, partition):
+                        instance_idx_to_rules[instance_data.id] = (rules, partition)
+                        repartitioned_instance_datas.append(instance_data)
+            logging.info(colored("..done", "blue", "on_grey"))
+
+            logging.info(colored("Initializing TupleGraphEquivalences...", "blue", "on_grey"))
+            with span("TupleGraphEquivalences"):
+                tuple_graph_equivalence_factory = TupleGraphEquivalenceFactory()
+                tuple_graph_equivalence_factory.make_tuple_graph_equivalences(domain_data, repartitioned_instance_datas)
+            tuple_graph_equivalence_factory.statistics.print()
+            logging.info(colored("..done", "blue", "on_grey"))
+
+            logging.info(colored("Initializing TupleGraphEquivalenceMinimizer...", "blue", "on_grey"))
+            with span("TupleGraphEquivalenceMinimizer"):
+                tuple_graph_equivalence_minimizer = TupleGraphEquivalenceMinimizer()
+                for instance_data in repartitioned_instance_datas:
+                    tuple_graph_equivalence_minimizer.minimize(instance_data)
+                    preprocessing_cache.insert_equivalences(instance_data, *instance_idx_to_rules[instance_data.id])
+                preprocessing_cache.make_equivalences(domain_data, selected_instance_datas)
+            logging.info(colored("..done", "blue", "on_grey"))
+
+            logging.info(colored("Iteration data preprocessing summary:", "yellow", "on_grey"))
+            instance_data_reducer.statistics.print()
+            domain_feature_data_factory.statistics.print()
+            domain_feature_data_reducer.statistics.print()
+            state_pair_equivalence_factory.statistics.print()
+            tuple_graph_equivalence_factory.statistics.print()
+            tuple_graph_equivalence_minimizer.statistics.print()
+            preprocessing_cache.statistics.print()
+            tuple_graph_cache.statistics.print()
+
+            asp_factory = ASPFactory(config.max_num_rules, config.asp_num_threads, config.asp_configuration, config.asp_opt_strategy)
+            asp_factory.load_problem_file(config.asp_location / config.asp_name)
+            with span("Facts"):
+                facts = asp_factory.make_facts(domain_data, selected_instance_datas)
+            if config.asp_write_facts:
+                asp_factory.write_facts(facts, workspace / f"iteration_{i}" / "facts.lp")
+            logging.info(colored("Grounding Logic Program...", "blue", "on_grey"))
+            with span("Grounding", num_facts=len(facts)):
+                asp_factory.ground(facts)
+            logging.info(colored("..done", "blue", "on_grey"))
+
+            logging.info(colored("Solving Logic Program...", "blue", "on_grey"))
+            with span("Solving") as trace_args:
+                symbols, returncode = asp_factory.solve_within_budget(config.asp_time_budget, config.asp_num_retries, config.asp_retry_budget_factor, config.asp_accept_suboptimal)
+                trace_args.update(asp_factory.get_ground_program_size())
+                trace_args.update(optimality_proven=int(asp_factory.optimality_proven))
+            if returncode == ClingoExitCode.UNSATISFIABLE:
+                print("UNSAT")
+                return None, None, None
+            elif returncode != ClingoExitCode.SATISFIABLE:
+                print("No model found within the time budget:", returncode)
+                return None, None, None
+            asp_factory.print_statistics()
+            logging.info(colored("..done", "blue", "on_grey"))
+
+            dlplan_policy = ExplicitDlplanPolicyFactory().make_dlplan_policy_from_answer_set(symbols, domain_data)
+            sketch = Sketch(dlplan_policy, width)
+            logging.info("Learned the following sketch:")
+            sketch.print()
+            with span("SelectedVerification"):
+                assert not compute_unsolved_instances(config, sketch, selected_instance_datas, tuple_graph_cache, only_selected_initial_states=True)
+
+            logging.info(colored("Verifying learned sketch...", "blue", "on_grey"))
+            with span("Verification"):
+                unsolved_instances = compute_unsolved_instances(config, sketch, representative_instance_datas, tuple_graph_cache)
+                if not unsolved_instances:
+                    unsolved_instances = compute_unsolved_instances(config, sketch, duplicate_instance_datas, tuple_graph_cache)
+            logging.info(colored("..done", "blue", "on_grey"))
+
+            if not unsolved_instances:
+                print(colored("Sketch solves all instances!", "red", "on_grey"))
+                break
             else:
-                selected_instance_idxs.append(smallest_unsolved_instance.id)
-            print("Smallest unsolved instance:", smallest_unsolved_instance.id)
-            print("Selected instances:", selected_instance_idxs)
+                counterexamples = select_counterexamples(config, unsolved_instances)
+                add_unsolved_initial_states(config, sketch, counterexamples)
+                selected_instance_idxs = update_selected_instance_idxs(selected_instance_idxs, counterexamples)
+                print("Smallest unsolved instance:", unsolved_instances[0][0].id)
+                print("Selected counterexamples:", [instance_data.id for instance_data in counterexamples])
+                print("Selected instances:", selected_instance_idxs)
         i += 1
     clock.set_accumulate()
 
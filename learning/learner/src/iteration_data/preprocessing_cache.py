@@ -0,0 +1,191 @@
+import dlplan
+
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Dict, List
+
+from learner.src.domain_data.domain_data import DomainData
+from learner.src.instance_data.instance_data import InstanceData
+from learner.src.iteration_data.feature_valuations_factory import FeatureValuationsFactory
+from learner.src.iteration_data.state_pair_equivalence import DomainStatePairEquivalence, StatePairEquivalence, StatePairPartition
+from learner.src.iteration_data.state_pair_equivalence_factory import compute_feature_pool_version
+from learner.src.iteration_data.tuple_graph_equivalence import TupleGraphEquivalence
+
+
+@dataclass
+class InstanceEquivalences:
+    """ The equivalences of an instance with rule indices local to the instance. """
+    rules: List[dlplan.Rule]
+    partition: StatePairPartition
+    state_pair_equivalences: Dict[int, StatePairEquivalence]
+    tuple_graph_equivalences: Dict[int, TupleGraphEquivalence]
+
+
+@dataclass
+class PreprocessingCacheStatistics:
+    num_evaluated_features: int = 0
+    num_reused_features: int = 0
+    num_evicted_features: int = 0
+    num_equivalences_hits: int = 0
+    num_equivalences_misses: int = 0
+    num_repartitioned_instances: int = 0
+    num_equivalences: int = 0
+
+    def print(self):
+        print("PreprocessingCacheStatistics:")
+        print("    num_evaluated_features:", self.num_evaluated_features)
+        print("    num_reused_features:", self.num_reused_features)
+        print("    num_evicted_features:", self.num_evicted_features)
+        print("    num_equivalences_hits:", self.num_equivalences_hits)
+        print("    num_equivalences_misses:", self.num_equivalences_misses)
+        print("    num_repartitioned_instances:", self.num_repartitioned_instances)
+        print("    num_equivalences:", self.num_equivalences)
+
+
+class PreprocessingCache:
+    """
+    Stores the preprocessing results of each instance across iterations of learn_sketch.
+
+    Feature valuations are stored per feature repr such that only new features must be evaluated.
+    At most max_cached_features valuations are kept per instance and kind of feature,
+    evicting the least recently used ones, but the features of the current pool are always kept.
+    Equivalences are stored with rule indices local to the instance together with the partition
+    of the state pairs for the feature pool they were computed for, which is updated for
+    the added and removed features when the pool changes. They are remapped to the rule indices
+    of the selected instances in each iteration.
+    """
+    def __init__(self, max_cached_features: int = None):
+        self.max_cached_features = max_cached_features
+        self.instance_idx_to_boolean_feature_valuations = defaultdict(OrderedDict)
+        self.instance_idx_to_numerical_feature_valuations = defaultdict(OrderedDict)
+        self.instance_idx_to_equivalences: Dict[int, InstanceEquivalences] = dict()
+        self.statistics = PreprocessingCacheStatistics()
+
+    def make_feature_valuations(self, domain_data: DomainData, instance_datas: List[InstanceData], num_workers: int = 1):
+        """ Sets the feature valuations of the instances for the current feature pool. """
+        feature_valuations_factory = FeatureValuationsFactory()
+        boolean_feature_valuations = self._make_feature_valuations(
+            feature_valuations_factory,
+            instance_datas,
+            domain_data.domain_feature_data.boolean_features.f_idx_to_feature,
+            self.instance_idx_to_boolean_feature_valuations,
+            bool,
+            num_workers)
+        numerical_feature_valuations = self._make_feature_valuations(
+            feature_valuations_factory,
+            instance_datas,
+            domain_data.domain_feature_data.numerical_features.f_idx_to_feature,
+            self.instance_idx_to_numerical_feature_valuations,
+            int,
+            num_workers)
+        for instance_data, b_idx_to_valuations, n_idx_to_valuations in zip(instance_datas, boolean_feature_valuations, numerical_feature_valuations):
+            instance_data.set_feature_valuations(feature_valuations_factory.make_state_feature_valuations(instance_data, b_idx_to_valuations, n_idx_to_valuations))
+            instance_data.boolean_feature_valuations = b_idx_to_valuations
+            instance_data.numerical_feature_valuations = n_idx_to_valuations
+
+    def _make_feature_valuations(self, feature_valuations_factory: FeatureValuationsFactory, instance_datas: List[InstanceData], f_idx_to_feature, instance_idx_to_feature_valuations, dtype, num_workers: int):
+        f_idx_to_f_repr = {f_idx: feature.dlplan_feature.compute_repr() for f_idx, feature in f_idx_to_feature.items()}
+        new_f_idx_to_features = []
+        for instance_data in instance_datas:
+            cached_feature_valuations = instance_idx_to_feature_valuations[instance_data.id]
+            new_f_idx_to_features.append({f_idx: feature for f_idx, feature in f_idx_to_feature.items() if f_idx_to_f_repr[f_idx] not in cached_feature_valuations})
+        new_feature_valuations = feature_valuations_factory.evaluate_features_of_instances(instance_datas, new_f_idx_to_features, dtype, num_workers)
+        feature_valuations = []
+        for instance_data, new_f_idx_to_feature, f_idx_to_valuations in zip(instance_datas, new_f_idx_to_features, new_feature_valuations):
+            cached_feature_valuations = instance_idx_to_feature_valuations[instance_data.id]
+            for f_idx, valuations in f_idx_to_valuations.items():
+                cached_feature_valuations[f_idx_to_f_repr[f_idx]] = valuations
+            for f_repr in f_idx_to_f_repr.values():
+                cached_feature_valuations.move_to_end(f_repr)
+            self.statistics.num_evaluated_features += len(new_f_idx_to_feature)
+            self.statistics.num_reused_features += len(f_idx_to_feature) - len(new_f_idx_to_feature)
+            feature_valuations.append({f_idx: cached_feature_valuations[f_repr] for f_idx, f_repr in f_idx_to_f_repr.items()})
+            self._evict_feature_valuations(cached_feature_valuations, len(f_idx_to_f_repr))
+        return feature_valuations
+
+    def _evict_feature_valuations(self, cached_feature_valuations: OrderedDict, num_current_features: int):
+        """ Evicts the least recently used valuations, which come before the valuations of the current features. """
+        if self.max_cached_features is None:
+            return
+        while len(cached_feature_valuations) > max(self.max_cached_features, num_current_features):
+            cached_feature_valuations.popitem(last=False)
+            self.statistics.num_evicted_features += 1
+
+    def compute_outdated_instance_datas(self, domain_data: DomainData, instance_datas: List[InstanceData]):
+        """ Returns the instances without equivalences for the current feature pool. """
+        feature_pool_version = compute_feature_pool_version(domain_data.domain_feature_data)
+        outdated_instance_datas = []
+        for instance_data in instance_datas:
+            equivalences = self.instance_idx_to_equivalences.get(instance_data.id, None)
+            if equivalences is not None and equivalences.partition.feature_pool_version == feature_pool_version:
+                self.statistics.num_equivalences_hits += 1
+            else:
+                self.statistics.num_equivalences_misses += 1
+                outdated_instance_datas.append(instance_data)
+        return outdated_instance_datas
+
+    def get_partition(self, instance_data: InstanceData):
+        """ Returns the partition of the state pairs of the instance for the last feature pool, if any. """
+        equivalences = self.instance_idx_to_equivalences.get(instance_data.id, None)
+        return equivalences.partition if equivalences is not None else None
+
+    def update_equivalences(self, instance_data: InstanceData, rules: List[dlplan.Rule], partition: StatePairPartition):
+        """ Stores the rules and state pair equivalences of the instance for the current feature pool
+            if its state pairs are partitioned as for the previous feature pool.
+            Then the tuple graph equivalences are reused because they only depend on the partition.
+            Returns whether the tuple graph equivalences must be recomputed. """
+        equivalences = self.instance_idx_to_equivalences.get(instance_data.id, None)
+        if equivalences is None or equivalences.partition.s_idx_to_s_prime_idx_to_class != partition.s_idx_to_s_prime_idx_to_class:
+            self.statistics.num_repartitioned_instances += 1
+            return True
+        self.instance_idx_to_equivalences[instance_data.id] = InstanceEquivalences(
+            rules,
+            partition,
+            instance_data.state_pair_equivalences,
+            equivalences.tuple_graph_equivalences)
+        return False
+
+    def insert_equivalences(self, instance_data: InstanceData, rules: List[dlplan.Rule], partition: StatePairPartition):
+        """ Stores the equivalences of the instance that were computed with local rule indices. """
+        self.instance_idx_to_equivalences[instance_data.id] = InstanceEquivalences(
+            rules,
+            partition,
+            instance_data.state_pair_equivalences,
+            instance_data.tuple_graph_equivalences)
+
+    def make_equivalences(self, domain_data: DomainData, instance_datas: List[InstanceData]):
+        """ Sets the equivalences of the instances and the domain from the cached equivalences.
+            Rules are indexed in order of first occurrence over all instances. """
+        rules = []
+        rule_repr_to_idx = dict()
+        for instance_data in instance_datas:
+            equivalences = self.instance_idx_to_equivalences[instance_data.id]
+            local_to_global_r_idx = []
+            for rule in equivalences.rules:
+                rule_repr = rule.compute_repr()
+                r_idx = rule_repr_to_idx.get(rule_repr, None)
+                if r_idx is None:
+                    r_idx = len(rules)
+                    rule_repr_to_idx[rule_repr] = r_idx
+                    rules.append(rule)
+                local_to_global_r_idx.append(r_idx)
+            instance_data.set_state_pair_equivalences({
+                s_idx: self._remap_state_pair_equivalence(state_pair_equivalence, local_to_global_r_idx)
+                for s_idx, state_pair_equivalence in equivalences.state_pair_equivalences.items()})
+            instance_data.set_tuple_graph_equivalences({
+                s_idx: self._remap_tuple_graph_equivalence(tuple_graph_equivalence, local_to_global_r_idx)
+                for s_idx, tuple_graph_equivalence in equivalences.tuple_graph_equivalences.items()})
+        domain_data.domain_state_pair_equivalence = DomainStatePairEquivalence(rules)
+        self.statistics.num_equivalences = len(rules)
+
+    def _remap_state_pair_equivalence(self, state_pair_equivalence: StatePairEquivalence, local_to_global_r_idx: List[int]):
+        return StatePairEquivalence(
+            {local_to_global_r_idx[r_idx]: s_prime_idxs for r_idx, s_prime_idxs in state_pair_equivalence.r_idx_to_subgoal_states.items()},
+            {local_to_global_r_idx[r_idx]: distance for r_idx, distance in state_pair_equivalence.r_idx_to_distance.items()},
+            {s_prime_idx: local_to_global_r_idx[r_idx] for s_prime_idx, r_idx in state_pair_equivalence.subgoal_state_to_r_idx.items()})
+
+    def _remap_tuple_graph_equivalence(self, tuple_graph_equivalence: TupleGraphEquivalence, local_to_global_r_idx: List[int]):
+        return TupleGraphEquivalence(
+            {t_idx: {local_to_global_r_idx[r_idx] for r_idx in r_idxs} for t_idx, r_idxs in tuple_graph_equivalence.t_idx_to_r_idxs.items()},
+            tuple_graph_equivalence.t_idx_to_distance,
+            {local_to_global_r_idx[r_idx]: distance for r_idx, distance in tuple_graph_equivalence.r_idx_to_deadend_distance.items()})
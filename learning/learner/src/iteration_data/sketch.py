@@ -1,5 +1,6 @@
 import dlplan
 import math
+from enum import Enum, unique
 from termcolor import colored
 from typing import Dict, MutableSet, List
 from collections import defaultdict, deque
@@ -8,6 +9,15 @@ from learner.src.instance_data.instance_data import InstanceData
 from learner.src.iteration_data.feature_valuations_factory import FeatureValuationsFactory
 
 
+@unique
+class SketchFailure(Enum):
+    """ The reasons why a sketch does not solve an instance. """
+    DEADEND_REACHABLE = 0
+    UNBOUNDED_WIDTH = 1
+    NONOPTIMAL_WIDTH = 2
+    CYCLIC = 3
+
+
 class Sketch:
     def __init__(self, dlplan_policy: dlplan.Policy, width: int):
         self.dlplan_policy = dlplan_policy
@@ -18,9 +28,10 @@ class Sketch:
         queue.extend(list(instance_data.initial_s_idxs))
         r_reachable_states = set()
         r_reachable_states.update(instance_data.initial_s_idxs)
+        tuple_graphs = instance_data.get_tuple_graphs()
         while queue:
             s_idx = queue.popleft()
-            subgoal_states = self._compute_subgoal_states_of_state(instance_data, s_idx)
+            subgoal_states = self._compute_subgoal_states_of_state(instance_data, tuple_graphs, s_idx)
             for s_prime_idx in subgoal_states:
                 if s_prime_idx not in r_reachable_states:
                     r_reachable_states.add(s_prime_idx)
@@ -29,15 +40,17 @@ class Sketch:
         return r_reachable_states
 
 
-    def _verify_bounded_width_of_state(self, instance_data: InstanceData, root_idx: int):
+    def _verify_bounded_width_of_state(self, instance_data: InstanceData, tuple_graphs: Dict[int, dlplan.TupleGraph], root_idx: int):
         """
         Args:
             instance_data(InstanceData): the instance
+            tuple_graphs(Dict[int, dlplan.TupleGraph]): the tuple graphs of the instance
             root_idx(int): the index of the state to be checked
 
-        Returns True iff for all rule r=C->E holds that if conditions C are true then there must be a subgoal tuple t
+        Returns None iff for all rule r=C->E holds that if conditions C are true then there must be a subgoal tuple t
                          and all pairs (root_idx, s) with s underlying t must be r-compatible and
                          there exists no s' closer s such that (root_idx, s') is r-compatible.
+                 Otherwise, returns the SketchFailure.
         """
         bounded = False
         for rule in self.dlplan_policy.get_rules():
@@ -46,7 +59,7 @@ class Sketch:
             if not rule.evaluate_conditions(source_state, instance_data.denotations_caches):
                 continue
             min_compatible_distance = math.inf
-            for tuple_distance, tuple_nodes in enumerate(instance_data.tuple_graphs[root_idx].get_tuple_nodes_by_distance()):
+            for tuple_distance, tuple_nodes in enumerate(tuple_graphs[root_idx].get_tuple_nodes_by_distance()):
                 for tuple_node in tuple_nodes:
                     subgoal = True
                     for s_prime_idx in tuple_node.get_state_indices():
@@ -62,7 +75,7 @@ class Sketch:
                             print(colored("Optimal width disproven.", "red", "on_grey"))
                             print("Closest subgoal state distance:", min_compatible_distance)
                             print("Closest subgoal tuple distance:", tuple_distance)
-                            return False
+                            return SketchFailure.NONOPTIMAL_WIDTH
                         break
                 if bounded_by_rule:
                     bounded = True
@@ -73,15 +86,15 @@ class Sketch:
                 print("Rule:", rule)
                 print("Instance:", instance_data.id, instance_data.instance_information.name)
                 print("State:", instance_data.state_space.get_states()[root_idx])
-                return False
+                return SketchFailure.UNBOUNDED_WIDTH
         if not bounded:
             print(colored("State has unbounded width", "red", "on_grey"))
             print("Instance:", instance_data.id, instance_data.instance_information.name)
             print("State:", instance_data.state_space.get_states()[root_idx])
-            return False
-        return True
+            return SketchFailure.UNBOUNDED_WIDTH
+        return None
 
-    def _compute_subgoal_states_of_state(self, instance_data: InstanceData, root_idx: int):
+    def _compute_subgoal_states_of_state(self, instance_data: InstanceData, tuple_graphs: Dict[int, dlplan.TupleGraph], root_idx: int):
         """ In general, one should compute subgoal states by running BrFS.
             However, this computation is quite expensive to do for all states.
             A simple approximation uses only the states that
@@ -89,6 +102,8 @@ class Sketch:
 
         Args:
             instance_data(InstanceData): the instance
+            tuple_graphs(Dict[int, dlplan.TupleGraph]): the tuple graphs of the instance
+            root_idx(int): the index of the state
             """
         subgoal_states = set()
         for rule in self.dlplan_policy.get_rules():
@@ -97,7 +112,7 @@ class Sketch:
             root_state = instance_data.state_space.get_states()[root_idx]
             if not rule.evaluate_conditions(root_state, instance_data.denotations_caches):
                 continue
-            for tuple_nodes in instance_data.tuple_graphs[root_idx].get_tuple_nodes_by_distance():
+            for tuple_nodes in tuple_graphs[root_idx].get_tuple_nodes_by_distance():
                 for tuple_node in tuple_nodes:
                     for s_prime_idx in tuple_node.get_state_indices():
                         target_state = instance_data.state_space.get_states()[s_prime_idx]
@@ -106,38 +121,41 @@ class Sketch:
         return subgoal_states
 
 
-    def _verify_bounded_modular_width(self, instance_data: InstanceData):
+    def _verify_bounded_modular_width(self, instance_data: InstanceData, initial_s_idxs: List[int]):
         """
         Args:
             instance_data(InstanceData): the instance
+            initial_s_idxs(List[int]): the initial states from which the r_reachable states are verified
         """
         queue = deque()
-        queue.extend(instance_data.initial_s_idxs)
+        queue.extend(initial_s_idxs)
         visited = set()
-        visited.update(instance_data.initial_s_idxs)
+        visited.update(initial_s_idxs)
         # byproduct for acyclicity check
         subgoal_states_per_r_reachable_state = defaultdict(set)
+        # Fetched once because the tuple graphs are looked up in the cache on each access.
+        tuple_graphs = instance_data.get_tuple_graphs()
         while queue:
             root_idx = queue.popleft()  # BrFS
             if instance_data.is_deadend(root_idx):
                 print("Deadend state is r_reachable")
                 print("State:", instance_data.state_space.get_states()[root_idx])
-                return False, None
+                return SketchFailure.DEADEND_REACHABLE, None
             if instance_data.is_goal(root_idx):
                 continue
             # Step 1 verify bounded width
-            bounded = self._verify_bounded_width_of_state(instance_data, root_idx)
-            if not bounded:
-                return False, None
+            failure = self._verify_bounded_width_of_state(instance_data, tuple_graphs, root_idx)
+            if failure is not None:
+                return failure, None
             # Step 2 compute compatible state pairs, not necessarily closest
             # prunes states only reachable through goals
-            subgoal_states = self._compute_subgoal_states_of_state(instance_data, root_idx)
+            subgoal_states = self._compute_subgoal_states_of_state(instance_data, tuple_graphs, root_idx)
             subgoal_states_per_r_reachable_state[root_idx] = subgoal_states
             for subgoal_state in subgoal_states:
                 if subgoal_state not in visited:
                     queue.append(subgoal_state)
                     visited.add(subgoal_state)
-        return True, subgoal_states_per_r_reachable_state
+        return None, subgoal_states_per_r_reachable_state
 
 
     def _verify_acyclicity(self, instance_data: InstanceData, subgoal_states_per_r_reachable_state: Dict[int, MutableSet[int]]):
@@ -175,17 +193,45 @@ class Sketch:
                     stack.pop(-1)
         return True
 
-    def solves(self, config, instance_data: InstanceData):
+    def verify(self, config, instance_data: InstanceData, initial_s_idxs: List[int] = None):
         """
-        Returns True iff the sketch solves the instance, i.e.,
+        Returns None iff the sketch solves the instance from the given initial states
+        (all initial states of the instance by default), i.e.,
             (1) sketch has bounded modular sketch width, and
-            (2) sketch is acyclic. """
-        bounded, subgoal_states_per_r_reachable_state = self._verify_bounded_modular_width(instance_data)
-        if not bounded:
-            return False
+            (2) sketch is acyclic.
+        Otherwise, returns the SketchFailure. """
+        if initial_s_idxs is None:
+            initial_s_idxs = instance_data.initial_s_idxs
+        failure, subgoal_states_per_r_reachable_state = self._verify_bounded_modular_width(instance_data, initial_s_idxs)
+        if failure is not None:
+            return failure
         if not self._verify_acyclicity(instance_data, subgoal_states_per_r_reachable_state):
-            return False
-        return True
+            return SketchFailure.CYCLIC
+        return None
+
+    def solves(self, config, instance_data: InstanceData, initial_s_idxs: List[int] = None):
+        """ Returns True iff the sketch solves the instance from the given initial states. """
+        return self.verify(config, instance_data, initial_s_idxs) is None
+
+    def compute_unsolved_initial_states(self, config, instance_data: InstanceData):
+        """ Returns the initial states of the instance from which the sketch fails.
+
+        Each initial state is verified separately but states that are r_reachable
+        from an initial state that was already verified need no verification:
+        bounded width is a property of single states and a cycle among them
+        would have been found from that initial state.
+        """
+        unsolved_initial_s_idxs = []
+        solved_s_idxs = set()
+        for initial_s_idx in instance_data.initial_s_idxs:
+            if initial_s_idx in solved_s_idxs:
+                continue
+            failure, subgoal_states_per_r_reachable_state = self._verify_bounded_modular_width(instance_data, [initial_s_idx])
+            if failure is None and self._verify_acyclicity(instance_data, subgoal_states_per_r_reachable_state):
+                solved_s_idxs.update(subgoal_states_per_r_reachable_state.keys())
+            else:
+                unsolved_initial_s_idxs.append(initial_s_idx)
+        return unsolved_initial_s_idxs
 
     def print(self):
         print(self.dlplan_policy.compute_repr())
@@ -1,5 +1,5 @@
 import dlplan
-from typing import Dict, List, MutableSet
+from typing import Dict, List, MutableSet, Tuple
 from dataclasses import dataclass
 
 
@@ -21,6 +21,21 @@ class StatePairEquivalence:
         print("    r_idx_to_distance:", self.r_idx_to_distance)
         print("    subgoal_state_to_r_idx: ", self.subgoal_state_to_r_idx)
 
+
+@dataclass
+class StatePairPartition:
+    """
+    StatePairPartition groups the state pairs of an instance by the rule over the feature pool F they induce.
+
+    Classes are indexed in order of first occurrence, i.e., like the local rule indices,
+    and have a representative state pair such that the partition can be updated
+    when features are added to or removed from F without evaluating all features on all state pairs.
+    """
+    feature_pool_version: tuple
+    s_idx_to_s_prime_idx_to_class: Dict[int, Dict[int, int]]
+    representatives: List[Tuple[int, int]]
+
+
 @dataclass
 class DomainStatePairEquivalence:
     rules: List[dlplan.Rule]
@@ -3,11 +3,11 @@ import math
 
 from collections import defaultdict
 from dataclasses import dataclass
-from typing import List
+from typing import List, Tuple
 
 from learner.src.domain_data.domain_data import DomainData
 from learner.src.instance_data.instance_data import InstanceData
-from learner.src.iteration_data.state_pair_equivalence import DomainStatePairEquivalence, StatePairEquivalence
+from learner.src.iteration_data.state_pair_equivalence import StatePairEquivalence, StatePairPartition
 from learner.src.iteration_data.domain_feature_data import DomainFeatureData
 from learner.src.iteration_data.feature_valuations import StateFeatureValuation
 
@@ -29,49 +29,117 @@ class StatePairEquivalenceStatistics:
         print("    num_equivalences:", self.num_equivalences)
 
 
+def compute_feature_pool_version(domain_feature_data: DomainFeatureData):
+    """ The equivalences of an instance only depend on which features are in the pool. """
+    return (frozenset(domain_feature_data.boolean_features.f_repr_to_feature.keys()),
+            frozenset(domain_feature_data.numerical_features.f_repr_to_feature.keys()))
+
+
 class StatePairEquivalenceFactory:
     def __init__(self):
         self.statistics = StatePairEquivalenceStatistics()
 
     def make_state_pair_equivalences(self,
         domain_data: DomainData,
-        instance_datas: List[InstanceData]):
+        instance_data: InstanceData,
+        partition: StatePairPartition = None) -> Tuple[List[dlplan.Rule], StatePairPartition]:
+        """ Computes the state pair equivalences of the instance where rule indices are local to the instance.
+            Returns the rules ordered by their local index and the partition of the state pairs by rule.
+
+            State pairs are grouped by the valuations of the features that determine their rule
+            and a rule is built once per group from a representative pair.
+            Given the partition for a previous feature pool, the groups of the features that remain
+            in the pool are taken from the representatives of the previous classes, and only
+            the added features are evaluated on all state pairs. """
         # We have to take a new policy_builder because our feature pool F uses indices 0,...,|F|
         policy_builder = domain_data.policy_builder
+        domain_feature_data = domain_data.domain_feature_data
+        feature_pool_version = compute_feature_pool_version(domain_feature_data)
+        boolean_f_reprs, numerical_f_reprs = partition.feature_pool_version if partition is not None else (frozenset(), frozenset())
+        kept_b_idxs, added_b_idxs = self._split_features(domain_feature_data.boolean_features.f_idx_to_feature, boolean_f_reprs)
+        kept_n_idxs, added_n_idxs = self._split_features(domain_feature_data.numerical_features.f_idx_to_feature, numerical_f_reprs)
+        feature_valuations = instance_data.feature_valuations
+        s_idx_to_added_b_vals = dict()
+        s_idx_to_added_n_vals = dict()
+        for s_idx, state_feature_valuation in feature_valuations.items():
+            s_idx_to_added_b_vals[s_idx] = tuple(state_feature_valuation.b_idx_to_val[b_idx] for b_idx in added_b_idxs)
+            s_idx_to_added_n_vals[s_idx] = tuple(state_feature_valuation.n_idx_to_val[n_idx] for n_idx in added_n_idxs)
         rules = []
-        rule_repr_to_idx = dict()
-        for instance_data in instance_datas:
-            state_pair_equivalences = dict()
-            for s_idx, tuple_graph in instance_data.tuple_graphs.items():
-                if instance_data.is_deadend(s_idx):
-                    continue
-                r_idx_to_distance = dict()
-                r_idx_to_subgoal_states = defaultdict(set)
-                subgoal_states_to_r_idx = dict()
-                # add conditions
-                conditions = self._make_conditions(policy_builder, domain_data.domain_feature_data, instance_data.feature_valuations[s_idx])
-                for d, s_prime_idxs in enumerate(tuple_graph.get_state_indices_by_distance()):
-                    for s_prime_idx in s_prime_idxs:
-                        self.statistics.increment_num_subgoal_states()
-                        # add effects
-                        effects = self._make_effects(policy_builder, domain_data.domain_feature_data, instance_data.feature_valuations[s_idx], instance_data.feature_valuations[s_prime_idx])
-                        # add rule
-                        rule = policy_builder.add_rule(conditions, effects)
-                        rule_repr = rule.compute_repr()
-                        if rule_repr in rule_repr_to_idx:
-                            r_idx = rule_repr_to_idx[rule_repr]
-                        else:
-                            self.statistics.increment_num_equivalences()
-                            r_idx = len(rules)
-                            rule_repr_to_idx[rule_repr] = r_idx
-                            rules.append(rule)
-                        r_idx_to_distance[r_idx] = min(r_idx_to_distance.get(r_idx, math.inf), d)
-                        r_idx_to_subgoal_states[r_idx].add(s_prime_idx)
-                        subgoal_states_to_r_idx[s_prime_idx] = r_idx
-                state_pair_equivalences[s_idx] = StatePairEquivalence(r_idx_to_subgoal_states, r_idx_to_distance, subgoal_states_to_r_idx)
-                # state_pair_equivalences[s_idx].print()
-            instance_data.set_state_pair_equivalences(state_pair_equivalences)
-        domain_data.domain_state_pair_equivalence = DomainStatePairEquivalence(rules)
+        representatives = []
+        key_to_r_idx = dict()
+        previous_class_to_kept_key = dict()
+        s_idx_to_s_prime_idx_to_class = dict()
+        state_pair_equivalences = dict()
+        for s_idx, tuple_graph in instance_data.get_tuple_graphs().items():
+            if instance_data.is_deadend(s_idx):
+                continue
+            r_idx_to_distance = dict()
+            r_idx_to_subgoal_states = defaultdict(set)
+            subgoal_states_to_r_idx = dict()
+            previous_s_prime_idx_to_class = partition.s_idx_to_s_prime_idx_to_class[s_idx] if partition is not None else None
+            source_b_vals = s_idx_to_added_b_vals[s_idx]
+            source_n_vals = s_idx_to_added_n_vals[s_idx]
+            source_n_conditions = tuple(val > 0 for val in source_n_vals)
+            conditions = None
+            for d, s_prime_idxs in enumerate(tuple_graph.get_state_indices_by_distance()):
+                for s_prime_idx in s_prime_idxs:
+                    self.statistics.increment_num_subgoal_states()
+                    if partition is None:
+                        kept_key = ()
+                    else:
+                        previous_class = previous_s_prime_idx_to_class[s_prime_idx]
+                        kept_key = previous_class_to_kept_key.get(previous_class)
+                        if kept_key is None:
+                            source_idx, target_idx = partition.representatives[previous_class]
+                            kept_key = self._make_key(kept_b_idxs, kept_n_idxs, feature_valuations[source_idx], feature_valuations[target_idx])
+                            previous_class_to_kept_key[previous_class] = kept_key
+                    target_n_vals = s_idx_to_added_n_vals[s_prime_idx]
+                    key = (kept_key,
+                           source_b_vals,
+                           s_idx_to_added_b_vals[s_prime_idx],
+                           source_n_conditions,
+                           tuple((target_val > source_val) - (target_val < source_val) for source_val, target_val in zip(source_n_vals, target_n_vals)))
+                    r_idx = key_to_r_idx.get(key)
+                    if r_idx is None:
+                        self.statistics.increment_num_equivalences()
+                        if conditions is None:
+                            conditions = self._make_conditions(policy_builder, domain_feature_data, feature_valuations[s_idx])
+                        effects = self._make_effects(policy_builder, domain_feature_data, feature_valuations[s_idx], feature_valuations[s_prime_idx])
+                        r_idx = len(rules)
+                        key_to_r_idx[key] = r_idx
+                        rules.append(policy_builder.add_rule(conditions, effects))
+                        representatives.append((s_idx, s_prime_idx))
+                    r_idx_to_distance[r_idx] = min(r_idx_to_distance.get(r_idx, math.inf), d)
+                    r_idx_to_subgoal_states[r_idx].add(s_prime_idx)
+                    subgoal_states_to_r_idx[s_prime_idx] = r_idx
+            state_pair_equivalences[s_idx] = StatePairEquivalence(r_idx_to_subgoal_states, r_idx_to_distance, subgoal_states_to_r_idx)
+            s_idx_to_s_prime_idx_to_class[s_idx] = subgoal_states_to_r_idx
+            # state_pair_equivalences[s_idx].print()
+        instance_data.set_state_pair_equivalences(state_pair_equivalences)
+        return rules, StatePairPartition(feature_pool_version, s_idx_to_s_prime_idx_to_class, representatives)
+
+    def _split_features(self, f_idx_to_feature, previous_f_reprs):
+        """ Splits the feature indices into features that were in the previous pool and added features. """
+        kept_f_idxs = []
+        added_f_idxs = []
+        for f_idx, feature in f_idx_to_feature.items():
+            if feature.dlplan_feature.compute_repr() in previous_f_reprs:
+                kept_f_idxs.append(f_idx)
+            else:
+                added_f_idxs.append(f_idx)
+        return kept_f_idxs, added_f_idxs
+
+    def _make_key(self,
+        b_idxs: List[int],
+        n_idxs: List[int],
+        source_feature_valuations: StateFeatureValuation,
+        target_feature_valuations: StateFeatureValuation):
+        """ Create a key that is equal for two state pairs iff the given features induce the same conditions and effects """
+        return (tuple(source_feature_valuations.b_idx_to_val[b_idx] for b_idx in b_idxs),
+                tuple(target_feature_valuations.b_idx_to_val[b_idx] for b_idx in b_idxs),
+                tuple(source_feature_valuations.n_idx_to_val[n_idx] > 0 for n_idx in n_idxs),
+                tuple((target_feature_valuations.n_idx_to_val[n_idx] > source_feature_valuations.n_idx_to_val[n_idx])
+                      - (target_feature_valuations.n_idx_to_val[n_idx] < source_feature_valuations.n_idx_to_val[n_idx]) for n_idx in n_idxs))
 
     def _make_conditions(self,
         policy_builder: dlplan.PolicyBuilder,
@@ -37,7 +37,7 @@ class TupleGraphEquivalenceFactory:
         """
         for instance_data in instance_datas:
             tuple_graph_equivalences = dict()
-            for s_idx, tuple_graph in instance_data.tuple_graphs.items():
+            for s_idx, tuple_graph in instance_data.get_tuple_graphs().items():
                 if instance_data.is_deadend(s_idx):
                     continue
                 state_pair_equivalence = instance_data.state_pair_equivalences[s_idx]
@@ -29,11 +29,10 @@ class TupleGraphEquivalenceMinimizer:
         self.statistics = TupleGraphEquivalenceFactoryStatistics()
 
     def minimize(self, instance_data: InstanceData):
-        for root_idx, tuple_graph in instance_data.tuple_graphs.items():
+        for root_idx, tuple_graph in instance_data.get_tuple_graphs().items():
             if instance_data.is_deadend(root_idx):
                 continue
 
-            tuple_graph = instance_data.tuple_graphs[root_idx]
             tuple_graph_equivalence = instance_data.tuple_graph_equivalences[root_idx]
             # compute order
             order = defaultdict(set)
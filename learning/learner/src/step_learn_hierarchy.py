@@ -7,11 +7,15 @@ from learner.src.returncodes import ExitCode
 from learner.src.instance_data.instance_data_factory import InstanceDataFactory
 from learner.src.iteration_data.hierarchical_sketch import HierarchicalSketch
 from learner.src.iteration_data.domain_feature_data import DomainFeatureData
+from learner.src.util.tracing import enable_tracing, print_trace_summary, span, write_chrome_trace
 
 
 def run(config, data, rng):
+    if config.trace:
+        enable_tracing()
     logging.info(colored("Initializing InstanceDatas...", "blue", "on_grey"))
-    instance_datas, domain_data = InstanceDataFactory().make_instance_datas(config)
+    with span("InstanceDatas"):
+        instance_datas, domain_data = InstanceDataFactory().make_instance_datas(config, rng)
     logging.info(colored("..done", "blue", "on_grey"))
 
     root_hierarchical_sketch = HierarchicalSketch(
@@ -23,15 +27,23 @@ def run(config, data, rng):
         DomainFeatureData(),
         config.width + 1,  # Assume Q_n has width k+1, s.t. in first sketch computation sketch has width k+1-1=k
     )
+    # Only the root keeps the instance datas such that they can be released
+    del instance_datas
     # Learn sketches in BrFS mode, i.e., refine sketches with largest width first
     queue = deque()
     queue.append(root_hierarchical_sketch)
     while queue:
         current_hierarchical_sketch = queue.popleft()
-        children = current_hierarchical_sketch.refine()
+        with span("HierarchicalSketch", workspace=current_hierarchical_sketch.workspace_output, width=current_hierarchical_sketch.width):
+            children = current_hierarchical_sketch.refine()
+        # The training data is no longer needed, hence memory is bounded by the frontier
+        current_hierarchical_sketch.release()
         queue.extend(children)
 
     logging.info(colored("Summary:", "yellow", "on_grey"))
     logging.info(colored("Hierarchical sketch:", "green", "on_grey"))
     root_hierarchical_sketch.print()
+    if config.trace:
+        print_trace_summary()
+        write_chrome_trace(config.workspace / "trace.json")
     return ExitCode.Success, None
@@ -0,0 +1,262 @@
+""" Module description: runs the learner on benchmark domains and compares per stage time, memory and ground program size to a baseline.
+"""
+import json
+import time
+
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List
+
+from learner.src.asp.asp_factory import ASPFactory
+from learner.src.driver import BASEDIR
+from learner.src.returncodes import ExitCode
+from learner.src.util.defaults import generate_experiment
+from learner.src.util.file_system import create_directory_for_filename
+from learner.src.util.tracing import read_chrome_trace
+from learner.src.util.version import get_version
+
+
+DEFAULT_BENCHMARK_DIR = BASEDIR.parent / "testing" / "planners" / "h-policy" / "downward-h-policy" / "libs" / "dlplan" / "benchmarks"
+
+# Fixed settings such that results are comparable across revisions.
+DEFAULT_SETTINGS = dict(
+    width=1,
+    max_states_per_instance=500,
+    max_time_per_instance=10,
+    concept_complexity_limit=5,
+    role_complexity_limit=5,
+    boolean_complexity_limit=5,
+    count_numerical_complexity_limit=5,
+    distance_numerical_complexity_limit=5,
+    max_num_rules=4,
+    num_workers=1,
+    random_seed=0,
+)
+
+# Pipeline stage -> names of the spans recorded in the trace
+STAGES = {
+    "state_space": ["InstanceDatas"],
+    "feature_generation": ["DomainFeatureData"],
+    "valuation": ["FeatureValuations"],
+    "equivalences": ["TupleGraphs", "StatePairEquivalences", "TupleGraphEquivalences", "TupleGraphEquivalenceMinimizer"],
+    "asp_ground": ["Facts", "Grounding"],
+    "asp_solve": ["Solving"],
+    "verification": ["SelectedVerification", "Verification"],
+}
+
+
+def find_domains(benchmark_dir: Path, domain_names: List[str] = None):
+    """ Returns the directories in benchmark_dir that contain a domain.pddl, restricted to domain_names if given. """
+    domain_dirs = sorted(path for path in Path(benchmark_dir).iterdir() if (path / "domain.pddl").is_file())
+    if domain_names:
+        name_to_domain_dir = {domain_dir.name: domain_dir for domain_dir in domain_dirs}
+        missing = [name for name in domain_names if name not in name_to_domain_dir]
+        if missing:
+            raise RuntimeError(f"No benchmark domains named {', '.join(missing)} in {benchmark_dir}")
+        domain_dirs = [name_to_domain_dir[name] for name in domain_names]
+    return domain_dirs
+
+
+def _remove_nested_events(events: List[Dict]):
+    """ Keeps only the outermost events such that nested spans of the same stage are not counted twice. """
+    outermost_events = []
+    for event in sorted(events, key=lambda event: (event["pid"], event["ts"], -event["dur"])):
+        if outermost_events:
+            last = outermost_events[-1]
+            if last["pid"] == event["pid"] and event["ts"] + event["dur"] <= last["ts"] + last["dur"]:
+                continue
+        outermost_events.append(event)
+    return outermost_events
+
+
+def _get_totals(event: Dict):
+    return {
+        "wall_seconds": event["dur"] / 1e6,
+        "cpu_seconds": event["args"]["cpu_seconds"],
+        "peak_rss_mb_increase": event["args"].get("peak_rss_mb_increase", 0),
+    }
+
+
+def _compute_stage_totals(span_events: List[Dict]):
+    """ Returns the wall time, CPU time and increase of the peak memory of each stage where each moment is counted
+        for the innermost span of a stage, e.g., tuple graphs that are built during verification are counted
+        for the equivalences and not for the verification. """
+    name_to_stage = {name: stage for stage, names in STAGES.items() for name in names}
+    stage_to_totals = {stage: defaultdict(float) for stage in STAGES}
+    open_events = []
+    for event in sorted((event for event in span_events if event["name"] in name_to_stage), key=lambda event: (event["pid"], event["ts"], -event["dur"])):
+        while open_events and (open_events[-1]["pid"] != event["pid"] or event["ts"] + event["dur"] > open_events[-1]["ts"] + open_events[-1]["dur"]):
+            open_events.pop()
+        for key, value in _get_totals(event).items():
+            stage_to_totals[name_to_stage[event["name"]]][key] += value
+            if open_events:
+                # The enclosing span does not count the nested span.
+                stage_to_totals[name_to_stage[open_events[-1]["name"]]][key] -= value
+        open_events.append(event)
+    return stage_to_totals
+
+
+def _compute_peak_rss(event: Dict):
+    """ Returns the peak resident memory during the span, which is the peak of the process if the span increased it
+        and otherwise at least the resident memory at the start and the end. """
+    args = event["args"]
+    if args.get("peak_rss_mb_increase", 0) > 0:
+        return args["peak_rss_mb"]
+    return max(args["rss_mb_start"], args["rss_mb_end"])
+
+
+def summarize_trace(events: List[Dict]):
+    """ Returns the wall time, CPU time and peak memory of each stage and the size of the largest ground program. """
+    span_events = [event for event in events if event["ph"] == "X"]
+    stage_to_totals = _compute_stage_totals(span_events)
+    stages = dict()
+    for stage, names in STAGES.items():
+        stage_events = _remove_nested_events([event for event in span_events if event["name"] in names])
+        stages[stage] = {
+            "count": len(stage_events),
+            # Rounding of nested times must not result in negative totals.
+            "wall_seconds": max(stage_to_totals[stage]["wall_seconds"], 0),
+            "cpu_seconds": max(stage_to_totals[stage]["cpu_seconds"], 0),
+            "peak_rss_mb": max((_compute_peak_rss(event) for event in stage_events), default=0),
+            "peak_rss_mb_increase": max(stage_to_totals[stage]["peak_rss_mb_increase"], 0),
+        }
+    ground_program = {
+        "num_facts": max((int(event["args"]["num_facts"]) for event in span_events if event["name"] == "Grounding"), default=0),
+        "num_atoms": max((int(event["args"].get("num_atoms", 0)) for event in span_events if event["name"] == "Solving"), default=0),
+        "num_rules": max((int(event["args"].get("num_rules", 0)) for event in span_events if event["name"] == "Solving"), default=0),
+    }
+    return {
+        "stages": stages,
+        "ground_program": ground_program,
+        "num_iterations": sum(1 for event in span_events if event["name"] == "Iteration"),
+        "num_hierarchy_nodes": sum(1 for event in span_events if event["name"] == "HierarchicalSketch"),
+        "peak_rss_mb": max([event["args"]["rss_mb"] for event in events if event["ph"] == "C"]
+                           + [event["args"].get("peak_rss_mb", 0) for event in span_events], default=0),
+    }
+
+
+def run_domain(domain_dir: Path, workspace: Path, settings: Dict, write_facts: bool = False):
+    """ Learns a hierarchical sketch for the instances in domain_dir with tracing enabled and returns the summary of the trace.
+        If write_facts is True then the facts of each iteration are written as input to tune_asp. """
+    domain_filename = domain_dir / "domain.pddl"
+    instance_filenames = sorted(path for path in domain_dir.iterdir() if path.suffix == ".pddl" and path != domain_filename)
+    experiment = generate_experiment(domain_filename, instance_filenames, workspace, pipeline="hierarchy", trace=True, quiet=True, asp_write_facts=write_facts, **settings)
+    start = time.perf_counter()
+    exitcode = experiment.run()
+    wall_seconds = time.perf_counter() - start
+    trace_filename = workspace / "trace.json"
+    result = summarize_trace(read_chrome_trace(trace_filename)) if trace_filename.is_file() else summarize_trace([])
+    result["success"] = exitcode == ExitCode.Success
+    result["wall_seconds"] = wall_seconds
+    return result
+
+
+def run_benchmarks(domain_dirs: List[Path], workspace: Path, settings: Dict, write_facts: bool = False):
+    results = {"version": get_version(), "settings": settings, "domains": dict()}
+    for domain_dir in domain_dirs:
+        results["domains"][domain_dir.name] = run_domain(domain_dir, workspace / domain_dir.name, settings, write_facts)
+    return results
+
+
+def compare_to_baseline(results: Dict, baseline: Dict, time_tolerance: float, memory_tolerance: float, min_seconds: float):
+    """ Returns a message for each regression of results with respect to the baseline.
+
+    Time and memory regress if they exceed the baseline by the relative tolerance,
+    where time differences below min_seconds are ignored as noise.
+    Ground program sizes and the success of a domain are deterministic, hence every increase is reported.
+    """
+    regressions = []
+    if results["settings"] != baseline["settings"]:
+        regressions.append(f"Settings differ from the baseline: {results['settings']} vs. {baseline['settings']}")
+    for domain, baseline_result in baseline["domains"].items():
+        result = results["domains"].get(domain)
+        if result is None:
+            continue
+        if baseline_result["success"] and not result["success"]:
+            regressions.append(f"{domain}: learning failed")
+        for stage, baseline_stage in baseline_result["stages"].items():
+            stage_result = result["stages"][stage]
+            if stage_result["wall_seconds"] > baseline_stage["wall_seconds"] * (1 + time_tolerance) \
+                    and stage_result["wall_seconds"] - baseline_stage["wall_seconds"] > min_seconds:
+                regressions.append("{}: {} took {:.2f} sec, baseline {:.2f} sec".format(domain, stage, stage_result["wall_seconds"], baseline_stage["wall_seconds"]))
+            if stage_result["peak_rss_mb"] > baseline_stage["peak_rss_mb"] * (1 + memory_tolerance):
+                regressions.append("{}: {} used {:.2f} MB, baseline {:.2f} MB".format(domain, stage, stage_result["peak_rss_mb"], baseline_stage["peak_rss_mb"]))
+        for key, baseline_size in baseline_result["ground_program"].items():
+            if result["ground_program"][key] > baseline_size:
+                regressions.append(f"{domain}: ground program has {result['ground_program'][key]} {key[4:]}, baseline {baseline_size}")
+    return regressions
+
+
+def print_results(results: Dict):
+    print("Benchmark results:")
+    for domain, result in results["domains"].items():
+        print("    {}: {}, {:.2f} sec, {:.2f} MB, {} iterations, {} atoms, {} rules".format(
+            domain, "solved" if result["success"] else "failed", result["wall_seconds"], result["peak_rss_mb"],
+            result["num_iterations"], result["ground_program"]["num_atoms"], result["ground_program"]["num_rules"]))
+        for stage, stage_result in result["stages"].items():
+            print("        {}: {:.2f} sec, {:.2f} MB".format(stage, stage_result["wall_seconds"], stage_result["peak_rss_mb"]))
+
+
+def write_results(results: Dict, filename: Path):
+    create_directory_for_filename(str(filename))
+    with open(filename, "w") as f:
+        json.dump(results, f, indent=2)
+
+
+def read_results(filename: Path):
+    with open(filename, "r") as f:
+        return json.load(f)
+
+
+def find_facts(paths: List[Path]):
+    """ Returns the given facts files and the facts.lp files in the given directories. """
+    facts_filenames = []
+    for path in paths:
+        path = Path(path)
+        facts_filenames.extend(sorted(path.rglob("facts.lp")) if path.is_dir() else [path])
+    return facts_filenames
+
+
+def tune_asp(facts_filenames: List[Path], problem_filename: Path, max_num_rules: int, asp_settings: List[Dict], time_budget: float = None):
+    """ Solves the problem with the facts of each file under each setting of the ASP solver
+        and returns the solve time, cost and optimality of each run.
+        A setting is a dict with the keyword arguments num_threads, configuration and opt_strategy of ASPFactory.
+    """
+    runs = []
+    for facts_filename in facts_filenames:
+        for asp_setting in asp_settings:
+            asp_factory = ASPFactory(max_num_rules, **asp_setting)
+            asp_factory.load_problem_file(problem_filename)
+            asp_factory.load_problem_file(facts_filename)
+            start = time.perf_counter()
+            asp_factory.ground([])
+            ground_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            _, returncode = asp_factory.solve(time_budget)
+            solve_seconds = time.perf_counter() - start
+            runs.append({
+                "facts": str(facts_filename),
+                "setting": asp_setting,
+                "ground_seconds": ground_seconds,
+                "solve_seconds": solve_seconds,
+                "returncode": returncode.name,
+                "cost": asp_factory.cost,
+                "optimality_proven": asp_factory.optimality_proven,
+            })
+    return runs
+
+
+def print_tuning_results(runs: List[Dict]):
+    """ Prints each run and the total solve time and number of proven optima per setting. """
+    print("ASP tuning results:")
+    for run in runs:
+        print("    {} {}: {:.2f} sec, {}, cost {}, optimal {}".format(
+            run["facts"], run["setting"], run["solve_seconds"], run["returncode"], run["cost"], run["optimality_proven"]))
+    print("Totals per setting:")
+    setting_to_runs = dict()
+    for run in runs:
+        setting_to_runs.setdefault(json.dumps(run["setting"], sort_keys=True), []).append(run)
+    for setting, setting_runs in sorted(setting_to_runs.items(), key=lambda item: sum(run["solve_seconds"] for run in item[1])):
+        print("    {}: {:.2f} sec, {}/{} optimal".format(
+            setting, sum(run["solve_seconds"] for run in setting_runs),
+            sum(1 for run in setting_runs if run["optimality_proven"]), len(setting_runs)))
@@ -93,6 +93,9 @@ def setup_argparser():
     parser.add_argument('-bc', '--boolean_complexity_limit', default=None, type=int, help='upper bound on the boolean feature complexity')
     parser.add_argument('-ncc', '--count_numerical_complexity_limit', default=None, type=int, help='upper bound on the numerical feature complexity')
     parser.add_argument('-ndc', '--distance_numerical_complexity_limit', default=None, type=int, help='upper bound on the numerical feature complexity')
+    parser.add_argument('--asp_num_threads', default=None, type=int, help='number of clingo threads that solve in competition')
+    parser.add_argument('--asp_configuration', default=None, help='clingo configuration portfolio, e.g., trendy, crafty or many')
+    parser.add_argument('--asp_opt_strategy', default=None, help='clingo optimization strategy, e.g., bb or usc')
 
     return parser
 
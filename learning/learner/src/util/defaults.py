@@ -31,15 +31,63 @@ def generate_experiment(domain_filename: str, instance_filenames: List[str], wor
         feature_limit=1000000,
 
         closed_Q=True,
+        # If not None then learning starts from this many initial states per instance in closed_Q mode
+        # and failing initial states are added in subsequent iterations.
+        num_sampled_initial_states=None,
 
         width=2,
 
         max_num_rules=4,
+        # Learn only from one of the instances with equal state space colorings, the others are only verified.
+        # Off by default because the color refinement runs in Python over all states and transitions of every
+        # instance in each learn_sketch call, which costs more than it saves unless many instances are isomorphic.
+        # Subproblems are reduced when their sketch is learned, but all of them are still generated and kept.
+        eliminate_isomorphic_instances=False,
+        # Reuse the sketches of nodes in the hierarchy whose subproblems are equal
+        memoize_sketches=True,
+        # Write states, initial states and goal states of each node to the learning workspace before its training data is released
+        spill_released_instance_datas=False,
+
+        # If not None then tuple graphs are evicted when their estimated size in MB exceeds this limit.
+        tuple_graph_cache_memory_limit=None,
+        # Write evicted tuple graphs to the workspace instead of rebuilding them
+        spill_tuple_graphs=False,
+
+        # The number of unsolved instances that are added to the selected instances in each iteration,
+        # chosen by "size" (smallest first) or by "diversity" (smallest per reason of failure).
+        num_counterexamples=1,
+        counterexample_strategy="size",
+        # The number of worker processes, e.g., for verification and feature valuation
+        num_workers=1,
 
         asp_name="h-policy-explicit.lp",
+        # Time budget in seconds of each ASP solver call, None means solving until optimality is proven.
+        # After the budget the best model found so far is used, or solving is retried with a budget
+        # multiplied by asp_retry_budget_factor if no model was found or if suboptimal models are not accepted.
+        asp_time_budget=None,
+        asp_num_retries=2,
+        asp_retry_budget_factor=2,
+        asp_accept_suboptimal=True,
+        # The number of clingo threads that solve in competition, the clingo configuration portfolio, e.g., "trendy", "crafty" or "many",
+        # and the optimization strategy, e.g., "bb" or "usc". None uses the clingo default. See tune_asp.py for comparing settings.
+        asp_num_threads=1,
+        asp_configuration=None,
+        asp_opt_strategy=None,
+        # Write the facts of each iteration to facts.lp in the iteration directory, e.g., as input to tune_asp.py
+        asp_write_facts=False,
+        # Time limit in seconds of the native goal separating feature selector before falling back to ASP, None means ASP only
+        goal_separating_selector_time_limit=60,
 
         add_features=[],
         generate_features=True,
+        # Keep only the cheapest feature among features with equal valuations on the selected instances
+        deduplicate_features=True,
+        # The maximum number of features whose valuations are kept per instance across iterations.
+        # The features of the current feature pool are always kept, None means no limit.
+        preprocessing_cache_max_features=10000,
+
+        # Record the time and memory of each node, iteration and phase in workspace/trace.json (Chrome trace format)
+        trace=False,
 
         quiet=False,
         random_seed=0,
@@ -0,0 +1,31 @@
+import multiprocessing
+
+# The shared context of the current parallel map.
+# It is inherited by the forked workers and hence never pickled,
+# which is necessary because dlplan objects do not support pickling.
+_context = None
+
+
+def _apply(args):
+    function, item = args
+    return function(_context, item)
+
+
+def parallel_map(function, context, items, num_workers: int):
+    """ Lazily yields function(context, item) for all items in order.
+
+    If num_workers > 1 then the items are processed by forked worker processes.
+    The function must be defined at module level and its results must be picklable.
+    Closing the generator early terminates the workers.
+    """
+    global _context
+    if num_workers <= 1:
+        for item in items:
+            yield function(context, item)
+        return
+    _context = context
+    try:
+        with multiprocessing.get_context("fork").Pool(processes=num_workers) as pool:
+            yield from pool.imap(_apply, [(function, item) for item in items])
+    finally:
+        _context = None
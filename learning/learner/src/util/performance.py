@@ -42,6 +42,11 @@ def memory_usage():
     return mem
 
 
+def peak_memory_usage():
+    """ Return the peak memory usage of this process so far in MB """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
 def print_memory_usage():
     logging.info("Total memory usage: {:.2f}MB".format(memory_usage()))
     logging.info('Max. memory usage: {:.2f}MB'.format(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
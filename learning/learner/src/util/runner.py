@@ -34,7 +34,7 @@ def report_and_exit(msg):
     sys.exit(-1)
 
 
-def do(domain_filename, task_dir, workspace, expid=None, pipeline=None, width=None, concept_complexity_limit=None, role_complexity_limit=None, boolean_complexity_limit=None, count_numerical_complexity_limit=None, distance_numerical_complexity_limit=None):
+def do(domain_filename, task_dir, workspace, expid=None, pipeline=None, width=None, concept_complexity_limit=None, role_complexity_limit=None, boolean_complexity_limit=None, count_numerical_complexity_limit=None, distance_numerical_complexity_limit=None, asp_num_threads=None, asp_configuration=None, asp_opt_strategy=None):
     experiment = dict()
     if expid is not None:
         name_parts = expid.split(":")
@@ -75,6 +75,12 @@ def do(domain_filename, task_dir, workspace, expid=None, pipeline=None, width=No
         parameters["count_numerical_complexity_limit"] = count_numerical_complexity_limit
     if distance_numerical_complexity_limit is not None:
         parameters["distance_numerical_complexity_limit"] = distance_numerical_complexity_limit
+    if asp_num_threads is not None:
+        parameters["asp_num_threads"] = asp_num_threads
+    if asp_configuration is not None:
+        parameters["asp_configuration"] = asp_configuration
+    if asp_opt_strategy is not None:
+        parameters["asp_opt_strategy"] = asp_opt_strategy
 
     # Sets up experiment
     experiment = generate_experiment(**parameters)
@@ -94,4 +100,7 @@ def run():
         args.role_complexity_limit,
         args.boolean_complexity_limit,
         args.count_numerical_complexity_limit,
-        args.distance_numerical_complexity_limit)
+        args.distance_numerical_complexity_limit,
+        args.asp_num_threads,
+        args.asp_configuration,
+        args.asp_opt_strategy)
@@ -0,0 +1,114 @@
+""" Module description: records nested spans of the learner with wall time, CPU time and memory usage.
+
+Spans are exported in the Chrome trace event format that can be opened in chrome://tracing or https://ui.perfetto.dev
+"""
+import json
+import os
+import time
+
+from collections import defaultdict
+from contextlib import contextmanager
+
+from learner.src.util.file_system import create_directory_for_filename
+from learner.src.util.performance import memory_usage, peak_memory_usage
+
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.start = time.perf_counter()
+        self.events = []
+        self.depth = 0
+
+
+_tracer = Tracer()
+
+
+def enable_tracing():
+    """ Starts recording spans, previously recorded spans are discarded. """
+    _tracer.enabled = True
+    _tracer.start = time.perf_counter()
+    _tracer.events = []
+    _tracer.depth = 0
+
+
+def is_tracing_enabled():
+    return _tracer.enabled
+
+
+@contextmanager
+def span(name: str, **args):
+    """ Records the enclosed block as a span with the given name and arguments if tracing is enabled.
+
+    Yields the arguments of the span such that the enclosed block can add results, e.g., sizes.
+    Besides the resident memory at the start and the end, the peak resident memory of the process
+    at the end and how much the span increased it are recorded, such that a peak within the span is not missed.
+    """
+    if not _tracer.enabled:
+        yield dict(args)
+        return
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    rss_start = memory_usage()
+    peak_rss_start = peak_memory_usage()
+    _tracer.depth += 1
+    try:
+        yield args
+    finally:
+        _tracer.depth -= 1
+        wall_end = time.perf_counter()
+        rss_end = memory_usage()
+        peak_rss_end = peak_memory_usage()
+        pid = os.getpid()
+        _tracer.events.append({
+            "name": name,
+            "cat": "learner",
+            "ph": "X",
+            "ts": (wall_start - _tracer.start) * 1e6,
+            "dur": (wall_end - wall_start) * 1e6,
+            "pid": pid,
+            "tid": pid,
+            "args": {
+                **{key: value if isinstance(value, (int, float)) else str(value) for key, value in args.items()},
+                "depth": _tracer.depth,
+                "cpu_seconds": time.process_time() - cpu_start,
+                "rss_mb_start": rss_start,
+                "rss_mb_end": rss_end,
+                "peak_rss_mb": peak_rss_end,
+                "peak_rss_mb_increase": peak_rss_end - peak_rss_start,
+            }})
+        _tracer.events.append({
+            "name": "rss_mb",
+            "ph": "C",
+            "ts": (wall_end - _tracer.start) * 1e6,
+            "pid": pid,
+            "args": {"rss_mb": rss_end}})
+
+
+def read_chrome_trace(filename):
+    """ Returns the events of a trace written by write_chrome_trace. """
+    with open(filename, "r") as f:
+        return json.load(f)["traceEvents"]
+
+
+def write_chrome_trace(filename):
+    """ Writes all recorded spans to the given file in the Chrome trace event format. """
+    create_directory_for_filename(str(filename))
+    with open(filename, "w") as f:
+        json.dump({"traceEvents": _tracer.events, "displayTimeUnit": "ms"}, f)
+
+
+def print_trace_summary():
+    """ Prints the accumulated wall time and CPU time of spans with the same name. """
+    name_to_count = defaultdict(int)
+    name_to_wall_seconds = defaultdict(float)
+    name_to_cpu_seconds = defaultdict(float)
+    for event in _tracer.events:
+        if event["ph"] != "X":
+            continue
+        name_to_count[event["name"]] += 1
+        name_to_wall_seconds[event["name"]] += event["dur"] / 1e6
+        name_to_cpu_seconds[event["name"]] += event["args"]["cpu_seconds"]
+    print("Trace summary:")
+    for name in sorted(name_to_wall_seconds.keys(), key=lambda name: -name_to_wall_seconds[name]):
+        print("    {}: {} spans, {:.2f} wall sec, {:.2f} CPU sec".format(name, name_to_count[name], name_to_wall_seconds[name], name_to_cpu_seconds[name]))
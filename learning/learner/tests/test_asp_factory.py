@@ -0,0 +1,34 @@
+from learner.src.asp.asp_factory import ASPFactory
+from learner.src.asp.returncodes import ClingoExitCode
+
+
+class ScriptedASPFactory(ASPFactory):
+    """ Returns the given (symbols, cost, optimality_proven) per attempt, None if no model was found. """
+    def __init__(self, attempts):
+        super().__init__()
+        self.attempts = list(attempts)
+        self.time_budgets = []
+
+    def solve(self, time_budget=None):
+        self.time_budgets.append(time_budget)
+        attempt = self.attempts.pop(0)
+        if attempt is None:
+            self.cost, self.optimality_proven = None, False
+            return None, ClingoExitCode.INTERRUPTED
+        symbols, self.cost, self.optimality_proven = attempt
+        return symbols, ClingoExitCode.SATISFIABLE
+
+
+def test_best_model_of_all_attempts_is_returned():
+    asp_factory = ScriptedASPFactory([(["a"], [3], False), (["b"], [2], False), None])
+    symbols, returncode = asp_factory.solve_within_budget(1, num_retries=2, accept_suboptimal=False)
+    assert asp_factory.time_budgets == [1, 2, 4]
+    assert (symbols, returncode) == (["b"], ClingoExitCode.SATISFIABLE)
+    assert asp_factory.cost == [2]
+    assert not asp_factory.optimality_proven
+
+
+def test_no_model_in_any_attempt():
+    asp_factory = ScriptedASPFactory([None, None])
+    symbols, returncode = asp_factory.solve_within_budget(1, num_retries=1)
+    assert (symbols, returncode) == (None, ClingoExitCode.INTERRUPTED)
@@ -0,0 +1,53 @@
+from learner.src.util.benchmark import summarize_trace
+
+
+def make_span(name, ts, dur, cpu_seconds, rss_mb_start=100, rss_mb_end=100, peak_rss_mb=200, peak_rss_mb_increase=0, pid=1, **args):
+    return {"name": name, "ph": "X", "ts": ts * 1e6, "dur": dur * 1e6, "pid": pid, "args": {
+        "cpu_seconds": cpu_seconds,
+        "rss_mb_start": rss_mb_start,
+        "rss_mb_end": rss_mb_end,
+        "peak_rss_mb": peak_rss_mb,
+        "peak_rss_mb_increase": peak_rss_mb_increase,
+        **args}}
+
+
+def test_nested_spans_of_other_stages_are_counted_once():
+    events = [
+        make_span("Verification", 0, 10, 8),
+        # Tuple graphs that are built during verification.
+        make_span("TupleGraphs", 1, 3, 2),
+        make_span("TupleGraphs", 5, 1, 1),
+        make_span("StatePairEquivalences", 20, 2, 2),
+        # Nested spans of the same stage are counted once.
+        make_span("Verification", 30, 4, 4),
+        make_span("SelectedVerification", 31, 2, 2),
+        # Spans of other processes are not nested.
+        make_span("TupleGraphs", 2, 1, 1, pid=2),
+    ]
+    stages = summarize_trace(events)["stages"]
+    assert stages["verification"]["wall_seconds"] == 6 + 4
+    assert stages["verification"]["cpu_seconds"] == 5 + 4
+    assert stages["verification"]["count"] == 2
+    assert stages["equivalences"]["wall_seconds"] == 3 + 1 + 2 + 1
+    assert stages["equivalences"]["cpu_seconds"] == 2 + 1 + 2 + 1
+    assert stages["equivalences"]["count"] == 4
+
+
+def test_stage_peaks_include_peaks_within_spans():
+    events = [
+        # The peak of the process during the span exceeds the memory at its start and end.
+        make_span("FeatureValuations", 0, 10, 10, rss_mb_start=100, rss_mb_end=120, peak_rss_mb=300, peak_rss_mb_increase=50),
+        # The span did not increase the peak of the process, which was reached before.
+        make_span("Solving", 20, 10, 10, rss_mb_start=150, rss_mb_end=140, peak_rss_mb=300),
+        make_span("Grounding", 40, 10, 10, rss_mb_start=150, rss_mb_end=180, peak_rss_mb=400, peak_rss_mb_increase=100, num_facts=10),
+        make_span("Facts", 41, 1, 1, rss_mb_start=150, rss_mb_end=150, peak_rss_mb=350, peak_rss_mb_increase=50),
+    ]
+    summary = summarize_trace(events)
+    stages = summary["stages"]
+    assert stages["valuation"]["peak_rss_mb"] == 300
+    assert stages["valuation"]["peak_rss_mb_increase"] == 50
+    assert stages["asp_solve"]["peak_rss_mb"] == 150
+    assert stages["asp_solve"]["peak_rss_mb_increase"] == 0
+    assert stages["asp_ground"]["peak_rss_mb"] == 400
+    assert stages["asp_ground"]["peak_rss_mb_increase"] == 100
+    assert summary["peak_rss_mb"] == 400
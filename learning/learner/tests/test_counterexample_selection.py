@@ -0,0 +1,18 @@
+from learner.src.instance_data.instance_data import InstanceData
+from learner.src.iteration_data.counterexample_selection import update_selected_instance_idxs
+
+
+def make_instance_data(instance_idx, is_isomorphic_duplicate=False):
+    return InstanceData(instance_idx, None, None, None, is_isomorphic_duplicate=is_isomorphic_duplicate)
+
+
+def test_larger_counterexamples_replace_selected_instances():
+    assert update_selected_instance_idxs([0, 2], [make_instance_data(3), make_instance_data(5)]) == [3, 5]
+
+
+def test_smaller_counterexamples_are_added():
+    assert update_selected_instance_idxs([0, 4], [make_instance_data(2), make_instance_data(5)]) == [0, 4, 2, 5]
+
+
+def test_isomorphic_duplicates_are_added():
+    assert update_selected_instance_idxs([0, 2], [make_instance_data(3, True)]) == [0, 2, 3]
@@ -0,0 +1,79 @@
+from learner.src.domain_data.domain_data import DomainData
+from learner.src.instance_data.instance_data import InstanceData
+from learner.src.iteration_data.domain_feature_data import DomainFeatureData, Feature
+from learner.src.iteration_data.domain_feature_data_reducer import DomainFeatureDataReducer
+from learner.src.iteration_data.feature_valuations import StateFeatureValuation
+
+
+class DlplanFeature:
+    def __init__(self, index, f_repr):
+        self.index = index
+        self.f_repr = f_repr
+
+    def get_index(self):
+        return self.index
+
+    def compute_repr(self):
+        return self.f_repr
+
+
+def make_instance_data(instance_idx, b_idx_to_valuations, n_idx_to_valuations):
+    instance_data = InstanceData(instance_idx, None, None, None)
+    instance_data.boolean_feature_valuations = b_idx_to_valuations
+    instance_data.numerical_feature_valuations = n_idx_to_valuations
+    num_states = len(next(iter(b_idx_to_valuations.values())))
+    instance_data.set_feature_valuations({
+        s_idx: StateFeatureValuation(
+            s_idx,
+            {b_idx: valuations[s_idx] for b_idx, valuations in b_idx_to_valuations.items()},
+            {n_idx: valuations[s_idx] for n_idx, valuations in n_idx_to_valuations.items()})
+        for s_idx in range(num_states)})
+    return instance_data
+
+
+def make_domain_data(boolean_complexities, numerical_complexities):
+    domain_feature_data = DomainFeatureData()
+    for b_idx, complexity in boolean_complexities.items():
+        domain_feature_data.boolean_features.add_feature(Feature(DlplanFeature(b_idx, f"b{b_idx}"), complexity))
+    for n_idx, complexity in numerical_complexities.items():
+        domain_feature_data.numerical_features.add_feature(Feature(DlplanFeature(n_idx, f"n{n_idx}"), complexity))
+    return DomainData(None, None, None, None, None, domain_feature_data)
+
+
+def test_lowest_complexity_feature_of_each_class_is_kept():
+    domain_data = make_domain_data({0: 3, 1: 1, 2: 2, 3: 2, 4: 1}, {0: 4, 1: 2, 2: 5})
+    instance_datas = [
+        make_instance_data(0,
+            # b0, b1 and b2 are equal, b3 and b4 are equal on this instance only
+            {0: [True, False], 1: [True, False], 2: [True, False], 3: [False, False], 4: [False, False]},
+            {0: [2, 1], 1: [2, 1], 2: [0, 1]}),
+        make_instance_data(1,
+            {0: [False, True, True], 1: [False, True, True], 2: [False, True, True], 3: [True, False, True], 4: [True, False, False]},
+            {0: [0, 3, 4], 1: [0, 3, 4], 2: [0, 3, 4]}),
+    ]
+    reducer = DomainFeatureDataReducer()
+    reducer.reduce(domain_data, instance_datas)
+    boolean_features = domain_data.domain_feature_data.boolean_features
+    numerical_features = domain_data.domain_feature_data.numerical_features
+    assert sorted(boolean_features.f_idx_to_feature.keys()) == [1, 3, 4]
+    assert sorted(boolean_features.f_repr_to_feature.keys()) == ["b1", "b3", "b4"]
+    assert sorted(numerical_features.f_idx_to_feature.keys()) == [1, 2]
+    for instance_data in instance_datas:
+        assert sorted(instance_data.boolean_feature_valuations.keys()) == [1, 3, 4]
+        assert sorted(instance_data.numerical_feature_valuations.keys()) == [1, 2]
+        for feature_valuation in instance_data.feature_valuations.values():
+            assert sorted(feature_valuation.b_idx_to_val.keys()) == [1, 3, 4]
+            assert sorted(feature_valuation.n_idx_to_val.keys()) == [1, 2]
+    assert reducer.statistics.num_boolean_features_before == 5
+    assert reducer.statistics.num_boolean_features_after == 3
+    assert reducer.statistics.num_numerical_features_before == 3
+    assert reducer.statistics.num_numerical_features_after == 2
+
+
+def test_boolean_and_numerical_features_are_reduced_separately():
+    # The Boolean and the numerical feature have equal valuations because True == 1 and False == 0.
+    domain_data = make_domain_data({0: 2}, {0: 1})
+    instance_datas = [make_instance_data(0, {0: [True, False]}, {0: [1, 0]})]
+    DomainFeatureDataReducer().reduce(domain_data, instance_datas)
+    assert list(domain_data.domain_feature_data.boolean_features.f_idx_to_feature.keys()) == [0]
+    assert list(domain_data.domain_feature_data.numerical_features.f_idx_to_feature.keys()) == [0]
@@ -0,0 +1,49 @@
+import os
+import signal
+import sys
+
+import pytest
+
+from learner.src.driver import Bunch, SubprocessStepRunner
+from learner.src.errors import CriticalPipelineError
+from learner.src.returncodes import ExitCode
+
+
+def succeed(config, data, rng):
+    return ExitCode.Success, None
+
+
+def exit_with_code(config, data, rng):
+    sys.exit(3)
+
+
+def kill(config, data, rng):
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+def raise_error(config, data, rng):
+    raise ValueError("invalid value")
+
+
+def run(target, tmp_path):
+    runner = SubprocessStepRunner(1, "test step", target, [])
+    return runner.run(Bunch(dict(quiet=True, workspace=tmp_path, random_seed=0)))
+
+
+def test_result_of_the_subprocess_is_returned(tmp_path):
+    assert run(succeed, tmp_path) == ExitCode.Success
+
+
+def test_exit_of_the_subprocess_raises_an_error_with_its_exit_code(tmp_path):
+    with pytest.raises(CriticalPipelineError, match="code 3"):
+        run(exit_with_code, tmp_path)
+
+
+def test_killed_subprocess_raises_an_error_with_its_exit_code(tmp_path):
+    with pytest.raises(CriticalPipelineError, match=f"code -{int(signal.SIGKILL)}"):
+        run(kill, tmp_path)
+
+
+def test_errors_of_the_subprocess_are_raised(tmp_path):
+    with pytest.raises(CriticalPipelineError, match="invalid value"):
+        run(raise_error, tmp_path)
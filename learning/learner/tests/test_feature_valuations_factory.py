@@ -0,0 +1,67 @@
+from learner.src.instance_data.instance_data import InstanceData
+from learner.src.iteration_data.domain_feature_data import Feature
+from learner.src.iteration_data.feature_valuations_factory import FeatureValuationsFactory
+
+
+class State:
+    def __init__(self, atom_idxs):
+        self.atom_idxs = atom_idxs
+
+
+class StateSpace:
+    def __init__(self, states):
+        self.states = states
+
+    def get_states(self):
+        return self.states
+
+
+class CountAtoms:
+    """ Evaluates like a dlplan feature and records the evaluations in the given cache. """
+    def __init__(self, modulus):
+        self.modulus = modulus
+
+    def evaluate(self, state, denotations_caches):
+        denotations_caches.append((self.modulus, state.atom_idxs))
+        return len(state.atom_idxs) % self.modulus
+
+    def compute_repr(self):
+        return f"count_atoms_mod_{self.modulus}"
+
+
+class HasAtom:
+    def __init__(self, atom_idx):
+        self.atom_idx = atom_idx
+
+    def evaluate(self, state, denotations_caches):
+        denotations_caches.append((self.atom_idx, state.atom_idxs))
+        return self.atom_idx in state.atom_idxs
+
+    def compute_repr(self):
+        return f"has_atom_{self.atom_idx}"
+
+
+def make_instance_datas():
+    instance_datas = []
+    for instance_idx in range(3):
+        # Non contiguous state indices in the order of the state space
+        states = {7 * i + instance_idx: State(list(range(i % (instance_idx + 2), i))) for i in range(5 + 4 * instance_idx)}
+        instance_datas.append(InstanceData(instance_idx, None, [], None, state_space=StateSpace(states)))
+    return instance_datas
+
+
+def test_parallel_valuations_equal_serial_valuations():
+    numerical_features = [{f_idx: Feature(CountAtoms(f_idx + 2), 1) for f_idx in range(7)} for _ in range(3)]
+    boolean_features = [{f_idx: Feature(HasAtom(f_idx), 1) for f_idx in range(0, 20, 3)} for _ in range(3)]
+    # Instances with different features and one without features
+    numerical_features[1] = {f_idx: feature for f_idx, feature in numerical_features[1].items() if f_idx % 2}
+    boolean_features[2] = dict()
+    factory = FeatureValuationsFactory()
+    for f_idx_to_features, dtype in [(numerical_features, int), (boolean_features, bool)]:
+        serial_valuations = factory.evaluate_features_of_instances(make_instance_datas(), f_idx_to_features, dtype, 1)
+        parallel_valuations = factory.evaluate_features_of_instances(make_instance_datas(), f_idx_to_features, dtype, 2)
+        assert parallel_valuations == serial_valuations
+        for f_idx_to_valuations in parallel_valuations:
+            for valuations in f_idx_to_valuations.values():
+                assert all(type(valuation) == dtype for valuation in valuations)
+
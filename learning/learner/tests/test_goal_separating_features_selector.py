@@ -0,0 +1,131 @@
+import itertools
+import random
+
+from learner.src.domain_data.domain_data import DomainData
+from learner.src.instance_data.instance_data import InstanceData
+from learner.src.iteration_data.domain_feature_data import DomainFeatureData, Feature
+from learner.src.iteration_data.feature_valuations import StateFeatureValuation
+from learner.src.iteration_data.goal_separating_features_selector import GoalSeparatingFeaturesSelector, SelectorTimeout
+
+
+class DlplanFeature:
+    def __init__(self, index):
+        self.index = index
+
+    def get_index(self):
+        return self.index
+
+    def compute_repr(self):
+        return f"b{self.index}"
+
+
+class StateSpace:
+    def __init__(self, s_idxs, goal_s_idxs):
+        self.states = {s_idx: None for s_idx in s_idxs}
+        self.goal_s_idxs = goal_s_idxs
+
+    def get_states(self):
+        return self.states
+
+    def get_goal_state_indices(self):
+        return self.goal_s_idxs
+
+
+def make_domain_data(complexities):
+    domain_feature_data = DomainFeatureData()
+    for b_idx, complexity in enumerate(complexities):
+        domain_feature_data.boolean_features.add_feature(Feature(DlplanFeature(b_idx), complexity))
+    return DomainData(None, None, None, None, None, domain_feature_data)
+
+
+def make_instance_data(instance_idx, valuations, goal_s_idxs):
+    """ Returns an instance with a state for each row of the Boolean valuation matrix. """
+    instance_data = InstanceData(instance_idx, None, None, None, state_space=StateSpace(range(len(valuations)), goal_s_idxs))
+    instance_data.set_feature_valuations({
+        s_idx: StateFeatureValuation(s_idx, dict(enumerate(valuation)), dict())
+        for s_idx, valuation in enumerate(valuations)})
+    return instance_data
+
+
+def separates(b_idxs, instance_datas):
+    goal_valuations = set()
+    nongoal_valuations = set()
+    for instance_data in instance_datas:
+        for s_idx, feature_valuation in instance_data.feature_valuations.items():
+            valuation = tuple(feature_valuation.b_idx_to_val[b_idx] for b_idx in b_idxs)
+            (goal_valuations if instance_data.is_goal(s_idx) else nongoal_valuations).add(valuation)
+    return not goal_valuations.intersection(nongoal_valuations)
+
+
+def compute_optimal_cost(complexities, instance_datas):
+    """ Returns the minimum cost of goal separating features by enumerating all subsets, or None if there are none. """
+    costs = [sum(complexities[b_idx] for b_idx in b_idxs)
+             for num_features in range(len(complexities) + 1)
+             for b_idxs in itertools.combinations(range(len(complexities)), num_features)
+             if separates(b_idxs, instance_datas)]
+    return min(costs, default=None)
+
+
+def make_random_instance_datas(rng, num_features):
+    instance_datas = []
+    for instance_idx in range(2):
+        num_states = rng.randint(2, 6)
+        valuations = [[rng.random() < 0.5 for _ in range(num_features)] for _ in range(num_states)]
+        instance_datas.append(make_instance_data(instance_idx, valuations, rng.sample(range(num_states), rng.randint(1, num_states - 1))))
+    return instance_datas
+
+
+def test_selected_features_have_minimum_cost():
+    rng = random.Random(0)
+    num_separable = 0
+    num_improved_greedy_covers = 0
+    for _ in range(200):
+        num_features = rng.randint(1, 7)
+        complexities = [rng.randint(1, 5) for _ in range(num_features)]
+        instance_datas = make_random_instance_datas(rng, num_features)
+        selector = GoalSeparatingFeaturesSelector()
+        b_idxs = selector.select(make_domain_data(complexities), instance_datas, 60)
+        optimal_cost = compute_optimal_cost(complexities, instance_datas)
+        if optimal_cost is None:
+            assert b_idxs is None
+            continue
+        num_separable += 1
+        assert separates(b_idxs, instance_datas)
+        assert sum(complexities[b_idx] for b_idx in b_idxs) == optimal_cost
+        assert selector.statistics.cost == optimal_cost
+        assert selector.statistics.greedy_cost >= optimal_cost
+        assert selector.statistics.optimality_proven
+        if selector.statistics.greedy_cost > optimal_cost:
+            num_improved_greedy_covers += 1
+    assert num_separable > 50
+    # The branch and bound is needed.
+    assert num_improved_greedy_covers > 0
+
+
+class BranchAndBoundTimeout(GoalSeparatingFeaturesSelector):
+    def _branch_and_bound(self, *args):
+        raise SelectorTimeout()
+
+
+def test_timeout_falls_back_to_asp():
+    rng = random.Random(1)
+    complexities = [rng.randint(1, 5) for _ in range(7)]
+    instance_datas = [make_instance_data(0, [[s_idx >> i & 1 == 1 for i in range(7)] for s_idx in range(16)], list(range(8)))]
+    selector = BranchAndBoundTimeout()
+    # None tells the caller to learn the features with ASP instead.
+    assert selector.select(make_domain_data(complexities), instance_datas, 60) is None
+    assert not selector.statistics.optimality_proven
+    assert selector.statistics.cost == selector.statistics.greedy_cost
+    # The greedy cover is kept as the best known solution.
+    assert separates(selector.best_b_idxs, instance_datas)
+    assert sum(complexities[b_idx] for b_idx in selector.best_b_idxs) == selector.best_cost
+
+    # The deadline is also checked before the greedy cover is computed.
+    selector = GoalSeparatingFeaturesSelector()
+    assert selector.select(make_domain_data(complexities), instance_datas, 0) is None
+    assert selector.best_b_idxs is None
+
+
+def test_inseparable_goal_and_nongoal_states():
+    instance_datas = [make_instance_data(0, [[True, False], [True, False], [False, False]], [0])]
+    assert GoalSeparatingFeaturesSelector().select(make_domain_data([1, 1]), instance_datas, 60) is None
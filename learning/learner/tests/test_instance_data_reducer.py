@@ -0,0 +1,81 @@
+from learner.src.instance_data.instance_data import InstanceData
+from learner.src.instance_data.instance_data_reducer import InstanceDataReducer
+
+
+class State:
+    def __init__(self, atom_idxs):
+        self.atom_idxs = atom_idxs
+
+    def get_atom_indices(self):
+        return self.atom_idxs
+
+
+class StateSpace:
+    """ Provides the part of dlplan.StateSpace that the fingerprint uses. """
+    def __init__(self, s_idx_to_atom_idxs, forward_successors, goal_s_idxs):
+        self.states = {s_idx: State(atom_idxs) for s_idx, atom_idxs in s_idx_to_atom_idxs.items()}
+        self.forward_successors = forward_successors
+        self.goal_s_idxs = goal_s_idxs
+
+    def get_states(self):
+        return self.states
+
+    def get_forward_successor_state_indices(self):
+        return self.forward_successors
+
+    def get_goal_state_indices(self):
+        return self.goal_s_idxs
+
+
+def make_instance_data(instance_idx, state_space, initial_s_idxs):
+    return InstanceData(instance_idx, None, None, None, state_space=state_space, initial_s_idxs=initial_s_idxs)
+
+
+def make_chain(s_idxs, goal_s_idxs):
+    """ Returns the state space of a path through the states with one atom per state. """
+    return StateSpace(
+        {s_idx: [i] for i, s_idx in enumerate(s_idxs)},
+        {s_idx: [s_prime_idx] for s_idx, s_prime_idx in zip(s_idxs, s_idxs[1:])},
+        goal_s_idxs)
+
+
+def test_isomorphic_instances_are_grouped():
+    instance_datas = [
+        make_instance_data(0, make_chain([0, 1, 2], [2]), [0]),
+        # Same chain with renamed states.
+        make_instance_data(1, make_chain([5, 7, 3], [3]), [5]),
+        make_instance_data(2, make_chain([4, 2, 9], [9]), [4]),
+    ]
+    reducer = InstanceDataReducer()
+    representatives, duplicates = reducer.reduce(instance_datas)
+    assert [instance_data.id for instance_data in representatives] == [0]
+    assert [instance_data.id for instance_data in duplicates] == [1, 2]
+    assert reducer.statistics.num_instances == 3
+    assert reducer.statistics.num_representatives == 1
+
+
+def test_distinct_instances_are_kept_apart():
+    instance_datas = [
+        make_instance_data(0, make_chain([0, 1, 2], [2]), [0]),
+        # Same graph with a different goal state.
+        make_instance_data(1, make_chain([0, 1, 2], [1]), [0]),
+        # Same graph with a different initial state.
+        make_instance_data(2, make_chain([0, 1, 2], [2]), [1]),
+        # Same number of states and transitions with a different structure.
+        make_instance_data(3, StateSpace({0: [0], 1: [1], 2: [2]}, {0: [1, 2]}, [1, 2]), [0]),
+        # Same graph with a different number of atoms in a state.
+        make_instance_data(4, StateSpace({0: [0], 1: [1, 3], 2: [2]}, {0: [1], 1: [2]}, [2]), [0]),
+    ]
+    representatives, duplicates = InstanceDataReducer().reduce(instance_datas)
+    assert [instance_data.id for instance_data in representatives] == [0, 1, 2, 3, 4]
+    assert duplicates == []
+
+
+def test_fingerprints_ignore_transitions_to_unknown_states():
+    # Transitions to states outside of the state space, e.g., of a pruned subproblem, are ignored.
+    state_space = make_chain([0, 1, 2], [2])
+    pruned_state_space = make_chain([0, 1, 2], [2])
+    pruned_state_space.forward_successors[2] = [8]
+    reducer = InstanceDataReducer()
+    assert reducer.compute_fingerprint(make_instance_data(0, state_space, [0])) \
+        == reducer.compute_fingerprint(make_instance_data(1, pruned_state_space, [0]))
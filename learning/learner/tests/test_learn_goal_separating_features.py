@@ -0,0 +1,40 @@
+from learner.src.instance_data.instance_data import InstanceData
+from learner.src.iteration_data.learn_goal_separating_features import compute_state_b_values, compute_unsolved_instances
+from learner.tests.test_goal_separating_features_selector import StateSpace
+
+
+class Feature:
+    """ Counts the evaluations of a feature whose value in a state is given by a list. """
+    def __init__(self, index, values):
+        self.index = index
+        self.values = values
+        self.num_evaluations = 0
+
+    def get_index(self):
+        return self.index
+
+    def evaluate(self, state, denotations_caches):
+        self.num_evaluations += 1
+        return self.values[state]
+
+
+def make_instance_data(instance_idx, num_states, goal_s_idxs):
+    state_space = StateSpace(range(num_states), goal_s_idxs)
+    state_space.states = {s_idx: s_idx for s_idx in range(num_states)}
+    return InstanceData(instance_idx, None, None, None, state_space=state_space)
+
+
+def test_valuations_of_selected_instances_are_reused():
+    boolean = Feature(0, [False, True, True])
+    numerical = Feature(1, [0, 2, 1])
+    selected_instance_data = make_instance_data(0, 3, [1, 2])
+    selected_instance_data.boolean_feature_valuations = {0: [False, True, True]}
+    selected_instance_data.numerical_feature_valuations = {1: [0, 2, 1]}
+    assert compute_state_b_values([boolean], [numerical], selected_instance_data).tolist() == [[False, False], [True, True], [True, True]]
+    assert boolean.num_evaluations == numerical.num_evaluations == 0
+
+    # Only the valuations of selected instances are known, the others are evaluated.
+    other_instance_data = make_instance_data(1, 3, [2])
+    unsolved_instances = compute_unsolved_instances([boolean], [numerical], [selected_instance_data, other_instance_data])
+    assert unsolved_instances == [(other_instance_data, (True, True))]
+    assert boolean.num_evaluations == numerical.num_evaluations == 3
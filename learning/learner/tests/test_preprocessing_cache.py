@@ -0,0 +1,44 @@
+from learner.src.domain_data.domain_data import DomainData
+from learner.src.iteration_data.domain_feature_data import DomainFeatureData, Feature
+from learner.src.iteration_data.preprocessing_cache import PreprocessingCache
+from learner.tests.test_feature_valuations_factory import CountAtoms, make_instance_datas
+
+
+class NumericalFeature(CountAtoms):
+    def __init__(self, modulus):
+        super().__init__(modulus)
+        self.num_evaluations = 0
+
+    def evaluate(self, state, denotations_caches):
+        self.num_evaluations += 1
+        return super().evaluate(state, denotations_caches)
+
+    def get_index(self):
+        return self.modulus
+
+
+def make_domain_data(numerical_features):
+    domain_feature_data = DomainFeatureData()
+    for numerical_feature in numerical_features:
+        domain_feature_data.numerical_features.add_feature(Feature(numerical_feature, 1))
+    return DomainData(None, None, None, None, None, domain_feature_data)
+
+
+def test_least_recently_used_feature_valuations_are_evicted():
+    instance_datas = make_instance_datas()
+    features = {modulus: NumericalFeature(modulus) for modulus in range(2, 9)}
+    preprocessing_cache = PreprocessingCache(max_cached_features=4)
+    for moduli in [[2, 3, 4], [2, 5], [2, 6, 7]]:
+        preprocessing_cache.make_feature_valuations(make_domain_data([features[modulus] for modulus in moduli]), instance_datas)
+    # 3 and 4 were used least recently.
+    for cached_feature_valuations in preprocessing_cache.instance_idx_to_numerical_feature_valuations.values():
+        assert list(cached_feature_valuations.keys()) == [f"count_atoms_mod_{modulus}" for modulus in [5, 2, 6, 7]]
+    assert preprocessing_cache.statistics.num_evicted_features == 2 * len(instance_datas)
+    assert preprocessing_cache.statistics.num_reused_features == 2 * len(instance_datas)
+
+    # The features of the current pool are kept even if there are more than max_cached_features.
+    num_evaluations = {modulus: feature.num_evaluations for modulus, feature in features.items()}
+    preprocessing_cache.make_feature_valuations(make_domain_data(features.values()), instance_datas)
+    for cached_feature_valuations in preprocessing_cache.instance_idx_to_numerical_feature_valuations.values():
+        assert len(cached_feature_valuations) == 7
+    assert [features[modulus].num_evaluations > num_evaluations[modulus] for modulus in range(2, 9)] == [False, True, True, False, False, False, True]
@@ -0,0 +1,155 @@
+import random
+
+from learner.src.domain_data.domain_data import DomainData
+from learner.src.instance_data.instance_data import InstanceData
+from learner.src.iteration_data.domain_feature_data import DomainFeatureData, Feature
+from learner.src.iteration_data.feature_valuations import StateFeatureValuation
+from learner.src.iteration_data.preprocessing_cache import PreprocessingCache
+from learner.src.iteration_data.state_pair_equivalence_factory import StatePairEquivalenceFactory
+
+
+class DlplanFeature:
+    def __init__(self, index, f_repr):
+        self.index = index
+        self.f_repr = f_repr
+
+    def get_index(self):
+        return self.index
+
+    def compute_repr(self):
+        return self.f_repr
+
+
+class Rule:
+    def __init__(self, conditions, effects):
+        self.conditions = frozenset(conditions)
+        self.effects = frozenset(effects)
+
+    def compute_repr(self):
+        return str(sorted(self.conditions)) + str(sorted(self.effects))
+
+
+class PolicyBuilder:
+    """ Provides the part of dlplan.PolicyBuilder that the factory uses. """
+    def __getattr__(self, name):
+        # add_pos_condition, add_inc_effect, ...
+        return lambda feature: (name, feature.compute_repr())
+
+    def add_rule(self, conditions, effects):
+        return Rule(conditions, effects)
+
+
+class TupleGraph:
+    def __init__(self, s_idxs_by_distance):
+        self.s_idxs_by_distance = s_idxs_by_distance
+
+    def get_state_indices_by_distance(self):
+        return self.s_idxs_by_distance
+
+
+def make_domain_data(boolean_reprs, numerical_reprs):
+    """ Returns the domain data of a feature pool where the index of a feature depends on its position in the pool. """
+    domain_feature_data = DomainFeatureData()
+    for index, f_repr in enumerate(boolean_reprs):
+        domain_feature_data.boolean_features.add_feature(Feature(DlplanFeature(index, f_repr), 1))
+    for index, f_repr in enumerate(numerical_reprs):
+        domain_feature_data.numerical_features.add_feature(Feature(DlplanFeature(index, f_repr), 1))
+    return DomainData(None, None, PolicyBuilder(), None, None, domain_feature_data)
+
+
+def set_feature_valuations(instance_data, boolean_reprs, numerical_reprs, f_repr_to_valuations):
+    instance_data.set_feature_valuations({
+        s_idx: StateFeatureValuation(
+            s_idx,
+            {b_idx: f_repr_to_valuations[f_repr][s_idx] for b_idx, f_repr in enumerate(boolean_reprs)},
+            {n_idx: f_repr_to_valuations[f_repr][s_idx] for n_idx, f_repr in enumerate(numerical_reprs)})
+        for s_idx in range(instance_data.num_states)})
+
+
+def make_instance_data(rng, num_states=12):
+    instance_data = InstanceData(0, None, None, None)
+    instance_data.num_states = num_states
+    # The last state is a deadend.
+    instance_data.set_goal_distances({s_idx: 0 for s_idx in range(num_states - 1)})
+    instance_data.tuple_graphs = {
+        s_idx: TupleGraph([rng.sample(range(num_states), 3) for _ in range(3)])
+        for s_idx in range(num_states)}
+    return instance_data
+
+
+def make_f_repr_to_valuations(rng, num_states, boolean_reprs, numerical_reprs):
+    f_repr_to_valuations = dict()
+    for f_repr in boolean_reprs:
+        f_repr_to_valuations[f_repr] = [rng.random() < 0.5 for _ in range(num_states)]
+    for f_repr in numerical_reprs:
+        f_repr_to_valuations[f_repr] = [rng.randrange(3) for _ in range(num_states)]
+    return f_repr_to_valuations
+
+
+def make_state_pair_equivalences(instance_data, boolean_reprs, numerical_reprs, f_repr_to_valuations, partition=None):
+    set_feature_valuations(instance_data, boolean_reprs, numerical_reprs, f_repr_to_valuations)
+    domain_data = make_domain_data(boolean_reprs, numerical_reprs)
+    rules, partition = StatePairEquivalenceFactory().make_state_pair_equivalences(domain_data, instance_data, partition)
+    return [rule.compute_repr() for rule in rules], partition, instance_data.state_pair_equivalences
+
+
+def test_updated_partition_equals_recomputed_partition():
+    rng = random.Random(0)
+    for _ in range(20):
+        instance_data = make_instance_data(rng)
+        boolean_reprs = [f"b{i}" for i in range(4)]
+        numerical_reprs = [f"n{i}" for i in range(4)]
+        f_repr_to_valuations = make_f_repr_to_valuations(rng, instance_data.num_states, boolean_reprs, numerical_reprs)
+        # Features are removed from and added to the pool, and the remaining features change their index.
+        previous_boolean_reprs = rng.sample(boolean_reprs, 2)
+        previous_numerical_reprs = rng.sample(numerical_reprs, 2)
+        current_boolean_reprs = rng.sample(boolean_reprs, 3)
+        current_numerical_reprs = rng.sample(numerical_reprs, 2)
+        _, previous_partition, _ = make_state_pair_equivalences(instance_data, previous_boolean_reprs, previous_numerical_reprs, f_repr_to_valuations)
+        updated = make_state_pair_equivalences(instance_data, current_boolean_reprs, current_numerical_reprs, f_repr_to_valuations, previous_partition)
+        recomputed = make_state_pair_equivalences(instance_data, current_boolean_reprs, current_numerical_reprs, f_repr_to_valuations)
+        assert updated[0] == recomputed[0]
+        assert updated[1] == recomputed[1]
+        assert updated[2] == recomputed[2]
+        # The deadend is not a root.
+        assert instance_data.num_states - 1 not in updated[1].s_idx_to_s_prime_idx_to_class
+
+
+def test_partitions_group_state_pairs_by_rule():
+    rng = random.Random(1)
+    instance_data = make_instance_data(rng)
+    boolean_reprs = ["b0", "b1"]
+    numerical_reprs = ["n0"]
+    f_repr_to_valuations = make_f_repr_to_valuations(rng, instance_data.num_states, boolean_reprs, numerical_reprs)
+    rules, partition, state_pair_equivalences = make_state_pair_equivalences(instance_data, boolean_reprs, numerical_reprs, f_repr_to_valuations)
+    assert len(set(rules)) == len(rules) == len(partition.representatives)
+    domain_data = make_domain_data(boolean_reprs, numerical_reprs)
+    factory = StatePairEquivalenceFactory()
+    for s_idx, state_pair_equivalence in state_pair_equivalences.items():
+        for s_prime_idx, r_idx in state_pair_equivalence.subgoal_state_to_r_idx.items():
+            conditions = factory._make_conditions(domain_data.policy_builder, domain_data.domain_feature_data, instance_data.feature_valuations[s_idx])
+            effects = factory._make_effects(domain_data.policy_builder, domain_data.domain_feature_data, instance_data.feature_valuations[s_idx], instance_data.feature_valuations[s_prime_idx])
+            assert Rule(conditions, effects).compute_repr() == rules[r_idx]
+
+
+def test_tuple_graph_equivalences_are_reused_if_the_partition_did_not_change():
+    rng = random.Random(2)
+    instance_data = make_instance_data(rng)
+    f_repr_to_valuations = make_f_repr_to_valuations(rng, instance_data.num_states, ["b0"], ["n0"])
+    # A feature that is true in all states does not split any class.
+    f_repr_to_valuations["b1"] = [True] * instance_data.num_states
+    preprocessing_cache = PreprocessingCache()
+    rules, partition, _ = make_state_pair_equivalences(instance_data, ["b0"], ["n0"], f_repr_to_valuations)
+    assert preprocessing_cache.update_equivalences(instance_data, rules, partition)
+    instance_data.set_tuple_graph_equivalences("tuple graph equivalences")
+    preprocessing_cache.insert_equivalences(instance_data, rules, partition)
+
+    rules, partition, _ = make_state_pair_equivalences(instance_data, ["b0", "b1"], ["n0"], f_repr_to_valuations, preprocessing_cache.get_partition(instance_data))
+    assert not preprocessing_cache.update_equivalences(instance_data, rules, partition)
+    equivalences = preprocessing_cache.instance_idx_to_equivalences[instance_data.id]
+    assert equivalences.partition is partition
+    assert equivalences.tuple_graph_equivalences == "tuple graph equivalences"
+
+    rules, partition, _ = make_state_pair_equivalences(instance_data, ["b1"], [], f_repr_to_valuations, preprocessing_cache.get_partition(instance_data))
+    assert preprocessing_cache.update_equivalences(instance_data, rules, partition)
+    assert preprocessing_cache.statistics.num_repartitioned_instances == 2
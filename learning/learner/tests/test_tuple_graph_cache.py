@@ -0,0 +1,148 @@
+import pickle
+import random
+import tracemalloc
+
+from learner.src.instance_data.instance_data import InstanceData
+from learner.src.instance_data.tuple_graph_cache import TupleGraphCache, TupleGraphSnapshot, estimate_tuple_graphs_size
+
+
+class TupleNode:
+    def __init__(self, tuple_index, state_indices):
+        self.tuple_index = tuple_index
+        self.state_indices = state_indices
+
+    def get_tuple_index(self):
+        return self.tuple_index
+
+    def get_state_indices(self):
+        return self.state_indices
+
+
+class TupleGraph:
+    """ Provides the part of dlplan.TupleGraph that the snapshots copy. """
+    def __init__(self, root_idx):
+        self.root_idx = root_idx
+
+    def get_root_state_index(self):
+        return self.root_idx
+
+    def get_state_indices_by_distance(self):
+        return [[self.root_idx], [self.root_idx + 1, self.root_idx + 2]]
+
+    def get_tuple_nodes_by_distance(self):
+        return [[TupleNode(0, [self.root_idx])], [TupleNode(1, [self.root_idx + 1]), TupleNode(2, [self.root_idx + 1, self.root_idx + 2])]]
+
+
+class TupleGraphFactory:
+    def __init__(self):
+        self.instance_idxs = []
+
+    def make_tuple_graphs(self, instance_data):
+        self.instance_idxs.append(instance_data.id)
+        return {s_idx: TupleGraph(s_idx) for s_idx in range(instance_data.id + 1)}
+
+
+class RandomTupleGraph(TupleGraph):
+    def __init__(self, root_idx, rng):
+        super().__init__(root_idx)
+        self.tuple_nodes_by_distance = [
+            [(rng.randrange(10**5), [rng.randrange(10**5) for _ in range(rng.randint(1, 20))]) for _ in range(rng.randint(1, 20))]
+            for _ in range(rng.randint(1, 6))]
+
+    def get_state_indices_by_distance(self):
+        return [sorted({s_idx for _, s_idxs in tuple_nodes for s_idx in s_idxs}) for tuple_nodes in self.tuple_nodes_by_distance]
+
+    def get_tuple_nodes_by_distance(self):
+        return [[TupleNode(t_idx, s_idxs) for t_idx, s_idxs in tuple_nodes] for tuple_nodes in self.tuple_nodes_by_distance]
+
+
+class RandomTupleGraphFactory(TupleGraphFactory):
+    def make_tuple_graphs(self, instance_data):
+        self.instance_idxs.append(instance_data.id)
+        rng = random.Random(instance_data.id)
+        return {s_idx: RandomTupleGraph(s_idx, rng) for s_idx in range(5)}
+
+
+def measure_unpickled_size_mb(tuple_graphs):
+    """ Returns the size of the tuple graphs that are received from a worker in MB. """
+    data = pickle.dumps(tuple_graphs)
+    tracemalloc.start()
+    unpickled_tuple_graphs = pickle.loads(data)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del unpickled_tuple_graphs
+    return size / float(1024*1024)
+
+
+def make_tuple_graph_cache(memory_limit_mb=None):
+    tuple_graph_cache = TupleGraphCache(1, memory_limit_mb)
+    tuple_graph_cache.tuple_graph_factory = TupleGraphFactory()
+    return tuple_graph_cache
+
+
+def make_instance_datas(tuple_graph_cache):
+    return [InstanceData(instance_idx, None, None, None, tuple_graph_cache=tuple_graph_cache) for instance_idx in range(4)]
+
+
+def test_tuple_graphs_built_by_workers_are_kept():
+    tuple_graph_cache = make_tuple_graph_cache()
+    instance_datas = make_instance_datas(tuple_graph_cache)
+    instance_datas[1].get_tuple_graphs()
+    tuple_graph_cache.make_tuple_graphs(instance_datas, 2)
+    # Only the cached instance was built in this process.
+    assert tuple_graph_cache.tuple_graph_factory.instance_idxs == [1]
+    assert tuple_graph_cache.statistics.num_builds == 4
+    for instance_data in instance_datas:
+        tuple_graphs = instance_data.get_tuple_graphs()
+        assert sorted(tuple_graphs.keys()) == list(range(instance_data.id + 1))
+        for s_idx, tuple_graph in tuple_graphs.items():
+            assert tuple_graph.get_root_state_index() == s_idx
+            assert tuple_graph.get_state_indices_by_distance() == [[s_idx], [s_idx + 1, s_idx + 2]]
+            assert [[tuple_node.get_state_indices() for tuple_node in tuple_nodes] for tuple_nodes in tuple_graph.get_tuple_nodes_by_distance()] \
+                == [[[s_idx]], [[s_idx + 1], [s_idx + 1, s_idx + 2]]]
+    assert tuple_graph_cache.statistics.num_builds == 4
+    assert tuple_graph_cache.statistics.num_hits == 4
+
+
+def test_tuple_graphs_are_built_on_access_without_workers():
+    tuple_graph_cache = make_tuple_graph_cache()
+    instance_datas = make_instance_datas(tuple_graph_cache)
+    tuple_graph_cache.make_tuple_graphs(instance_datas, 1)
+    assert tuple_graph_cache.statistics.num_builds == 0
+    instance_datas[2].get_tuple_graphs()
+    assert tuple_graph_cache.tuple_graph_factory.instance_idxs == [2]
+
+
+def test_tuple_graphs_are_prebuilt_up_to_the_memory_limit():
+    factory = TupleGraphFactory()
+    # Instances 0 and 1 fit, instance 2 does not.
+    memory_limit_mb = sum(estimate_tuple_graphs_size(factory.make_tuple_graphs(instance_data)) for instance_data in make_instance_datas(None)[:2]) * 1.5
+    tuple_graph_cache = make_tuple_graph_cache(memory_limit_mb)
+    instance_datas = make_instance_datas(tuple_graph_cache)
+    tuple_graph_cache.make_tuple_graphs(instance_datas, 2)
+    assert list(tuple_graph_cache.instance_idx_to_entry.keys()) == [0, 1]
+    assert tuple_graph_cache.size_mb <= memory_limit_mb
+    assert tuple_graph_cache.statistics.num_evictions == 0
+    # The remaining instances are built on access.
+    instance_datas[2].get_tuple_graphs()
+    assert tuple_graph_cache.tuple_graph_factory.instance_idxs == [2]
+
+
+def test_estimated_size_of_snapshots():
+    for instance_data in make_instance_datas(None):
+        tuple_graphs = RandomTupleGraphFactory().make_tuple_graphs(instance_data)
+        snapshots = {s_idx: TupleGraphSnapshot(tuple_graph) for s_idx, tuple_graph in tuple_graphs.items()}
+        estimated_size_mb = estimate_tuple_graphs_size(snapshots)
+        assert abs(estimated_size_mb - measure_unpickled_size_mb(snapshots)) <= 0.1 * estimated_size_mb
+
+
+def test_prebuilt_tuple_graphs_stay_within_the_memory_limit():
+    memory_limit_mb = 0.5
+    tuple_graph_cache = TupleGraphCache(1, memory_limit_mb)
+    tuple_graph_cache.tuple_graph_factory = RandomTupleGraphFactory()
+    instance_datas = [InstanceData(instance_idx, None, None, None, tuple_graph_cache=tuple_graph_cache) for instance_idx in range(10)]
+    tuple_graph_cache.make_tuple_graphs(instance_datas, 2)
+    assert 0 < len(tuple_graph_cache.instance_idx_to_entry) < len(instance_datas)
+    assert tuple_graph_cache.size_mb <= memory_limit_mb
+    measured_size_mb = sum(measure_unpickled_size_mb(tuple_graphs) for tuple_graphs, _ in tuple_graph_cache.instance_idx_to_entry.values())
+    assert measured_size_mb <= 1.1 * memory_limit_mb
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+
+import itertools
+import sys
+
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from learner.src.driver import BASEDIR
+from learner.src.util.benchmark import find_facts, print_tuning_results, tune_asp, write_results
+from learner.src.util.bootstrap import get_parser
+
+
+def parse_optional(value: str):
+    """ Maps "default" to None, i.e., the clingo default. """
+    return None if value == "default" else value
+
+
+def setup_argparser():
+    parser = get_parser(description="Solves the facts written by the learner with asp_write_facts=True, e.g., by benchmark.py --write_facts,\n"
+                                    "under each combination of clingo settings and reports the solve times.")
+    parser.add_argument('--facts', nargs='+', required=True, help="facts.lp files or directories that are searched for facts.lp files.")
+    parser.add_argument('--asp', default=str(BASEDIR / "learner/src/asp/h-policy-explicit.lp"), help="The logic program.")
+    parser.add_argument('--max_num_rules', default=4, type=int, help="The maximum number of rules that was used when writing the facts.")
+    parser.add_argument('--num_threads', nargs='+', default=[1, 4], type=int, help="Thread counts to compare.")
+    parser.add_argument('--configurations', nargs='+', default=["default", "trendy", "crafty", "many"], help="clingo configurations to compare.")
+    parser.add_argument('--opt_strategies', nargs='+', default=["bb", "usc"], help="clingo optimization strategies to compare.")
+    parser.add_argument('--time_budget', default=None, type=float, help="Time budget in seconds per solver call.")
+    parser.add_argument('--output', default="tune_asp.json", help="The file where the results are written.")
+    return parser
+
+
+if __name__ == "__main__":
+    args = setup_argparser().parse_args(sys.argv[1:])
+    asp_settings = [{"num_threads": num_threads, "configuration": parse_optional(configuration), "opt_strategy": parse_optional(opt_strategy)}
+                    for num_threads, configuration, opt_strategy in itertools.product(args.num_threads, args.configurations, args.opt_strategies)]
+    runs = tune_asp(find_facts(args.facts), Path(args.asp).resolve(), args.max_num_rules, asp_settings, args.time_budget)
+    write_results(runs, Path(args.output).resolve())
+    print_tuning_results(runs)
@@ -272,6 +272,22 @@ def _set_translator_output_options(parser, args):
     args.translate_options += ["--sas-file", args.search_input]
 
 
+def _check_pipe_translator_output(parser, args):
+    if args.keep_sas_file:
+        # The translator writes the kept file and the search reads it.
+        args.pipe_translator_output = False
+    elif os.name != "posix":
+        print_usage_and_exit_with_driver_input_error(
+            parser, "--pipe-translator-output is only supported on POSIX systems.")
+    elif args.translate_server:
+        print_usage_and_exit_with_driver_input_error(
+            parser, "--pipe-translator-output cannot be used with --translate-server.")
+    elif args.transform_task:
+        print_usage_and_exit_with_driver_input_error(
+            parser, "--pipe-translator-output cannot be used with --transform-task, "
+                    "which transforms the translator output file.")
+
+
 def _get_time_limit_in_seconds(limit, parser):
     match = re.match(r"^(\d+)(s|m|h)?$", limit, flags=re.I)
     if not match:
@@ -402,12 +418,27 @@ def parse_args():
 
     driver_other.add_argument(
         "--sas-file", metavar="FILE",
-        help="intermediate file for storing the translator output "
+        help="intermediate file for storing the translator output, which "
+            "is compressed with gzip if FILE ends in .gz "
             "(implies --keep-sas-file, default: {})".format(DEFAULT_SAS_FILE))
     driver_other.add_argument(
         "--keep-sas-file", action="store_true",
         help="keep translator output file (implied by --sas-file, default: "
             "delete file if translator and search component are active)")
+    driver_other.add_argument(
+        "--pipe-translator-output", action="store_true",
+        help="pass the translator output to the search component through a "
+            "pipe instead of an intermediate file. The output is only written "
+            "to a file if it is kept (see --keep-sas-file).")
+
+    driver_other.add_argument(
+        "--translate-server", metavar="SOCKET",
+        help="run the translator in a long-running server listening on the "
+            "Unix socket SOCKET, which is started if it is not running. The "
+            "server keeps the translator modules and parsed domains loaded "
+            "across calls and exits after 10 minutes without requests. "
+            "Requests of parallel calls are served one at a time. The CPU "
+            "time of the server counts towards the overall time limit.")
 
     driver_other.add_argument(
         "--portfolio", metavar="FILE",
@@ -483,5 +514,7 @@ def parse_args():
         _set_components_and_inputs(parser, args)
         if "translate" not in args.components or "search" not in args.components:
             args.keep_sas_file = True
+        if args.pipe_translator_output:
+            _check_pipe_translator_output(parser, args)
 
     return args
@@ -2,18 +2,30 @@
 
 from . import limits
 from . import returncodes
+from . import util
 
+import gzip
+import io
+import json
 import logging
 import os
 import shlex
+import shutil
+import socket
 import subprocess
 import sys
+import tempfile
+import time
 
 
 def print_call_settings(nick, cmd, stdin, time_limit, memory_limit):
-    if stdin is not None:
-        stdin = shlex.quote(stdin)
-    logging.info("{} stdin: {}".format(nick, stdin))
+    if isinstance(stdin, bytes):
+        logging.info("{} stdin: {} bytes of piped output".format(nick, len(stdin)))
+        stdin = None
+    else:
+        if stdin is not None:
+            stdin = shlex.quote(stdin)
+        logging.info("{} stdin: {}".format(nick, stdin))
     limits.print_limits(nick, time_limit, memory_limit)
 
     escaped_cmd = [shlex.quote(x) for x in cmd]
@@ -47,18 +59,46 @@ def _get_preexec_function(time_limit, memory_limit):
 
 
 def check_call(nick, cmd, stdin=None, time_limit=None, memory_limit=None):
+    """Run cmd with the limits. stdin is the name of the input file or the
+    input itself as bytes, e.g. the output of a component that was run with
+    get_error_output_returncode_and_piped_output()."""
     print_call_settings(nick, cmd, stdin, time_limit, memory_limit)
 
     kwargs = {"preexec_fn": _get_preexec_function(time_limit, memory_limit)}
 
     sys.stdout.flush()
-    if stdin:
+    if isinstance(stdin, bytes):
+        with io.BytesIO(stdin) as stdin_file:
+            return _check_call_with_piped_input(cmd, stdin_file, kwargs)
+    elif stdin and stdin.endswith(".gz"):
+        with gzip.open(stdin, "rb") as stdin_file:
+            return _check_call_with_piped_input(cmd, stdin_file, kwargs)
+    elif stdin:
         with open(stdin) as stdin_file:
             return subprocess.check_call(cmd, stdin=stdin_file, **kwargs)
     else:
         return subprocess.check_call(cmd, **kwargs)
 
 
+def _check_call_with_piped_input(cmd, stdin_file, kwargs):
+    """Copy the binary stdin_file into the stdin of the process."""
+    process = subprocess.Popen(cmd, stdin=subprocess.PIPE, **kwargs)
+    try:
+        shutil.copyfileobj(stdin_file, process.stdin, 1024 * 1024)
+    except BrokenPipeError:
+        # The process exited without reading all of its input.
+        pass
+    finally:
+        try:
+            process.stdin.close()
+        except BrokenPipeError:
+            pass
+    returncode = process.wait()
+    if returncode:
+        raise subprocess.CalledProcessError(returncode, cmd)
+    return returncode
+
+
 def get_error_output_and_returncode(nick, cmd, time_limit=None, memory_limit=None):
     print_call_settings(nick, cmd, None, time_limit, memory_limit)
 
@@ -68,3 +108,84 @@ def get_error_output_and_returncode(nick, cmd, time_limit=None, memory_limit=Non
     p = subprocess.Popen(cmd, preexec_fn=preexec_fn, stderr=subprocess.PIPE)
     (stdout, stderr) = p.communicate()
     return stderr, p.returncode
+
+
+def get_error_output_returncode_and_piped_output(nick, cmd, output_option, time_limit=None, memory_limit=None):
+    """Like get_error_output_and_returncode, but passes a pipe as the
+    output file of cmd with output_option and also returns everything that
+    cmd writes to it. This avoids writing the output to disk."""
+    read_fd, write_fd = os.pipe()
+    cmd = cmd + [output_option, "/dev/fd/{}".format(write_fd)]
+    print_call_settings(nick, cmd, None, time_limit, memory_limit)
+
+    preexec_fn = _get_preexec_function(time_limit, memory_limit)
+
+    sys.stdout.flush()
+    # Collect stderr in a file, because reading both pipes in turn could
+    # block when the process fills the other one.
+    with open(read_fd, "rb") as output_file, tempfile.TemporaryFile() as stderr_file:
+        try:
+            p = subprocess.Popen(cmd, preexec_fn=preexec_fn, stderr=stderr_file,
+                                 pass_fds=[write_fd])
+        finally:
+            # Only the process may keep the write end open, such that
+            # reading ends when the process closes its output file.
+            os.close(write_fd)
+        output = output_file.read()
+        p.wait()
+        stderr_file.seek(0)
+        stderr = stderr_file.read()
+    return stderr, p.returncode, output
+
+
+def _connect_to_server(server_cmd, socket_path, startup_time_limit=30):
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(socket_path)
+        return connection
+    except (FileNotFoundError, ConnectionRefusedError):
+        pass
+    logging.info("Starting server: {}".format(" ".join(server_cmd)))
+    subprocess.Popen(
+        server_cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL, start_new_session=True)
+    deadline = time.monotonic() + startup_time_limit
+    while True:
+        try:
+            connection.connect(socket_path)
+            return connection
+        except (FileNotFoundError, ConnectionRefusedError):
+            if time.monotonic() > deadline:
+                connection.close()
+                raise
+            time.sleep(0.05)
+
+
+def get_error_output_and_returncode_from_server(nick, server_cmd, socket_path, args, time_limit=None, memory_limit=None):
+    """Like get_error_output_and_returncode, but sends args to the server
+    listening on socket_path, which is started with server_cmd if it is
+    not running. The server applies the limits to the forked process that
+    serves the request and reports its CPU time, which is added to
+    util.get_elapsed_time() such that later limits account for it."""
+    print_call_settings(nick, server_cmd + args, None, time_limit, memory_limit)
+    logging.info("{} server: {}".format(nick, socket_path))
+
+    sys.stdout.flush()
+    with _connect_to_server(server_cmd, socket_path) as connection:
+        request = {
+            "args": args,
+            "cwd": os.getcwd(),
+            "time_limit": time_limit,
+            "memory_limit": memory_limit,
+        }
+        connection.sendall((json.dumps(request) + "\n").encode())
+        with connection.makefile("rb") as reader:
+            line = reader.readline()
+    if not line:
+        returncodes.print_stderr("{} server closed the connection".format(nick))
+        return "", returncodes.DRIVER_CRITICAL_ERROR
+    response = json.loads(line)
+    util.add_external_elapsed_time(response["cpu_time"])
+    sys.stdout.write(response["stdout"])
+    sys.stdout.flush()
+    return response["stderr"], response["returncode"]
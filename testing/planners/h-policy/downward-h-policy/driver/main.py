@@ -42,7 +42,7 @@ def main():
                 run_components.transform_task(args)
         elif component == "search":
             (exitcode, continue_execution) = run_components.run_search(args)
-            if not args.keep_sas_file:
+            if not args.keep_sas_file and not args.pipe_translator_output:
                 print("Remove intermediate file {}".format(args.sas_file))
                 os.remove(args.sas_file)
         elif component == "validate":
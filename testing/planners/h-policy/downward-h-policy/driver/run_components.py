@@ -15,6 +15,7 @@ from .plan_manager import PlanManager
 
 # TODO: We might want to turn translate into a module and call it with "python3 -m translate".
 REL_TRANSLATE_PATH = os.path.join("translate", "translate.py")
+REL_TRANSLATE_SERVER_PATH = os.path.join("translate", "translate_server.py")
 if os.name == "posix":
     REL_SEARCH_PATH = "downward"
     VALIDATE = "validate"
@@ -55,15 +56,36 @@ def run_translate(args):
         args.translate_time_limit, args.overall_time_limit)
     memory_limit = limits.get_memory_limit(
         args.translate_memory_limit, args.overall_memory_limit)
-    translate = get_executable(args.build, REL_TRANSLATE_PATH)
     assert sys.executable, "Path to interpreter could not be found"
-    cmd = [sys.executable] + [translate] + args.translate_inputs + args.translate_options
-
-    stderr, returncode = call.get_error_output_and_returncode(
-        "translator",
-        cmd,
-        time_limit=time_limit,
-        memory_limit=memory_limit)
+    if args.translate_server:
+        translate_server = get_executable(args.build, REL_TRANSLATE_SERVER_PATH)
+        stderr, returncode = call.get_error_output_and_returncode_from_server(
+            "translator",
+            [sys.executable, translate_server, args.translate_server],
+            args.translate_server,
+            args.translate_inputs + args.translate_options,
+            time_limit=time_limit,
+            memory_limit=memory_limit)
+    else:
+        translate = get_executable(args.build, REL_TRANSLATE_PATH)
+        cmd = [sys.executable] + [translate] + args.translate_inputs + args.translate_options
+
+        if args.pipe_translator_output:
+            # The last --sas-file option overrides the intermediate file
+            # that the argument parser passes to the translator.
+            stderr, returncode, args.search_input = \
+                call.get_error_output_returncode_and_piped_output(
+                    "translator",
+                    cmd,
+                    "--sas-file",
+                    time_limit=time_limit,
+                    memory_limit=memory_limit)
+        else:
+            stderr, returncode = call.get_error_output_and_returncode(
+                "translator",
+                cmd,
+                time_limit=time_limit,
+                memory_limit=memory_limit)
 
     # We collect stderr of the translator and print it here, unless
     # the translator ran out of memory and all output in stderr is
@@ -84,3 +84,35 @@ def test_automatic_domain_file_name_computation():
         for filename in filenames:
             if "domain" not in filename:
                 assert find_domain_filename(os.path.join(dirpath, filename))
+
+
+@pytest.mark.skipif(os.name != "posix", reason="Pipes are only supported on POSIX systems")
+def test_pipe_translator_output(tmp_path):
+    # Fake build with the real translator and a search that stores its input.
+    build_dir = tmp_path / "bin"
+    build_dir.mkdir()
+    (build_dir / "translate").symlink_to(os.path.join(REPO_ROOT_DIR, "src", "translate"))
+    search = build_dir / "downward"
+    search.write_text(
+        "#! {}\n"
+        "import shutil, sys\n"
+        "with open('search-input.sas', 'w') as f:\n"
+        "    shutil.copyfileobj(sys.stdin, f)\n".format(sys.executable))
+    search.chmod(0o755)
+
+    driver = [sys.executable, os.path.join(REPO_ROOT_DIR, "fast-downward.py"),
+              "--build", str(build_dir)]
+    task = os.path.join(REPO_ROOT_DIR, "misc/tests/benchmarks/gripper/prob01.pddl")
+    file_dir = tmp_path / "file"
+    pipe_dir = tmp_path / "pipe"
+    file_dir.mkdir()
+    pipe_dir.mkdir()
+    subprocess.check_call(driver + ["--translate", task], cwd=file_dir)
+    subprocess.check_call(
+        driver + ["--pipe-translator-output", task, "--search", "astar(blind())"],
+        cwd=pipe_dir)
+    with open(file_dir / "output.sas") as f:
+        expected = f.read()
+    with open(pipe_dir / "search-input.sas") as f:
+        assert f.read() == expected
+    assert not (pipe_dir / "output.sas").exists()
@@ -8,15 +8,25 @@ REPO_ROOT_DIR = os.path.dirname(DRIVER_DIR)
 BUILDS_DIR = os.path.join(REPO_ROOT_DIR, "builds")
 
 
+# CPU time of components that ran outside of the child processes of this
+# process, e.g., in the translator server.
+_external_elapsed_time = 0.0
+
+
+def add_external_elapsed_time(seconds):
+    global _external_elapsed_time
+    _external_elapsed_time += seconds
+
+
 def get_elapsed_time():
     """
     Return the CPU time taken by the python process and its child
-    processes.
+    processes, including the time added with add_external_elapsed_time().
     """
     if os.name == "nt":
         # The child time components of os.times() are 0 on Windows.
         raise NotImplementedError("cannot use get_elapsed_time() on Windows")
-    return sum(os.times()[:4])
+    return sum(os.times()[:4]) + _external_elapsed_time
 
 
 def find_domain_filename(task_filename):
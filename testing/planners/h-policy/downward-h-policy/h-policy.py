@@ -65,6 +65,7 @@ if __name__ == "__main__":
     parser.add_argument("--instance_file", type=str, required=True)
     parser.add_argument("--hierarchical_sketch_dir", type=str, required=True)
     parser.add_argument("--plan_file", type=str, required=True)
+    parser.add_argument("--translate_server", type=str, default=None, help="Unix socket of a translator server that is shared across calls.")
     args = parser.parse_args()
     search_string = make_callstring(Path(args.hierarchical_sketch_dir).resolve())
     print(search_string)
@@ -72,7 +73,10 @@ if __name__ == "__main__":
         Path(args.fd_file).resolve(),
         "--keep-sas-file",
         "--plan-file",
-        Path(args.plan_file).resolve(),
+        Path(args.plan_file).resolve()]
+    if args.translate_server is not None:
+        command += ["--translate-server", Path(args.translate_server).resolve()]
+    command += [
         Path(args.domain_file).resolve(),
         Path(args.instance_file).resolve(),
         "--translate-options",
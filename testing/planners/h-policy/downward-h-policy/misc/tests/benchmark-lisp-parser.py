@@ -0,0 +1,66 @@
+#! /usr/bin/env python3
+
+
+HELP = """\
+Measure how fast the translator tokenizes and parses PDDL files.
+Parse each PDDL file of the benchmark directory repeatedly and report the
+time per parse and the throughput. Run it before and after changing
+src/translate/pddl_parser/lisp_parser.py to compare the two versions.
+"""
+
+import argparse
+import io
+from pathlib import Path
+import sys
+import time
+
+
+DIR = Path(__file__).resolve().parent
+REPO = DIR.parents[1]
+# Import the module directly, since importing the pddl_parser package
+# parses the command line of the translator.
+sys.path.insert(0, str(REPO / "src" / "translate" / "pddl_parser"))
+
+import lisp_parser
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=HELP)
+    parser.add_argument(
+        "benchmarks_dir", nargs="?", default=str(DIR / "benchmarks"),
+        help="path to benchmark directory (default: %(default)s)")
+    parser.add_argument(
+        "--repetitions", type=int, default=200,
+        help="parse each file this many times (default: %(default)d)")
+    return parser.parse_args()
+
+
+def time_parse(text, repetitions):
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        lisp_parser.parse_nested_list(io.StringIO(text))
+    return (time.perf_counter() - start) / repetitions
+
+
+def main():
+    args = parse_args()
+    filenames = sorted(Path(args.benchmarks_dir).glob("**/*.pddl"))
+    if not filenames:
+        sys.exit("No PDDL files found in {}".format(args.benchmarks_dir))
+    total_bytes = 0
+    total_seconds = 0
+    for filename in filenames:
+        with open(filename, encoding="ISO-8859-1") as f:
+            text = f.read()
+        seconds = time_parse(text, args.repetitions)
+        total_bytes += len(text)
+        total_seconds += seconds
+        print("{}: {:.3f} ms, {:.2f} MB/s".format(
+            filename.relative_to(args.benchmarks_dir), seconds * 1000,
+            len(text) / seconds / 1e6))
+    print("Total: {} files, {:.3f} ms, {:.2f} MB/s".format(
+        len(filenames), total_seconds * 1000, total_bytes / total_seconds / 1e6))
+
+
+if __name__ == "__main__":
+    main()
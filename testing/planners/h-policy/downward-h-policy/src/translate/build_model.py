@@ -3,12 +3,30 @@
 
 import sys
 import itertools
+import operator
 
 import pddl
 import timers
 from functools import reduce
 
-def convert_rules(prog):
+class SymbolTable:
+    """Maps predicates and objects to consecutive integer ids such that the
+    exploration can work on tuples of ints instead of pddl.Atoms."""
+    def __init__(self):
+        self.symbol_to_id = {}
+        self.symbols = []
+    def intern(self, symbol):
+        symbol_id = self.symbol_to_id.get(symbol)
+        if symbol_id is None:
+            symbol_id = len(self.symbols)
+            self.symbol_to_id[symbol] = symbol_id
+            self.symbols.append(symbol)
+        return symbol_id
+    def intern_atom(self, atom, objects):
+        return (self.intern(atom.predicate),) + tuple(
+            objects.intern(arg) for arg in atom.args)
+
+def convert_rules(prog, predicates, objects):
     RULE_TYPES = {
         "join": JoinRule,
         "product": ProductRule,
@@ -21,6 +39,7 @@ def convert_rules(prog):
             rule.effect, rule.conditions)
         rule = RuleType(new_effect, new_conditions)
         rule.validate()
+        rule.intern(predicates, objects)
         result.append(rule)
     return result
 
@@ -50,19 +69,36 @@ def variables_to_numbers(effect, conditions):
         new_conditions.append(pddl.Atom(cond.predicate, new_cond_args))
     return new_effect, new_conditions
 
+# During exploration, an atom is a tuple (predicate id, object id, ...), so
+# the argument at index i of a pddl.Atom is at index i + 1 of its tuple.
+
 class BuildRule:
+    def intern(self, predicates, objects):
+        # The effect template contains the predicate and constant arguments,
+        # variable arguments are filled in by prepare_effect.
+        self.effect_template = [predicates.intern(self.effect.predicate)] + [
+            arg if isinstance(arg, int) else objects.intern(arg)
+            for arg in self.effect.args]
+        # For each condition: pairs (position in the atom tuple, position
+        # in the effect template) of the variables that occur in the effect.
+        self.condition_bindings = [
+            [(arg_index + 1, var_no + 1)
+             for arg_index, var_no in enumerate(cond.args)
+             if isinstance(var_no, int)]
+            for cond in self.conditions]
     def prepare_effect(self, new_atom, cond_index):
-        effect_args = list(self.effect.args)
-        cond = self.conditions[cond_index]
-        for var_no, obj in zip(cond.args, new_atom.args):
-            if isinstance(var_no, int):
-                effect_args[var_no] = obj
+        effect_args = list(self.effect_template)
+        for position, effect_position in self.condition_bindings[cond_index]:
+            effect_args[effect_position] = new_atom[position]
         return effect_args
     def __str__(self):
         return "%s :- %s" % (self.effect, ", ".join(map(str, self.conditions)))
     def __repr__(self):
         return "<%s %s>" % (self.__class__.__name__, self)
 
+def get_empty_key(atom):
+    return ()
+
 class JoinRule(BuildRule):
     def __init__(self, effect, conditions):
         self.effect = effect
@@ -72,8 +108,11 @@ class JoinRule(BuildRule):
         left_vars = {var for var in left_args if isinstance(var, int)}
         right_vars = {var for var in right_args if isinstance(var, int)}
         common_vars = sorted(left_vars & right_vars)
-        self.common_var_positions = [
-            [args.index(var) for var in common_vars]
+        # Returns the values of the common variables of an atom tuple of the
+        # condition, a single value if there is one common variable.
+        self.get_key = [
+            operator.itemgetter(*[args.index(var) + 1 for var in common_vars])
+            if common_vars else get_empty_key
             for args in (list(left_args), list(right_args))]
         self.atoms_by_key = ({}, {})
     def validate(self):
@@ -90,30 +129,27 @@ class JoinRule(BuildRule):
         assert left_vars & right_vars, self
         assert (left_vars | right_vars) == (left_vars & right_vars) | eff_vars, self
     def update_index(self, new_atom, cond_index):
-        ordered_common_args = [
-            new_atom.args[position]
-            for position in self.common_var_positions[cond_index]]
-        key = tuple(ordered_common_args)
+        key = self.get_key[cond_index](new_atom)
         self.atoms_by_key[cond_index].setdefault(key, []).append(new_atom)
     def fire(self, new_atom, cond_index, enqueue_func):
-        effect_args = self.prepare_effect(new_atom, cond_index)
-        ordered_common_args = [
-            new_atom.args[position]
-            for position in self.common_var_positions[cond_index]]
-        key = tuple(ordered_common_args)
         other_cond_index = 1 - cond_index
-        other_cond = self.conditions[other_cond_index]
-        for atom in self.atoms_by_key[other_cond_index].get(key, []):
-            for var_no, obj in zip(other_cond.args, atom.args):
-                if isinstance(var_no, int):
-                    effect_args[var_no] = obj
-            enqueue_func(self.effect.predicate, effect_args)
+        atoms = self.atoms_by_key[other_cond_index].get(
+            self.get_key[cond_index](new_atom))
+        if not atoms:
+            return
+        effect_args = self.prepare_effect(new_atom, cond_index)
+        other_bindings = self.condition_bindings[other_cond_index]
+        for atom in atoms:
+            for position, effect_position in other_bindings:
+                effect_args[effect_position] = atom[position]
+            enqueue_func(effect_args)
 
 class ProductRule(BuildRule):
     def __init__(self, effect, conditions):
         self.effect = effect
         self.conditions = conditions
-        self.atoms_by_index = [[] for c in self.conditions]
+        # For each condition, the bindings of each atom seen so far.
+        self.bindings_by_index = [[] for c in self.conditions]
         self.empty_atom_list_no = len(self.conditions)
     def validate(self):
         assert len(self.conditions) >= 2, self
@@ -126,39 +162,34 @@ class ProductRule(BuildRule):
         assert len(all_cond_vars) == len(eff_vars), self
         assert len(all_cond_vars) == sum([len(c) for c in cond_vars])
     def update_index(self, new_atom, cond_index):
-        atom_list = self.atoms_by_index[cond_index]
-        if not atom_list:
+        bindings_list = self.bindings_by_index[cond_index]
+        if not bindings_list:
             self.empty_atom_list_no -= 1
-        atom_list.append(new_atom)
+        bindings_list.append(self._get_bindings(new_atom, cond_index))
 
-    def _get_bindings(self, atom, cond):
-        return [(var_no, obj) for var_no, obj in zip(cond.args, atom.args)
-                if isinstance(var_no, int)]
+    def _get_bindings(self, atom, cond_index):
+        return [(effect_position, atom[position])
+                for position, effect_position in self.condition_bindings[cond_index]]
 
     def fire(self, new_atom, cond_index, enqueue_func):
         if self.empty_atom_list_no:
             return
 
-        # Binding: a (var_no, object) pair
+        # Binding: a (effect position, object) pair
         # Bindings: List-of(Binding)
         # BindingsFactor: List-of(Bindings)
         # BindingsFactors: List-of(BindingsFactor)
-        bindings_factors = []
-        for pos, cond in enumerate(self.conditions):
-            if pos == cond_index:
-                continue
-            atoms = self.atoms_by_index[pos]
-            assert atoms, "if we have no atoms, this should never be called"
-            factor = [self._get_bindings(atom, cond) for atom in atoms]
-            bindings_factors.append(factor)
+        bindings_factors = [
+            factor for pos, factor in enumerate(self.bindings_by_index)
+            if pos != cond_index]
 
         eff_args = self.prepare_effect(new_atom, cond_index)
 
         for bindings_list in itertools.product(*bindings_factors):
             bindings = itertools.chain(*bindings_list)
-            for var_no, obj in bindings:
-                eff_args[var_no] = obj
-            enqueue_func(self.effect.predicate, eff_args)
+            for effect_position, obj in bindings:
+                eff_args[effect_position] = obj
+            enqueue_func(eff_args)
 
 
 class ProjectRule(BuildRule):
@@ -171,36 +202,39 @@ class ProjectRule(BuildRule):
         pass
     def fire(self, new_atom, cond_index, enqueue_func):
         effect_args = self.prepare_effect(new_atom, cond_index)
-        enqueue_func(self.effect.predicate, effect_args)
+        enqueue_func(effect_args)
 
 class Unifier:
-    def __init__(self, rules):
+    def __init__(self, rules, predicates, objects):
+        self.predicates = predicates
+        self.objects = objects
         self.predicate_to_rule_generator = {}
         for rule in rules:
             for i, cond in enumerate(rule.conditions):
                 self._insert_condition(rule, i)
     def unify(self, atom):
         result = []
-        generator = self.predicate_to_rule_generator.get(atom.predicate)
+        generator = self.predicate_to_rule_generator.get(atom[0])
         if generator:
             generator.generate(atom, result)
         return result
     def _insert_condition(self, rule, cond_index):
         condition = rule.conditions[cond_index]
-        root = self.predicate_to_rule_generator.get(condition.predicate)
+        predicate = self.predicates.intern(condition.predicate)
+        root = self.predicate_to_rule_generator.get(predicate)
         if not root:
             root = LeafGenerator()
         constant_arguments = [
-            (arg_index, arg)
+            (arg_index + 1, self.objects.intern(arg))
             for (arg_index, arg) in enumerate(condition.args)
             if not isinstance(arg, int) and arg[0] != "?"]
         newroot = root._insert(constant_arguments, (rule, cond_index))
-        self.predicate_to_rule_generator[condition.predicate] = newroot
+        self.predicate_to_rule_generator[predicate] = newroot
     def dump(self):
         predicates = sorted(self.predicate_to_rule_generator)
         print("Unifier:")
         for pred in predicates:
-            print("    %s:" % pred)
+            print("    %s:" % self.predicates.symbols[pred])
             rule_gen = self.predicate_to_rule_generator[pred]
             rule_gen.dump("    " * 2)
 
@@ -239,7 +273,7 @@ class MatchGenerator:
         return False
     def generate(self, atom, result):
         result += self.matches
-        generator = self.match_generator.get(atom.args[self.index])
+        generator = self.match_generator.get(atom[self.index])
         if generator:
             generator.generate(atom, result)
         self.next.generate(atom, result)
@@ -279,18 +313,17 @@ class Queue:
     def __init__(self, atoms):
         self.queue = atoms
         self.queue_pos = 0
-        self.enqueued = {(atom.predicate,) + tuple(atom.args)
-                         for atom in self.queue}
+        self.enqueued = set(self.queue)
         self.num_pushes = len(atoms)
     def __bool__(self):
         return self.queue_pos < len(self.queue)
     __nonzero__ = __bool__
-    def push(self, predicate, args):
+    def push(self, atom_args):
         self.num_pushes += 1
-        eff_tuple = (predicate,) + tuple(args)
-        if eff_tuple not in self.enqueued:
-            self.enqueued.add(eff_tuple)
-            self.queue.append(pddl.Atom(predicate, list(args)))
+        atom = tuple(atom_args)
+        if atom not in self.enqueued:
+            self.enqueued.add(atom)
+            self.queue.append(atom)
     def pop(self):
         result = self.queue[self.queue_pos]
         self.queue_pos += 1
@@ -298,11 +331,17 @@ class Queue:
 
 def compute_model(prog):
     with timers.timing("Preparing model"):
-        rules = convert_rules(prog)
-        unifier = Unifier(rules)
+        predicates = SymbolTable()
+        objects = SymbolTable()
+        rules = convert_rules(prog, predicates, objects)
+        unifier = Unifier(rules, predicates, objects)
         # unifier.dump()
         fact_atoms = sorted(fact.atom for fact in prog.facts)
-        queue = Queue(fact_atoms)
+        queue = Queue([predicates.intern_atom(atom, objects)
+                       for atom in fact_atoms])
+        # All predicates that can be derived occur in some rule or fact.
+        is_auxiliary = [isinstance(pred, str) and "$" in pred
+                        for pred in predicates.symbols]
 
     print("Generated %d rules." % len(rules))
     with timers.timing("Computing model"):
@@ -310,8 +349,7 @@ def compute_model(prog):
         auxiliary_atoms = 0
         while queue:
             next_atom = queue.pop()
-            pred = next_atom.predicate
-            if isinstance(pred, str) and "$" in pred:
+            if is_auxiliary[next_atom[0]]:
                 auxiliary_atoms += 1
             else:
                 relevant_atoms += 1
@@ -319,13 +357,23 @@ def compute_model(prog):
             for rule, cond_index in matches:
                 rule.update_index(next_atom, cond_index)
                 rule.fire(next_atom, cond_index, queue.push)
+        # The indices of the rules are no longer needed.
+        del rules, unifier
+        queue.enqueued = None
+        # Convert the derived atoms back, the facts are kept as they are.
+        model = fact_atoms + [
+            pddl.Atom(predicates.symbols[atom[0]],
+                      [objects.symbols[arg] for arg in atom[1:]])
+            for atom in queue.queue[len(fact_atoms):]]
     print("%d relevant atoms" % relevant_atoms)
     print("%d auxiliary atoms" % auxiliary_atoms)
     print("%d final queue length" % len(queue.queue))
     print("%d total queue pushes" % queue.num_pushes)
-    return queue.queue
+    return model
 
 if __name__ == "__main__":
+    import options
+    options.setup()
     import pddl_parser
     import normalize
     import pddl_to_prolog
@@ -2,6 +2,9 @@
 
 
 from collections import defaultdict
+import io
+import multiprocessing
+import pickle
 
 import build_model
 import options
@@ -13,6 +16,14 @@ PREDICATES_FILE = "predicates.txt"
 STATIC_PREDICATES_FILE = "static-predicates.txt"
 STATIC_ATOMS_FILE = "static-atoms.txt"
 
+# Parallel grounding instantiates this many actions in the main process to
+# estimate the size of a ground action ...
+GROUNDING_SAMPLE_SIZE = 1000
+# ... and chooses the chunk size such that the ground actions that a worker
+# sends back at once take about this many bytes. This bounds the memory
+# used for results that are in transit.
+GROUNDING_CHUNK_BYTES = 16 * 1024 * 1024
+
 def print_atom(atom, file):
     atom_name = str(atom)
     assert atom_name.startswith("Atom ")
@@ -141,28 +152,20 @@ def instantiate(task, model):
 
     type_to_objects = get_objects_by_type(task.objects, task.types)
 
-    instantiated_actions = []
+    action_atoms = []
     instantiated_axioms = []
     reachable_action_parameters = defaultdict(list)
     for atom in model:
         if isinstance(atom.predicate, pddl.Action):
             action = atom.predicate
-            parameters = action.parameters
-            inst_parameters = atom.args[:len(parameters)]
+            inst_parameters = atom.args[:len(action.parameters)]
             # Note: It's important that we use the action object
             # itself as the key in reachable_action_parameters (rather
             # than action.name) since we can have multiple different
             # actions with the same name after normalization, and we
             # want to distinguish their instantiations.
             reachable_action_parameters[action].append(inst_parameters)
-            variable_mapping = {par.name: arg
-                                for par, arg in zip(parameters, atom.args)}
-            inst_action = action.instantiate(
-                variable_mapping, init_facts, init_assignments,
-                fluent_facts, type_to_objects,
-                task.use_min_cost_metric)
-            if inst_action:
-                instantiated_actions.append(inst_action)
+            action_atoms.append(atom)
         elif isinstance(atom.predicate, pddl.Axiom):
             axiom = atom.predicate
             variable_mapping = {par.name: arg
@@ -173,12 +176,118 @@ def instantiate(task, model):
         elif atom.predicate == "@goal-reachable":
             relaxed_reachable = True
 
+    instantiated_actions = instantiate_actions(
+        action_atoms, (init_facts, init_assignments, fluent_facts,
+                       type_to_objects, task.use_min_cost_metric))
     instantiated_goal = instantiate_goal(task.goal, init_facts, fluent_facts)
 
     return (relaxed_reachable, fluent_facts,
             instantiated_actions, instantiated_goal,
             sorted(instantiated_axioms), reachable_action_parameters)
 
+def instantiate_action_atoms(action_atoms, arguments):
+    init_facts, init_assignments, fluent_facts, type_to_objects, metric = arguments
+    result = []
+    for atom in action_atoms:
+        action = atom.predicate
+        variable_mapping = {par.name: arg
+                            for par, arg in zip(action.parameters, atom.args)}
+        inst_action = action.instantiate(
+            variable_mapping, init_facts, init_assignments,
+            fluent_facts, type_to_objects, metric)
+        if inst_action:
+            result.append(inst_action)
+    return result
+
+def instantiate_actions(action_atoms, arguments):
+    """Returns the ground actions of the reachable action atoms in the
+    order of the atoms."""
+    num_workers = options.grounding_workers
+    if (num_workers <= 1 or len(action_atoms) <= GROUNDING_SAMPLE_SIZE or
+            "fork" not in multiprocessing.get_all_start_methods()):
+        return instantiate_action_atoms(action_atoms, arguments)
+    return instantiate_actions_in_parallel(
+        action_atoms, arguments, num_workers)
+
+# The action atoms, instantiation arguments and fact ids of the worker
+# processes. They are inherited when forking the workers instead of being
+# pickled.
+_worker_action_atoms = None
+_worker_arguments = None
+_worker_fact_ids = None
+
+class FactPickler(pickle.Pickler):
+    """Pickles the (negated) fluent facts in ground actions as ids, such that
+    the main process does not need to rebuild them and all ground actions
+    share the fact objects."""
+    def persistent_id(self, obj):
+        if isinstance(obj, pddl.Literal):
+            fact_id = _worker_fact_ids.get((obj.predicate, obj.args))
+            if fact_id is not None:
+                return ~fact_id if obj.negated else fact_id
+        return None
+
+class FactUnpickler(pickle.Unpickler):
+    def __init__(self, file, facts, negated_facts):
+        super().__init__(file)
+        self.facts = facts
+        self.negated_facts = negated_facts
+
+    def persistent_load(self, fact_id):
+        if fact_id >= 0:
+            return self.facts[fact_id]
+        fact_id = ~fact_id
+        negated_fact = self.negated_facts.get(fact_id)
+        if negated_fact is None:
+            negated_fact = self.facts[fact_id].negate()
+            self.negated_facts[fact_id] = negated_fact
+        return negated_fact
+
+def dump_ground_actions(actions):
+    buffer = io.BytesIO()
+    FactPickler(buffer, pickle.HIGHEST_PROTOCOL).dump(actions)
+    return buffer.getvalue()
+
+def instantiate_chunk_in_worker(chunk):
+    start, end = chunk
+    return dump_ground_actions(instantiate_action_atoms(
+        _worker_action_atoms[start:end], _worker_arguments))
+
+def instantiate_actions_in_parallel(action_atoms, arguments, num_workers):
+    global _worker_action_atoms, _worker_arguments, _worker_fact_ids
+    fluent_facts = arguments[2]
+    facts = list(fluent_facts)
+    _worker_action_atoms = action_atoms
+    _worker_arguments = arguments
+    _worker_fact_ids = {(fact.predicate, fact.args): fact_id
+                        for fact_id, fact in enumerate(facts)}
+    try:
+        result = instantiate_action_atoms(
+            action_atoms[:GROUNDING_SAMPLE_SIZE], arguments)
+        sample_bytes = len(dump_ground_actions(result))
+        bytes_per_atom = max(1, sample_bytes // GROUNDING_SAMPLE_SIZE)
+        num_remaining = len(action_atoms) - GROUNDING_SAMPLE_SIZE
+        # Use at least four chunks per worker for load balancing.
+        chunk_size = max(1, min(GROUNDING_CHUNK_BYTES // bytes_per_atom,
+                                num_remaining // (4 * num_workers)))
+        chunks = [(start, min(start + chunk_size, len(action_atoms)))
+                  for start in range(GROUNDING_SAMPLE_SIZE, len(action_atoms),
+                                     chunk_size)]
+        print("Instantiating %d actions in %d chunks with %d workers" % (
+            num_remaining, len(chunks), num_workers))
+        negated_facts = {}
+        context = multiprocessing.get_context("fork")
+        with context.Pool(num_workers) as pool:
+            # imap returns the chunks in order, so the result is the same as
+            # with sequential grounding.
+            for data in pool.imap(instantiate_chunk_in_worker, chunks):
+                result.extend(FactUnpickler(
+                    io.BytesIO(data), facts, negated_facts).load())
+    finally:
+        _worker_action_atoms = None
+        _worker_arguments = None
+        _worker_fact_ids = None
+    return result
 
 def explore(task):
     prog = pddl_to_prolog.translate(task)
@@ -194,6 +303,7 @@ def explore(task):
 
 
 if __name__ == "__main__":
+    options.setup()
     import pddl_parser
     task = pddl_parser.open()
     relaxed_reachable, atoms, actions, goals, axioms, _ = explore(task)
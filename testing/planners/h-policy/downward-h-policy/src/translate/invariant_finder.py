@@ -2,7 +2,15 @@
 
 
 from collections import deque, defaultdict
+import contextlib
+import functools
+import glob
+import hashlib
+import io
 import itertools
+import multiprocessing
+import os
+import pickle
 import time
 
 import invariants
@@ -91,19 +99,158 @@ def find_invariants(task, reachable_action_params):
 
     balance_checker = BalanceChecker(task, reachable_action_params)
 
+    cache_filename = None
+    if options.invariant_cache_dir is not None:
+        cache_key = get_cache_key(candidates, balance_checker)
+        cache_filename = get_cache_filename(options.invariant_cache_dir, cache_key)
+        invariants = load_cached_invariants(cache_filename, cache_key)
+        if invariants is not None:
+            print(len(invariants), "cached invariants")
+            return invariants
+
     def enqueue_func(invariant):
         if len(seen_candidates) < limit and invariant not in seen_candidates:
             candidates.append(invariant)
             seen_candidates.add(invariant)
 
+    invariants = []
+    num_workers = options.invariant_generation_workers
+    if num_workers > 1 and "fork" not in multiprocessing.get_all_start_methods():
+        print("Cannot fork worker processes, checking invariant "
+              "candidates sequentially")
+        num_workers = 1
+    if num_workers > 1:
+        completed = check_candidates_in_parallel(
+            candidates, balance_checker, enqueue_func, num_workers, invariants)
+    else:
+        completed = check_candidates(
+            candidates, balance_checker, enqueue_func, invariants)
+    if completed and cache_filename is not None:
+        store_cached_invariants(cache_filename, cache_key, invariants)
+    return invariants
+
+def check_candidates(candidates, balance_checker, enqueue_func, invariants):
+    """Appends the balanced candidates to invariants. Returns False if the
+    time limit was reached before all candidates were checked."""
     start_time = time.process_time()
     while candidates:
         candidate = candidates.popleft()
         if time.process_time() - start_time > options.invariant_generation_max_time:
             print("Time limit reached, aborting invariant generation")
-            return
+            return False
         if candidate.check_balance(balance_checker, enqueue_func):
-            yield candidate
+            invariants.append(candidate)
+    return True
+
+# The balance checker of the worker processes. It is inherited when forking
+# the workers, because the actions it contains are expensive to pickle.
+_worker_balance_checker = None
+
+def check_balance_in_worker(candidate):
+    new_candidates = []
+    balanced = candidate.check_balance(
+        _worker_balance_checker, new_candidates.append)
+    return balanced, new_candidates
+
+def check_candidates_in_parallel(candidates, balance_checker, enqueue_func,
+                                 num_workers, invariants):
+    """Like check_candidates, but checks all queued candidates at once and
+    then the candidates they enqueued. The new candidates are enqueued in
+    the order in which the sequential loop would enqueue them, so the same
+    invariants are found in the same order. The time limit applies to the
+    wall-clock time, because the CPU time of the workers is not available
+    while they run."""
+    global _worker_balance_checker
+    _worker_balance_checker = balance_checker
+    start_time = time.perf_counter()
+    context = multiprocessing.get_context("fork")
+    try:
+        with context.Pool(num_workers) as pool:
+            while candidates:
+                # Do not submit another batch after the time limit.
+                if time.perf_counter() - start_time > options.invariant_generation_max_time:
+                    print("Time limit reached, aborting invariant generation")
+                    return False
+                batch = list(candidates)
+                candidates.clear()
+                chunksize = max(1, len(batch) // (4 * num_workers))
+                results = pool.imap(check_balance_in_worker, batch, chunksize)
+                for candidate, (balanced, new_candidates) in zip(batch, results):
+                    if time.perf_counter() - start_time > options.invariant_generation_max_time:
+                        print("Time limit reached, aborting invariant generation")
+                        return False
+                    for new_candidate in new_candidates:
+                        enqueue_func(new_candidate)
+                    if balanced:
+                        invariants.append(candidate)
+    finally:
+        _worker_balance_checker = None
+    return True
+
+# Increase when the format of the cache files changes.
+CACHE_FORMAT_VERSION = 1
+
+@functools.lru_cache(maxsize=None)
+def get_translator_revision():
+    """Returns a hash of the translator sources, such that invariants that
+    a different version of the translator cached are never loaded."""
+    translator_dir = os.path.dirname(os.path.abspath(__file__))
+    revision = hashlib.sha256()
+    for pattern in ["*.py", os.path.join("pddl", "*.py")]:
+        for filename in sorted(glob.glob(os.path.join(translator_dir, pattern))):
+            revision.update(os.path.relpath(filename, translator_dir).encode())
+            with open(filename, "rb") as source_file:
+                revision.update(source_file.read())
+    return revision.hexdigest()
+
+def get_cache_key(initial_candidates, balance_checker):
+    """The invariants only depend on the translator, the initial
+    candidates, the actions including the inequality preconditions derived
+    from the reachable action parameters, and the candidate limit. The
+    cache entry is keyed by a hash of these, so instances of a domain share
+    it unless their reachable action parameters lead to different
+    inequalities. Normalization and the Prolog program are not cached
+    because they depend on the objects, the initial state and the goal of
+    the task."""
+    description = io.StringIO()
+    with contextlib.redirect_stdout(description):
+        print(CACHE_FORMAT_VERSION)
+        print(get_translator_revision())
+        print(options.invariant_generation_max_candidates)
+        for candidate in initial_candidates:
+            print(candidate)
+        for action in balance_checker.action_to_heavy_action:
+            action.dump()
+    return hashlib.sha256(description.getvalue().encode()).hexdigest()
+
+def get_cache_filename(cache_dir, key):
+    return os.path.join(cache_dir, key + ".pickle")
+
+def load_cached_invariants(filename, key):
+    """Returns the invariants that were stored under the key, or None if
+    there are none or if the file holds a different entry."""
+    try:
+        with open(filename, "rb") as cache_file:
+            stored_key, invariants = pickle.load(cache_file)
+    except FileNotFoundError:
+        return None
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError,
+            TypeError, AttributeError, ImportError) as e:
+        print("Ignoring invalid invariant cache file %s: %s" % (filename, e))
+        return None
+    if stored_key != key:
+        print("Ignoring invariant cache file %s of a different entry" % filename)
+        return None
+    return invariants
+
+def store_cached_invariants(filename, key, invariants):
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    # Concurrent translator runs may store the same entry, hence we write
+    # to a temporary file first.
+    tmp_filename = "%s.%d.tmp" % (filename, os.getpid())
+    with open(tmp_filename, "wb") as cache_file:
+        pickle.dump((key, invariants), cache_file)
+    os.replace(tmp_filename, filename)
 
 def useful_groups(invariants, initial_facts):
     predicate_to_invariants = defaultdict(list)
@@ -134,6 +281,7 @@ def get_groups(task, reachable_action_params=None):
     return result
 
 if __name__ == "__main__":
+    options.setup()
     import normalize
     import pddl_parser
 
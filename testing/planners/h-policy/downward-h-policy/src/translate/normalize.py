@@ -391,6 +391,8 @@ def condition_to_rule_body(parameters, condition):
     return result
 
 if __name__ == "__main__":
+    import options
+    options.setup()
     import pddl_parser
     task = pddl_parser.open()
     normalize(task)
@@ -2,7 +2,7 @@ import argparse
 import sys
 
 
-def parse_args():
+def parse_args(args=None):
     argparser = argparse.ArgumentParser()
     argparser.add_argument(
         "domain", help="path to domain pddl file")
@@ -27,10 +27,35 @@ def parse_args():
         "too many candidates.")
     argparser.add_argument(
         "--sas-file", default="output.sas",
-        help="path to the SAS output file (default: %(default)s)")
+        help="path to the SAS output file, which is compressed with gzip "
+        "if the path ends in .gz (default: %(default)s)")
+    argparser.add_argument(
+        "--timing-report", default=None,
+        help="path to a JSON file where the time, peak memory and item "
+        "counts of each translator phase are written")
     argparser.add_argument(
         "--invariant-generation-max-time", default=300, type=int,
-        help="max time for invariant generation (default: %(default)ds)")
+        help="max time for invariant generation (default: %(default)ds). "
+        "This is CPU time, or wall-clock time with more than one "
+        "--invariant-generation-workers.")
+    argparser.add_argument(
+        "--invariant-generation-workers", default=1, type=int,
+        help="number of processes that check invariant candidates "
+        "(default: %(default)d). With more than one process, the result "
+        "is the same as with one, but the time limit applies to the "
+        "wall-clock time instead of the CPU time.")
+    argparser.add_argument(
+        "--invariant-cache-dir", default=None,
+        help="directory where the invariants of a domain are cached. "
+        "Other tasks of the domain reuse them unless their reachable "
+        "action parameters lead to different inequality preconditions. "
+        "Entries of other translator versions are ignored. Only the "
+        "invariants are cached, not the normalized task or the Prolog "
+        "program, which depend on the objects, initial state and goal.")
+    argparser.add_argument(
+        "--grounding-workers", default=1, type=int,
+        help="number of processes that instantiate the reachable actions "
+        "(default: %(default)d)")
     argparser.add_argument(
         "--add-implied-preconditions", action="store_true",
         help="infer additional preconditions. This setting can cause a "
@@ -72,7 +97,7 @@ def parse_args():
         help="How to assign layers to derived variables. 'min' attempts to put as "
         "many variables into the same layer as possible, while 'max' puts each variable "
         "into its own layer unless it is part of a cycle.")
-    return argparser.parse_args()
+    return argparser.parse_args(args)
 
 
 def copy_args_to_module(args):
@@ -81,9 +106,9 @@ def copy_args_to_module(args):
         module_dict[key] = value
 
 
-def setup():
-    args = parse_args()
+def setup(args=None):
+    """Parses the given arguments, or the command line if args is None,
+    and makes them available as attributes of this module. Entry points
+    must call this before running any translator component."""
+    args = parse_args(args)
     copy_args_to_module(args)
-
-
-setup()
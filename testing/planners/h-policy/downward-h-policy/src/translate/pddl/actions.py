@@ -101,6 +101,8 @@ class Action:
 
 
 class PropositionalAction:
+    __slots__ = ["name", "precondition", "add_effects", "del_effects", "cost"]
+
     def __init__(self, name, precondition, effects, cost):
         self.name = name
         self.precondition = precondition
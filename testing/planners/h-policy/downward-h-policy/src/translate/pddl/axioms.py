@@ -42,6 +42,8 @@ class Axiom:
 
 
 class PropositionalAxiom:
+    __slots__ = ["name", "condition", "effect"]
+
     def __init__(self, name, condition, effect):
         self.name = name
         self.condition = condition
@@ -3,13 +3,21 @@
 # based on a precomputed hash value.
 #
 # Careful: Most other classes (e.g. Effects, Axioms, Actions) are not!
+#
+# All condition classes define __slots__ because the translator creates
+# many (grounded) literals. Subclasses must declare __slots__ as well.
+# Pickling reconstructs conditions with their constructor, which recomputes
+# the hash (hashes of strings differ between Python processes).
 
 class Condition:
+    __slots__ = ["parts", "hash"]
     def __init__(self, parts):
         self.parts = tuple(parts)
         self.hash = hash((self.__class__, self.parts))
     def __hash__(self):
         return self.hash
+    def __reduce__(self):
+        return self.__class__, (self.parts,)
     def __ne__(self, other):
         return not self == other
     def __lt__(self, other):
@@ -72,9 +80,12 @@ class Condition:
 class ConstantCondition(Condition):
     # Defining __eq__ blocks inheritance of __hash__, so must set it explicitly.
     __hash__ = Condition.__hash__
+    __slots__ = []
     parts = ()
     def __init__(self):
         self.hash = hash(self.__class__)
+    def __reduce__(self):
+        return self.__class__, ()
     def change_parts(self, parts):
         return self
     def __eq__(self, other):
@@ -84,12 +95,14 @@ class Impossible(Exception):
     pass
 
 class Falsity(ConstantCondition):
+    __slots__ = []
     def instantiate(self, var_mapping, init_facts, fluent_facts, result):
         raise Impossible()
     def negate(self):
         return Truth()
 
 class Truth(ConstantCondition):
+    __slots__ = []
     def to_untyped_strips(self):
         return []
     def instantiate(self, var_mapping, init_facts, fluent_facts, result):
@@ -100,6 +113,7 @@ class Truth(ConstantCondition):
 class JunctorCondition(Condition):
     # Defining __eq__ blocks inheritance of __hash__, so must set it explicitly.
     __hash__ = Condition.__hash__
+    __slots__ = []
     def __eq__(self, other):
         # Compare hash first for speed reasons.
         return (self.hash == other.hash and
@@ -109,6 +123,7 @@ class JunctorCondition(Condition):
         return self.__class__(parts)
 
 class Conjunction(JunctorCondition):
+    __slots__ = []
     def _simplified(self, parts):
         result_parts = []
         for part in parts:
@@ -136,6 +151,7 @@ class Conjunction(JunctorCondition):
         return Disjunction([p.negate() for p in self.parts])
 
 class Disjunction(JunctorCondition):
+    __slots__ = []
     def _simplified(self, parts):
         result_parts = []
         for part in parts:
@@ -158,10 +174,13 @@ class Disjunction(JunctorCondition):
 class QuantifiedCondition(Condition):
     # Defining __eq__ blocks inheritance of __hash__, so must set it explicitly.
     __hash__ = Condition.__hash__
+    __slots__ = ["parameters"]
     def __init__(self, parameters, parts):
         self.parameters = tuple(parameters)
         self.parts = tuple(parts)
         self.hash = hash((self.__class__, self.parameters, self.parts))
+    def __reduce__(self):
+        return self.__class__, (self.parameters, self.parts)
     def __eq__(self, other):
         # Compare hash first for speed reasons.
         return (self.hash == other.hash and
@@ -193,6 +212,7 @@ class QuantifiedCondition(Condition):
         return self.__class__(self.parameters, parts)
 
 class UniversalCondition(QuantifiedCondition):
+    __slots__ = []
     def _untyped(self, parts):
         type_literals = [par.get_atom().negate() for par in self.parameters]
         return UniversalCondition(self.parameters,
@@ -203,6 +223,7 @@ class UniversalCondition(QuantifiedCondition):
         return True
 
 class ExistentialCondition(QuantifiedCondition):
+    __slots__ = []
     def _untyped(self, parts):
         type_literals = [par.get_atom() for par in self.parameters]
         return ExistentialCondition(self.parameters,
@@ -218,12 +239,14 @@ class ExistentialCondition(QuantifiedCondition):
 class Literal(Condition):
     # Defining __eq__ blocks inheritance of __hash__, so must set it explicitly.
     __hash__ = Condition.__hash__
+    __slots__ = ["predicate", "args"]
     parts = []
-    __slots__ = ["predicate", "args", "hash"]
     def __init__(self, predicate, args):
         self.predicate = predicate
         self.args = tuple(args)
         self.hash = hash((self.__class__, self.predicate, self.args))
+    def __reduce__(self):
+        return self.__class__, (self.predicate, self.args)
     def __eq__(self, other):
         # Compare hash first for speed reasons.
         return (self.hash == other.hash and
@@ -261,6 +284,7 @@ class Literal(Condition):
         return {arg for arg in self.args if arg[0] == "?"}
 
 class Atom(Literal):
+    __slots__ = []
     negated = False
     def to_untyped_strips(self):
         return [self]
@@ -277,6 +301,7 @@ class Atom(Literal):
         return self
 
 class NegatedAtom(Literal):
+    __slots__ = []
     negated = True
     def _relaxed(self, parts):
         return Truth()
@@ -12,6 +12,7 @@ def cartesian_product(*sequences):
 
 
 class Effect:
+    __slots__ = ["parameters", "condition", "literal"]
     def __init__(self, parameters, condition, literal):
         self.parameters = parameters
         self.condition = condition
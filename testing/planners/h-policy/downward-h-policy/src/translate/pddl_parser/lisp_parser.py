@@ -1,3 +1,7 @@
+import io
+import re
+import sys
+
 __all__ = ["ParseError", "parse_nested_list"]
 
 class ParseError(Exception):
@@ -6,39 +10,69 @@ class ParseError(Exception):
     def __str__(self):
         return self.value
 
+COMMENT_REGEX = re.compile(r";[^\n]*")
+
 # Basic functions for parsing PDDL (Lisp) files.
 def parse_nested_list(input_file):
-    tokens = tokenize(input_file)
-    next_token = next(tokens)
-    if next_token != "(":
-        raise ParseError("Expected '(', got %s." % next_token)
-    result = list(parse_list_aux(tokens))
-    for tok in tokens:  # Check that generator is exhausted.
-        raise ParseError("Unexpected token: %s." % tok)
+    text = input_file.read() if hasattr(input_file, "read") else "".join(input_file)
+    code = COMMENT_REGEX.sub("", text)
+    if not code.isascii():
+        raise_non_ascii_error(text)
+    tokens = tokenize(code)
+    result = build_nested_list(tokens)
+    if result is None:
+        if not tokens:
+            raise ParseError("Expected '(', got end of file.")
+        raise ParseError("Missing ')'")
     return result
 
-def tokenize(input):
-    for line in input:
+def raise_non_ascii_error(text):
+    """Raise the first error that parsing the text line by line finds."""
+    lines = list(io.StringIO(text))
+    for index, line in enumerate(lines):
         line = line.split(";", 1)[0]  # Strip comments.
         try:
             line.encode("ascii")
         except UnicodeEncodeError:
+            # Errors in the lines before take precedence.
+            build_nested_list(tokenize(COMMENT_REGEX.sub("", "".join(lines[:index]))))
             raise ParseError("Non-ASCII character outside comment: %s" %
                              line[0:-1])
-        line = line.replace("(", " ( ").replace(")", " ) ").replace("?", " ?")
-        for token in line.split():
-            yield token.lower()
 
-def parse_list_aux(tokenstream):
-    # Leading "(" has already been swallowed.
-    while True:
-        try:
-            token = next(tokenstream)
-        except StopIteration:
-            raise ParseError("Missing ')'")
-        if token == ")":
-            return
-        elif token == "(":
-            yield list(parse_list_aux(tokenstream))
+def tokenize(code):
+    """Return the lowercase tokens of the code without comments.
+
+    The whole file is split at once, which is much faster than splitting
+    each line. Equal tokens are interned, which shares the strings of names
+    that occur many times and makes comparing them (e.g. in atom arguments)
+    cheap."""
+    code = code.lower().replace("(", " ( ").replace(")", " ) ").replace("?", " ?")
+    return list(map(sys.intern, code.split()))
+
+def build_nested_list(tokens):
+    """Return the nested list of the tokens, or None if the tokens end
+    before the outermost list is closed."""
+    if not tokens:
+        return None
+    if tokens[0] != "(":
+        raise ParseError("Expected '(', got %s." % tokens[0])
+    # Build the nested lists iteratively with a stack of the open lists.
+    result = []
+    stack = []
+    current = result
+    for index in range(1, len(tokens)):
+        token = tokens[index]
+        if token == "(":
+            new_list = []
+            current.append(new_list)
+            stack.append(current)
+            current = new_list
+        elif token == ")":
+            if not stack:
+                if index + 1 < len(tokens):
+                    raise ParseError("Unexpected token: %s." % tokens[index + 1])
+                return result
+            current = stack.pop()
         else:
-            yield token
+            current.append(token)
+    return None
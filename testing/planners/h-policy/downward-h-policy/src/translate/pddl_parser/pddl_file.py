@@ -1,3 +1,5 @@
+import os
+
 import options
 
 from . import lisp_parser
@@ -23,11 +25,29 @@ def parse_pddl_file(type, filename):
                          (type, filename, e))
 
 
+# (path, modification time, size) -> parsed domain file
+_parsed_domain_files = {}
+
+
+def parse_domain_pddl_file(filename):
+    """ Parses the domain file once per version of the file, such that a
+    long-running translator (see translate_server.py) reuses it across tasks. """
+    try:
+        stat = os.stat(filename)
+    except OSError as e:
+        raise SystemExit("Error: Could not read file: %s\nReason: %s." %
+                         (e.filename, e))
+    key = (os.path.abspath(filename), stat.st_mtime_ns, stat.st_size)
+    if key not in _parsed_domain_files:
+        _parsed_domain_files[key] = parse_pddl_file("domain", filename)
+    return _parsed_domain_files[key]
+
+
 def open(domain_filename=None, task_filename=None):
     task_filename = task_filename or options.task
     domain_filename = domain_filename or options.domain
 
-    domain_pddl = parse_pddl_file("domain", domain_filename)
+    domain_pddl = parse_domain_pddl_file(domain_filename)
     task_pddl = parse_pddl_file("task", task_filename)
 
     return parsing_functions.parse_task(domain_pddl, task_pddl)
@@ -172,6 +172,8 @@ def translate(task):
 
 
 if __name__ == "__main__":
+    import options
+    options.setup()
     import pddl_parser
     task = pddl_parser.open()
     normalize.normalize(task)
@@ -1,7 +1,25 @@
+import gzip
+
 SAS_FILE_VERSION = 3
 
 DEBUG = False
 
+# The output methods write each component with a single write call. The file
+# buffers these writes in blocks of this size.
+SAS_FILE_BUFFER_SIZE = 1024 * 1024
+# Compression level for SAS files ending in ".gz". The translator output is
+# repetitive, so already the fastest level compresses it well.
+SAS_FILE_COMPRESSION_LEVEL = 1
+
+
+def open_sas_file(filename):
+    """Open a SAS file for writing, compressed with gzip if the filename
+    ends in ".gz"."""
+    if filename.endswith(".gz"):
+        return gzip.open(filename, "wt",
+                         compresslevel=SAS_FILE_COMPRESSION_LEVEL)
+    return open(filename, "w", buffering=SAS_FILE_BUFFER_SIZE)
+
 
 class SASTask:
     """Planning task in finite-domain representation.
@@ -76,22 +94,23 @@ class SASTask:
         print("metric: %s" % self.metric)
 
     def output(self, stream):
-        print("begin_version", file=stream)
-        print(SAS_FILE_VERSION, file=stream)
-        print("end_version", file=stream)
-        print("begin_metric", file=stream)
-        print(int(self.metric), file=stream)
-        print("end_metric", file=stream)
+        stream.write("begin_version\n%d\nend_version\n" % SAS_FILE_VERSION)
+        stream.write("begin_metric\n%d\nend_metric\n" % int(self.metric))
         self.variables.output(stream)
-        print(len(self.mutexes), file=stream)
+        stream.write("%d\n" % len(self.mutexes))
         for mutex in self.mutexes:
             mutex.output(stream)
         self.init.output(stream)
         self.goal.output(stream)
-        print(len(self.operators), file=stream)
+        # TODO: The operators are kept in memory until the task is written.
+        # Writing them while they are translated requires that unreachable
+        # fact filtering and variable reordering no longer rewrite all
+        # operators afterwards, and that the number of operators, which
+        # precedes them in the file, is known in advance (or patched in).
+        stream.write("%d\n" % len(self.operators))
         for op in self.operators:
             op.output(stream)
-        print(len(self.axioms), file=stream)
+        stream.write("%d\n" % len(self.axioms))
         for axiom in self.axioms:
             axiom.output(stream)
 
@@ -156,17 +175,15 @@ class SASVariables:
             print("v%d in {%s}%s" % (var, list(range(rang)), axiom_str))
 
     def output(self, stream):
-        print(len(self.ranges), file=stream)
+        stream.write("%d\n" % len(self.ranges))
         for var, (rang, axiom_layer, values) in enumerate(zip(
                 self.ranges, self.axiom_layers, self.value_names)):
-            print("begin_variable", file=stream)
-            print("var%d" % var, file=stream)
-            print(axiom_layer, file=stream)
-            print(rang, file=stream)
             assert rang == len(values), (rang, values)
-            for value in values:
-                print(value, file=stream)
-            print("end_variable", file=stream)
+            lines = ["begin_variable", "var%d" % var, str(axiom_layer),
+                     str(rang)]
+            lines.extend(map(str, values))
+            lines.append("end_variable\n")
+            stream.write("\n".join(lines))
 
     def get_encoding_size(self):
         # A variable with range k has encoding size k + 1 to also give the
@@ -190,11 +207,10 @@ class SASMutexGroup:
             print("v%d: %d" % (var, val))
 
     def output(self, stream):
-        print("begin_mutex_group", file=stream)
-        print(len(self.facts), file=stream)
-        for var, val in self.facts:
-            print(var, val, file=stream)
-        print("end_mutex_group", file=stream)
+        lines = ["begin_mutex_group", str(len(self.facts))]
+        lines.extend("%s %s" % (var, val) for var, val in self.facts)
+        lines.append("end_mutex_group\n")
+        stream.write("\n".join(lines))
 
     def get_encoding_size(self):
         return len(self.facts)
@@ -220,10 +236,10 @@ class SASInit:
             print("v%d: %d" % (var, val))
 
     def output(self, stream):
-        print("begin_state", file=stream)
-        for val in self.values:
-            print(val, file=stream)
-        print("end_state", file=stream)
+        lines = ["begin_state"]
+        lines.extend(map(str, self.values))
+        lines.append("end_state\n")
+        stream.write("\n".join(lines))
 
 
 class SASGoal:
@@ -240,11 +256,10 @@ class SASGoal:
             print("v%d: %d" % (var, val))
 
     def output(self, stream):
-        print("begin_goal", file=stream)
-        print(len(self.pairs), file=stream)
-        for var, val in self.pairs:
-            print(var, val, file=stream)
-        print("end_goal", file=stream)
+        lines = ["begin_goal", str(len(self.pairs))]
+        lines.extend("%s %s" % (var, val) for var, val in self.pairs)
+        lines.append("end_goal\n")
+        stream.write("\n".join(lines))
 
     def get_encoding_size(self):
         return len(self.pairs)
@@ -357,19 +372,17 @@ class SASOperator:
             print("  v%d: %d -> %d%s" % (var, pre, post, cond_str))
 
     def output(self, stream):
-        print("begin_operator", file=stream)
-        print(self.name[1:-1], file=stream)
-        print(len(self.prevail), file=stream)
-        for var, val in self.prevail:
-            print(var, val, file=stream)
-        print(len(self.pre_post), file=stream)
+        lines = ["begin_operator", self.name[1:-1], str(len(self.prevail))]
+        lines.extend("%s %s" % (var, val) for var, val in self.prevail)
+        lines.append(str(len(self.pre_post)))
         for var, pre, post, cond in self.pre_post:
-            print(len(cond), end=' ', file=stream)
-            for cvar, cval in cond:
-                print(cvar, cval, end=' ', file=stream)
-            print(var, pre, post, file=stream)
-        print(self.cost, file=stream)
-        print("end_operator", file=stream)
+            parts = [str(len(cond))]
+            parts.extend("%s %s" % (cvar, cval) for cvar, cval in cond)
+            parts.append("%s %s %s" % (var, pre, post))
+            lines.append(" ".join(parts))
+        lines.append(str(self.cost))
+        lines.append("end_operator\n")
+        stream.write("\n".join(lines))
 
     def get_encoding_size(self):
         size = 1 + len(self.prevail)
@@ -465,13 +478,12 @@ class SASAxiom:
         print("  v%d: %d" % (var, val))
 
     def output(self, stream):
-        print("begin_rule", file=stream)
-        print(len(self.condition), file=stream)
-        for var, val in self.condition:
-            print(var, val, file=stream)
+        lines = ["begin_rule", str(len(self.condition))]
+        lines.extend("%s %s" % (var, val) for var, val in self.condition)
         var, val = self.effect
-        print(var, 1 - val, val, file=stream)
-        print("end_rule", file=stream)
+        lines.append("%s %s %s" % (var, 1 - val, val))
+        lines.append("end_rule\n")
+        stream.write("\n".join(lines))
 
     def get_encoding_size(self):
         return 1 + len(self.condition)
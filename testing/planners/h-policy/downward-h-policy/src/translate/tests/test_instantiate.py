@@ -0,0 +1,28 @@
+import os.path
+import subprocess
+import sys
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+TRANSLATE_DIR = os.path.dirname(DIR)
+REPO = os.path.abspath(os.path.join(DIR, "..", "..", ".."))
+BENCHMARKS = os.path.join(REPO, "misc", "tests", "benchmarks")
+# The task has enough actions to be grounded in parallel.
+DOMAIN = os.path.join(BENCHMARKS, "satellite", "domain.pddl")
+PROBLEM = os.path.join(BENCHMARKS, "satellite", "p25-HC-pfile5.pddl")
+
+
+def translate(directory, num_workers):
+    directory.mkdir()
+    log = subprocess.check_output(
+        [sys.executable, os.path.join(TRANSLATE_DIR, "translate.py"),
+         DOMAIN, PROBLEM, "--grounding-workers", str(num_workers)],
+        cwd=directory, universal_newlines=True)
+    with open(directory / "output.sas") as f:
+        return f.read(), log
+
+
+def test_parallel_grounding(tmp_path):
+    sequential_output, _ = translate(tmp_path / "sequential", 1)
+    parallel_output, log = translate(tmp_path / "parallel", 2)
+    assert "with 2 workers" in log
+    assert parallel_output == sequential_output
@@ -0,0 +1,70 @@
+import os
+import pickle
+import subprocess
+import sys
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+TRANSLATE_DIR = os.path.dirname(DIR)
+REPO = os.path.abspath(os.path.join(DIR, "..", "..", ".."))
+BENCHMARKS = os.path.join(REPO, "misc", "tests", "benchmarks")
+TASKS = [("satellite", "p25-HC-pfile5.pddl"), ("miconic-simpleadl", "s1-0.pddl")]
+
+
+def translate(directory, domain, problem, *options):
+    directory.mkdir()
+    log = subprocess.check_output(
+        [sys.executable, os.path.join(TRANSLATE_DIR, "translate.py"),
+         os.path.join(BENCHMARKS, domain, "domain.pddl"),
+         os.path.join(BENCHMARKS, domain, problem)] + list(options),
+        cwd=directory, universal_newlines=True)
+    with open(directory / "output.sas") as f:
+        return f.read(), log
+
+
+def test_parallel_invariant_generation(tmp_path):
+    for domain, problem in TASKS:
+        sequential_output, _ = translate(
+            tmp_path / (domain + "-sequential"), domain, problem)
+        parallel_output, _ = translate(
+            tmp_path / (domain + "-parallel"), domain, problem,
+            "--invariant-generation-workers", "3")
+        assert parallel_output == sequential_output
+
+
+def test_invariant_cache(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    for domain, problem in TASKS:
+        expected_output, _ = translate(
+            tmp_path / (domain + "-uncached"), domain, problem)
+        for i in range(2):
+            output, log = translate(
+                tmp_path / "{}-cached{}".format(domain, i), domain, problem,
+                "--invariant-cache-dir", cache_dir)
+            assert output == expected_output
+            assert ("cached invariants" in log) == (i == 1)
+
+
+def test_foreign_invariant_cache_entries_are_ignored(tmp_path):
+    cache_dir = tmp_path / "cache"
+    domain, problem = TASKS[0]
+    expected_output, _ = translate(
+        tmp_path / "cached", domain, problem, "--invariant-cache-dir", str(cache_dir))
+    # An entry stored under a different key, e.g., by another translator version.
+    for filename in os.listdir(cache_dir):
+        with open(cache_dir / filename, "wb") as f:
+            pickle.dump(("other key", []), f)
+    output, log = translate(
+        tmp_path / "foreign", domain, problem, "--invariant-cache-dir", str(cache_dir))
+    assert output == expected_output
+    assert "of a different entry" in log
+    assert "cached invariants" not in log
+
+
+def test_parallel_invariant_generation_time_limit(tmp_path):
+    domain, problem = TASKS[0]
+    # The limit is checked before the first batch is submitted.
+    _, log = translate(
+        tmp_path / "parallel", domain, problem,
+        "--invariant-generation-workers", "3",
+        "--invariant-generation-max-time", "0")
+    assert "Time limit reached, aborting invariant generation" in log
@@ -0,0 +1,34 @@
+import io
+import os.path
+import sys
+
+import pytest
+
+# Import the module directly, since importing the pddl_parser package
+# parses the command line of the translator.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), "pddl_parser"))
+import lisp_parser
+
+
+def parse(text):
+    return lisp_parser.parse_nested_list(io.StringIO(text))
+
+
+def test_parse_nested_list():
+    assert parse("(Define (x ?A?b c?d) ; comment (\n())\n") == [
+        "define", ["x", "?a", "?b", "c", "?d"], []]
+
+
+@pytest.mark.parametrize("text, message", [
+    ("", "Expected '(', got end of file."),
+    ("x (y)", "Expected '(', got x."),
+    ("(x (y)", "Missing ')'"),
+    ("(x) y", "Unexpected token: y."),
+    ("(x \xe9)\n", "Non-ASCII character outside comment: (x \xe9)"),
+    ("(x) y\n\xe9\n", "Unexpected token: y."),
+])
+def test_parse_errors(text, message):
+    with pytest.raises(lisp_parser.ParseError) as excinfo:
+        parse(text)
+    assert str(excinfo.value) == message
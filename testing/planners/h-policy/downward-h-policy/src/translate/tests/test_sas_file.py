@@ -0,0 +1,27 @@
+import gzip
+import os.path
+import subprocess
+import sys
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+TRANSLATE_DIR = os.path.dirname(DIR)
+REPO = os.path.abspath(os.path.join(DIR, "..", "..", ".."))
+BENCHMARKS = os.path.join(REPO, "misc", "tests", "benchmarks")
+DOMAIN = os.path.join(BENCHMARKS, "miconic-simpleadl", "domain.pddl")
+PROBLEM = os.path.join(BENCHMARKS, "miconic-simpleadl", "s1-0.pddl")
+
+
+def translate(directory, sas_file):
+    subprocess.check_call(
+        [sys.executable, os.path.join(TRANSLATE_DIR, "translate.py"),
+         DOMAIN, PROBLEM, "--sas-file", sas_file],
+        cwd=directory, stdout=subprocess.DEVNULL)
+
+
+def test_compressed_sas_file(tmp_path):
+    translate(tmp_path, "output.sas")
+    translate(tmp_path, "output.sas.gz")
+    with open(tmp_path / "output.sas") as f:
+        expected = f.read()
+    with gzip.open(tmp_path / "output.sas.gz", "rt") as f:
+        assert f.read() == expected
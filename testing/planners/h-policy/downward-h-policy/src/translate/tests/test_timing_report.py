@@ -0,0 +1,40 @@
+import json
+import os.path
+import subprocess
+import sys
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+TRANSLATE_DIR = os.path.dirname(DIR)
+REPO = os.path.abspath(os.path.join(DIR, "..", "..", ".."))
+BENCHMARKS = os.path.join(REPO, "misc", "tests", "benchmarks")
+DOMAIN = os.path.join(BENCHMARKS, "gripper", "domain.pddl")
+PROBLEM = os.path.join(BENCHMARKS, "gripper", "prob01.pddl")
+
+
+def test_timing_report(tmp_path):
+    report_file = tmp_path / "report.json"
+    subprocess.check_call(
+        [sys.executable, os.path.join(TRANSLATE_DIR, "translate.py"),
+         DOMAIN, PROBLEM, "--timing-report", str(report_file)],
+        cwd=tmp_path, stdout=subprocess.DEVNULL)
+    with open(report_file) as f:
+        report = json.load(f)
+
+    phases = {phase["name"]: phase for phase in report["phases"]}
+    for name in ["Parsing", "Instantiating", "Computing fact groups",
+                 "Translating task", "Writing output"]:
+        assert phases[name]["depth"] == 0
+        assert phases[name]["wall_seconds"] >= 0
+        assert phases[name]["cpu_seconds"] >= 0
+    assert phases["Finding invariants"]["depth"] == 1
+    assert phases["Processing axioms"]["depth"] == 1
+    assert set(phases["Instantiating"]["counts"]) == {"atoms", "actions", "axioms"}
+    assert phases["Translating task"]["counts"]["operators"] > 0
+
+    # The totals match the statistics that the translator prints.
+    counts = report["counts"]
+    with open(tmp_path / "output.sas") as f:
+        assert f.read().count("begin_operator") == counts["operators"]
+    assert counts["variables"] > 0
+    assert report["wall_seconds"] >= sum(
+        phase["wall_seconds"] for phase in report["phases"] if phase["depth"] == 0)
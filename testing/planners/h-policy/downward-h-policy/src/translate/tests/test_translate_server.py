@@ -0,0 +1,82 @@
+import os.path
+import socket
+import subprocess
+import sys
+import time
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+TRANSLATE_DIR = os.path.dirname(DIR)
+REPO = os.path.abspath(os.path.join(DIR, "..", "..", ".."))
+BENCHMARKS = os.path.join(REPO, "misc", "tests", "benchmarks")
+DOMAIN = os.path.join(BENCHMARKS, "gripper", "domain.pddl")
+PROBLEM = os.path.join(BENCHMARKS, "gripper", "prob01.pddl")
+OUTPUT_FILES = ["output.sas", "constants.txt", "goal-atoms.txt"]
+
+sys.path.insert(0, REPO)
+from driver import call
+from driver import util
+
+
+def read_files(directory):
+    contents = {}
+    for filename in OUTPUT_FILES:
+        with open(os.path.join(directory, filename)) as f:
+            contents[filename] = f.read()
+    return contents
+
+
+def test_translate_server(tmp_path, monkeypatch):
+    args = [DOMAIN, PROBLEM, "--dump-constants", "--dump-goal-atoms"]
+    expected_dir = tmp_path / "expected"
+    expected_dir.mkdir()
+    subprocess.check_call(
+        [sys.executable, os.path.join(TRANSLATE_DIR, "translate.py")] + args,
+        cwd=expected_dir, stdout=subprocess.DEVNULL)
+
+    socket_path = str(tmp_path / "translate.sock")
+    server_cmd = [sys.executable, os.path.join(TRANSLATE_DIR, "translate_server.py"),
+                  socket_path, "--idle-timeout", "10"]
+    # The second request reuses the parsed domain of the first one.
+    for i in range(2):
+        served_dir = tmp_path / "served{}".format(i)
+        served_dir.mkdir()
+        monkeypatch.chdir(served_dir)
+        external_elapsed_time = util._external_elapsed_time
+        stderr, returncode = call.get_error_output_and_returncode_from_server(
+            "translator", server_cmd, socket_path, args)
+        assert returncode == 0, stderr
+        assert read_files(served_dir) == read_files(expected_dir)
+        # The CPU time of the translation counts towards the limits of the driver.
+        assert util._external_elapsed_time > external_elapsed_time
+
+
+def test_concurrently_started_servers(tmp_path, monkeypatch):
+    socket_path = str(tmp_path / "translate.sock")
+    # A socket that a killed server left behind is replaced.
+    stale_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale_socket.bind(socket_path)
+    stale_socket.close()
+    server_cmd = [sys.executable, os.path.join(TRANSLATE_DIR, "translate_server.py"),
+                  socket_path, "--idle-timeout", "10"]
+    servers = [subprocess.Popen(server_cmd, stdout=subprocess.PIPE, universal_newlines=True)
+               for _ in range(3)]
+    try:
+        # All but one server exit because the first one holds the lock.
+        deadline = time.monotonic() + 10
+        while sum(server.poll() is not None for server in servers) < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        exited_servers = [server for server in servers if server.poll() is not None]
+        monkeypatch.chdir(tmp_path)
+        stderr, returncode = call.get_error_output_and_returncode_from_server(
+            "translator", server_cmd, socket_path, [DOMAIN, PROBLEM])
+        assert returncode == 0, stderr
+        # The request was served by the remaining server.
+        assert [server.poll() for server in servers].count(None) == 1
+    finally:
+        for server in servers:
+            if server.poll() is None:
+                server.kill()
+                server.wait()
+    assert len(exited_servers) == 2
+    for server in exited_servers:
+        assert "Another translator server serves" in server.stdout.read()
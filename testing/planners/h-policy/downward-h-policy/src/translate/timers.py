@@ -1,8 +1,14 @@
 import contextlib
+import json
 import os
 import sys
 import time
 
+try:
+    import resource
+except ImportError:
+    resource = None
+
 
 class Timer:
     def __init__(self):
@@ -13,21 +19,119 @@ class Timer:
         times = os.times()
         return times[0] + times[1]
 
+    def elapsed_clock(self):
+        return self._clock() - self.start_clock
+
+    def elapsed_time(self):
+        return time.time() - self.start_time
+
     def __str__(self):
         return "[%.3fs CPU, %.3fs wall-clock]" % (
-            self._clock() - self.start_clock,
-            time.time() - self.start_time)
+            self.elapsed_clock(), self.elapsed_time())
+
+
+def get_peak_rss_in_kb():
+    """Return the peak resident set size of this process so far, or None
+    if the platform does not provide it."""
+    if resource is None:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        # macOS reports bytes, Linux reports KB.
+        peak_rss //= 1024
+    return peak_rss
+
+
+class Report:
+    """Machine-readable record of the phases timed with timing().
+
+    Each phase stores its nesting depth, CPU and wall-clock time, the peak
+    RSS at its end and how much the phase increased it, and the item counts
+    added with add_counts() while it was the innermost open phase."""
+    def __init__(self):
+        self.timer = Timer()
+        self.phases = []
+        self.open_phases = []
+        self.counts = {}
+
+    def start_phase(self, name):
+        phase = {
+            "name": name,
+            "depth": len(self.open_phases),
+            "counts": {},
+        }
+        self.phases.append(phase)
+        self.open_phases.append((phase, get_peak_rss_in_kb()))
+        return phase
+
+    def end_phase(self, phase, timer):
+        open_phase, start_peak_rss = self.open_phases.pop()
+        assert open_phase is phase
+        peak_rss = get_peak_rss_in_kb()
+        phase["cpu_seconds"] = timer.elapsed_clock()
+        phase["wall_seconds"] = timer.elapsed_time()
+        phase["peak_rss_kb"] = peak_rss
+        if peak_rss is None:
+            phase["peak_rss_increase_kb"] = None
+        else:
+            phase["peak_rss_increase_kb"] = peak_rss - start_peak_rss
+
+    def add_counts(self, counts):
+        if self.open_phases:
+            self.open_phases[-1][0]["counts"].update(counts)
+        else:
+            self.counts.update(counts)
+
+    def write(self, filename):
+        data = {
+            "cpu_seconds": self.timer.elapsed_clock(),
+            "wall_seconds": self.timer.elapsed_time(),
+            "peak_rss_kb": get_peak_rss_in_kb(),
+            "counts": self.counts,
+            "phases": self.phases,
+        }
+        with open(filename, "w") as f:
+            json.dump(data, f, indent=2)
+            f.write("\n")
+
+
+_report = None
+
+
+def start_report():
+    """Record all following phases for write_report()."""
+    global _report
+    _report = Report()
+
+
+def add_counts(**counts):
+    """Add item counts to the innermost open phase of the report, or to the
+    totals if no phase is open. Does nothing if no report was started."""
+    if _report is not None:
+        _report.add_counts(counts)
+
+
+def write_report(filename):
+    _report.write(filename)
 
 
 @contextlib.contextmanager
 def timing(text, block=False):
     timer = Timer()
+    if _report is not None:
+        phase = _report.start_phase(text)
     if block:
         print("%s..." % text)
     else:
         print("%s..." % text, end=' ')
     sys.stdout.flush()
-    yield
+    try:
+        yield
+    finally:
+        # Also close phases left with an exception, such as
+        # simplify.Impossible, so that the nesting stays intact.
+        if _report is not None:
+            _report.end_phase(phase, timer)
     if block:
         print("%s: %s" % (text, timer))
     else:
@@ -0,0 +1,220 @@
+#! /usr/bin/env python3
+
+"""Long-running translator that serves translation requests on a Unix socket.
+
+Starting a translator for each task imports all translator modules and
+parses the domain file again. The server does this once: each request is
+translated in a forked child process that inherits the loaded modules and
+the parsed domain files, and that has its own options, limits, working
+directory and output files, exactly as a separate translate.py call.
+
+Protocol: the client sends one JSON line
+  {"args": [...], "cwd": "...", "time_limit": SECONDS, "memory_limit": BYTES}
+where args are the command-line arguments of translate.py and the limits
+may be null. The server answers with one JSON line
+  {"returncode": CODE, "stdout": "...", "stderr": "...", "cpu_time": SECONDS}
+where cpu_time is the CPU time that the server spent on the request, which
+the client must count as its own because the translation does not run in
+one of its child processes.
+Requests are served one at a time, i.e., requests of parallel clients wait
+for each other. The server exits after it was idle for
+--idle-timeout seconds. Only one server serves a socket path: a server that
+is started while another one holds the lock file of the path exits.
+"""
+
+import argparse
+import fcntl
+import json
+import os
+import signal
+import socket
+import sys
+import tempfile
+import time
+import traceback
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+import options
+import pddl_parser
+import translate
+
+
+def parse_args():
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument(
+        "socket", help="path to the Unix socket to listen on")
+    argparser.add_argument(
+        "--idle-timeout", default=600, type=int,
+        help="exit after this many seconds without requests "
+        "(default: %(default)ds, 0 means never)")
+    return argparser.parse_args()
+
+
+def set_limits(time_limit, memory_limit):
+    # Same as driver/limits.py, the child process starts with zero CPU time.
+    if resource is None:
+        return
+    if time_limit is not None:
+        try:
+            resource.setrlimit(resource.RLIMIT_CPU, (time_limit, time_limit + 1))
+        except ValueError:
+            resource.setrlimit(resource.RLIMIT_CPU, (time_limit, time_limit))
+    if memory_limit is not None and sys.platform != "darwin":
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+
+
+class PreloadLimitExceeded(Exception):
+    pass
+
+
+def _raise_preload_limit_exceeded(signum, frame):
+    raise PreloadLimitExceeded()
+
+
+def preload_domain(args, time_limit, memory_limit):
+    """Parses the domain file in the server such that all children reuse it.
+
+    The parsing is subject to the limits of the request. If it exceeds
+    them, the server drops it and the child parses the domain itself and
+    reports the error."""
+    previous_handler = signal.signal(signal.SIGPROF, _raise_preload_limit_exceeded)
+    previous_memory_limit = None
+    try:
+        if time_limit is not None:
+            # Counts the CPU time of the server like RLIMIT_CPU in the child.
+            signal.setitimer(signal.ITIMER_PROF, max(time_limit, 0.001))
+        if memory_limit is not None and resource is not None and sys.platform != "darwin":
+            previous_memory_limit = resource.getrlimit(resource.RLIMIT_AS)
+            soft, hard = previous_memory_limit
+            if soft == resource.RLIM_INFINITY or memory_limit < soft:
+                # Lowering only the soft limit allows to restore it.
+                resource.setrlimit(resource.RLIMIT_AS, (memory_limit, hard))
+        task_options = options.parse_args(args)
+        pddl_parser.pddl_file.parse_domain_pddl_file(task_options.domain)
+    except (SystemExit, Exception):
+        # The child reports the error.
+        pass
+    finally:
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, previous_handler)
+        if previous_memory_limit is not None:
+            resource.setrlimit(resource.RLIMIT_AS, previous_memory_limit)
+
+
+def translate_in_child(request, stdout_file, stderr_file):
+    """Runs in the forked child and never returns."""
+    returncode = 0
+    try:
+        os.dup2(stdout_file.fileno(), 1)
+        os.dup2(stderr_file.fileno(), 2)
+        os.chdir(request["cwd"])
+        set_limits(request.get("time_limit"), request.get("memory_limit"))
+        translate.run(request["args"])
+    except SystemExit as e:
+        if e.code is None:
+            returncode = 0
+        elif isinstance(e.code, int):
+            returncode = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            returncode = 1
+    except BaseException:
+        traceback.print_exc()
+        returncode = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(returncode)
+
+
+def handle(connection):
+    with connection.makefile("rb") as reader:
+        request = json.loads(reader.readline())
+    cpu_time_start = time.process_time()
+    preload_domain(request["args"], request.get("time_limit"), request.get("memory_limit"))
+    preload_cpu_time = time.process_time() - cpu_time_start
+    if request.get("time_limit") is not None:
+        # The child has the time that the preload left.
+        request["time_limit"] = max(1, int(request["time_limit"] - preload_cpu_time))
+    with tempfile.TemporaryFile() as stdout_file, tempfile.TemporaryFile() as stderr_file:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            connection.close()
+            translate_in_child(request, stdout_file, stderr_file)
+        _, status, rusage = os.wait4(pid, 0)
+        if os.WIFSIGNALED(status):
+            returncode = -os.WTERMSIG(status)
+        else:
+            returncode = os.WEXITSTATUS(status)
+        stdout_file.seek(0)
+        stderr_file.seek(0)
+        response = {
+            "returncode": returncode,
+            "stdout": stdout_file.read().decode(errors="replace"),
+            "stderr": stderr_file.read().decode(errors="replace"),
+            "cpu_time": preload_cpu_time + rusage.ru_utime + rusage.ru_stime,
+        }
+    connection.sendall((json.dumps(response) + "\n").encode())
+
+
+def acquire_lock(socket_path):
+    """Returns the locked lock file of the socket path, or None if another
+    server holds the lock. The lock is released when the server exits, also
+    if it is killed, such that a socket left behind is replaced."""
+    lock_file = open(socket_path + ".lock", "a")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+def serve(socket_path, idle_timeout):
+    lock_file = acquire_lock(socket_path)
+    if lock_file is None:
+        print("Another translator server serves %s, exiting." % socket_path)
+        return
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # Bind to a temporary path and rename it into place such that clients
+    # never connect to a socket that does not listen yet.
+    tmp_socket_path = "%s.%d.tmp" % (socket_path, os.getpid())
+    if os.path.exists(tmp_socket_path):
+        os.remove(tmp_socket_path)
+    server.bind(tmp_socket_path)
+    server.listen()
+    os.rename(tmp_socket_path, socket_path)
+    if idle_timeout > 0:
+        server.settimeout(idle_timeout)
+    print("Translator server listening on %s" % socket_path)
+    sys.stdout.flush()
+    try:
+        while True:
+            try:
+                connection, _ = server.accept()
+            except socket.timeout:
+                print("Translator server idle for %ds, exiting." % idle_timeout)
+                break
+            with connection:
+                connection.settimeout(None)
+                try:
+                    handle(connection)
+                except Exception:
+                    traceback.print_exc()
+    finally:
+        server.close()
+        # Only the holder of the lock removes the socket.
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        lock_file.close()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    serve(args.socket, args.idle_timeout)
@@ -28,6 +28,10 @@ def parse_args():
     argparser.add_argument(
         "--sas-file", default="output.sas",
         help="path to the SAS output file (default: %(default)s)")
+    argparser.add_argument(
+        "--timing-report", default=None,
+        help="path to a JSON file where the time, peak memory and item "
+        "counts of each translator phase are written")
     argparser.add_argument(
         "--invariant-generation-max-time", default=300, type=int,
         help="max time for invariant generation (default: %(default)ds)")
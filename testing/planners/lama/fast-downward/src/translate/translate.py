@@ -463,6 +463,7 @@ def translate_task(
     with timers.timing("Processing axioms", block=True):
         axioms, axiom_layer_dict = axiom_rules.handle_axioms(actions, axioms, goals,
                                                              options.layer_strategy)
+        timers.add_counts(axioms=len(axioms))
 
     if options.dump_task:
         # Remove init facts that don't occur in strips_to_sas: they're constant.
@@ -548,6 +549,8 @@ def pddl_to_sas(task):
     with timers.timing("Instantiating", block=True):
         (relaxed_reachable, atoms, actions, goal_list, axioms,
          reachable_action_params) = instantiate.explore(task)
+        timers.add_counts(atoms=len(atoms), actions=len(actions),
+                          axioms=len(axioms))
 
     if not relaxed_reachable:
         return unsolvable_sas_task("No relaxed solution")
@@ -560,6 +563,7 @@ def pddl_to_sas(task):
     with timers.timing("Computing fact groups", block=True):
         groups, mutex_groups, translation_key = fact_groups.compute_groups(
             task, atoms, reachable_action_params)
+        timers.add_counts(groups=len(groups), mutex_groups=len(mutex_groups))
 
     with timers.timing("Building STRIPS to SAS dictionary"):
         ranges, strips_to_sas = strips_to_sas_dictionary(
@@ -595,6 +599,7 @@ def pddl_to_sas(task):
             mutex_dict, mutex_ranges, mutex_key,
             task.init, goal_list, actions, axioms, task.use_min_cost_metric,
             implied_facts)
+        add_sas_task_counts(sas_task)
 
     print("%d effect conditions simplified" %
           simplified_effect_condition_counter)
@@ -609,12 +614,14 @@ def pddl_to_sas(task):
                 return unsolvable_sas_task("Simplified to trivially false goal")
             except simplify.TriviallySolvable:
                 return solvable_sas_task("Simplified to empty goal")
+            add_sas_task_counts(sas_task)
 
     if options.reorder_variables or options.filter_unimportant_vars:
         with timers.timing("Reordering and filtering variables", block=True):
             variable_order.find_and_apply_variable_order(
                 sas_task, options.reorder_variables,
                 options.filter_unimportant_vars)
+            add_sas_task_counts(sas_task)
 
     return sas_task
 
@@ -678,7 +685,27 @@ def build_implied_facts(strips_to_sas, groups, mutex_groups):
     return implied_facts
 
 
+def add_sas_task_counts(sas_task):
+    timers.add_counts(
+        variables=len(sas_task.variables.ranges),
+        operators=len(sas_task.operators),
+        axioms=len(sas_task.axioms),
+        mutex_groups=len(sas_task.mutexes))
+
+
 def dump_statistics(sas_task):
+    timers.add_counts(
+        variables=len(sas_task.variables.ranges),
+        derived_variables=len([layer for layer in sas_task.variables.axiom_layers
+                               if layer >= 0]),
+        facts=sum(sas_task.variables.ranges),
+        goal_facts=len(sas_task.goal.pairs),
+        mutex_groups=len(sas_task.mutexes),
+        total_mutex_groups_size=sum(
+            mutex.get_encoding_size() for mutex in sas_task.mutexes),
+        operators=len(sas_task.operators),
+        axioms=len(sas_task.axioms),
+        task_size=sas_task.get_encoding_size())
     print("Translator variables: %d" % len(sas_task.variables.ranges))
     print("Translator derived variables: %d" %
           len([layer for layer in sas_task.variables.axiom_layers
@@ -701,12 +728,17 @@ def dump_statistics(sas_task):
 
 def main():
     timer = timers.Timer()
+    if options.timing_report:
+        timers.start_report()
     with timers.timing("Parsing", True):
         task = pddl_parser.open(
             domain_filename=options.domain, task_filename=options.task)
+        timers.add_counts(objects=len(task.objects), actions=len(task.actions),
+                          axioms=len(task.axioms), init_facts=len(task.init))
 
     with timers.timing("Normalizing task"):
         normalize.normalize(task)
+        timers.add_counts(actions=len(task.actions), axioms=len(task.axioms))
 
     if options.generate_relaxed_task:
         # Remove delete effects.
@@ -721,6 +753,8 @@ def main():
     with timers.timing("Writing output"):
         with open(options.sas_file, "w") as output_file:
             sas_task.output(output_file)
+    if options.timing_report:
+        timers.write_report(options.timing_report)
     print("Done! %s" % timer)
 
 